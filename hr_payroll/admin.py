@@ -13,6 +13,10 @@ from django.db import transaction, models
 import logging
 from django.contrib.admin.views.decorators import staff_member_required
 from .zkteco_device_manager import ZKTecoDeviceManager
+from .zkteco_pool import device_pool
+from .attendance_jobs import submit_job
+from .attendance_import import import_attendance_log_chunks, resolve_zkteco_users
+from .device_fetch_staging import discard_fetch, get_fetch, iter_staged_chunks, stage_records
 import json
 
 from unfold.admin import TabularInline
@@ -22,7 +26,7 @@ from .models import (
     Holiday, LeaveType, LeaveBalance, LeaveApplication, ZkDevice, AttendanceLog, 
     Attendance, Notice, Recruitment, JobApplication, Training, TrainingEnrollment,
     Performance, PerformanceGoal, EmployeeDocument, Overtime, Resignation, 
-    Clearance, Complaint
+    Clearance, Complaint, AttendanceGenerationJob, ZkDeviceSyncRun, DeviceFetch
 )
 
 logger = logging.getLogger(__name__)
@@ -836,7 +840,10 @@ class ZkDeviceAdmin(ModelAdmin):
             'classes': ('collapse',)
         }),
         (_("Sync Information"), {
-            'fields': ('last_synced',),
+            'fields': (
+                'last_synced', 'clear_after_import', 'sync_record_index', 'sync_high_water_mark',
+                'sync_lease_owner', 'sync_lease_expires',
+            ),
             'classes': ('collapse',)
         }),
         (_("Description"), {
@@ -907,7 +914,7 @@ class ZkDeviceAdmin(ModelAdmin):
     
     def test_device_connection(self, request, queryset):
         """Test connection to selected devices"""
-        device_manager = ZKTecoDeviceManager()
+        device_manager = ZKTecoDeviceManager(pool=device_pool)
         
         device_list = []
         for device in queryset:
@@ -918,7 +925,7 @@ class ZkDeviceAdmin(ModelAdmin):
                 'password': device.password or 0,
             })
         
-        results = device_manager.test_multiple_connections(device_list, max_workers=5)
+        results = device_manager.test_multiple_connections(device_list)
         
         success_count = 0
         failed_count = 0
@@ -962,14 +969,16 @@ class ZkDeviceAdmin(ModelAdmin):
     
     def clear_device_attendance(self, request, queryset):
         """Clear attendance data from selected devices"""
-        device_manager = ZKTecoDeviceManager()
+        device_manager = ZKTecoDeviceManager(pool=device_pool)
         
         success_count = 0
         failed_count = 0
         
         for device in queryset:
             try:
-                success, message = device_manager.clear_attendance_data(device.ip_address)
+                success, message = device_manager.clear_attendance_data(
+                    device.ip_address, device.port, device.password or 0
+                )
                 if success:
                     success_count += 1
                     self.message_user(
@@ -1050,7 +1059,7 @@ class ZkDeviceAdmin(ModelAdmin):
         
         try:
             devices = ZkDevice.objects.filter(id__in=device_ids)
-            device_manager = ZKTecoDeviceManager()
+            device_manager = ZKTecoDeviceManager(pool=device_pool)
             
             device_list = []
             device_map = {}
@@ -1302,7 +1311,7 @@ class ZkDeviceAdmin(ModelAdmin):
             days = body.get('days', 30)
             
             devices = ZkDevice.objects.filter(id__in=device_ids)
-            device_manager = ZKTecoDeviceManager()
+            device_manager = ZKTecoDeviceManager(pool=device_pool)
             
             end_date = datetime.now().date()
             start_date = end_date - timedelta(days=days)
@@ -1331,9 +1340,10 @@ class ZkDeviceAdmin(ModelAdmin):
                 all_attendance_data, device_map
             )
             
-            # Store data in session for actual import
-            request.session['attendance_import_data'] = {
-                'attendance_data': [
+            # Stage the records server-side; the session keeps the token and device map
+            fetch = stage_records(
+                'attendance',
+                [
                     {
                         'zkteco_id': record['zkteco_id'],
                         'timestamp': record['timestamp'].isoformat(),
@@ -1344,6 +1354,13 @@ class ZkDeviceAdmin(ModelAdmin):
                     }
                     for record in all_attendance_data
                 ],
+                user=request.user,
+            )
+            previous = request.session.get('attendance_import_data') or {}
+            if previous.get('fetch_token'):
+                DeviceFetch.objects.filter(token=previous['fetch_token']).delete()
+            request.session['attendance_import_data'] = {
+                'fetch_token': str(fetch.token),
                 'device_map': {ip: device.id for ip, device in device_map.items()},
                 'date_range': {
                     'start_date': start_date.isoformat(),
@@ -1382,10 +1399,15 @@ class ZkDeviceAdmin(ModelAdmin):
         
         try:
             # Actual import logic
+            fetch = get_fetch(import_data.get('fetch_token'), 'attendance', user=request.user)
+            if not fetch:
+                return JsonResponse({'error': 'No attendance data to import'}, status=400)
+            
             import_results = self._import_attendance_to_database(
-                import_data['attendance_data'], 
+                iter_staged_chunks(fetch), 
                 import_data['device_map']
             )
+            discard_fetch(fetch)
             
             # Update device sync times
             device_ids = list(import_data['device_map'].values())
@@ -1415,25 +1437,22 @@ class ZkDeviceAdmin(ModelAdmin):
         skipped_count = 0
         missing_employees = set()
         
+        by_company = {}
         for record in attendance_data:
-            device_ip = record['device_ip']
-            device = device_map.get(device_ip)
-            
+            device = device_map.get(record['device_ip'])
             if not device:
                 skipped_count += 1
                 continue
-            
-            zkteco_id = record['zkteco_id']
-            try:
-                employee = Employee.objects.get(
-                    zkteco_id=zkteco_id,
-                    company=device.company
-                )
-                imported_count += 1
-            except Employee.DoesNotExist:
-                missing_employees.add(zkteco_id)
-                skipped_count += 1
-                continue
+            by_company.setdefault(device.company_id, []).append(record['zkteco_id'])
+        
+        for company_id, zkteco_ids in by_company.items():
+            employees = resolve_zkteco_users(company_id, zkteco_ids)
+            for zkteco_id in zkteco_ids:
+                if zkteco_id in employees:
+                    imported_count += 1
+                else:
+                    missing_employees.add(zkteco_id)
+                    skipped_count += 1
         
         return {
             'imported_count': imported_count,
@@ -1442,68 +1461,23 @@ class ZkDeviceAdmin(ModelAdmin):
             'missing_employees_count': len(missing_employees),
         }
     
-    def _import_attendance_to_database(self, attendance_data, device_map):
-        """Import attendance records to database"""
-        imported_count = 0
-        skipped_count = 0
-        error_count = 0
-        missing_employees = set()
-        errors = []
+    def _import_attendance_to_database(self, attendance_chunks, device_map):
+        """Import attendance records, given as lists of staged records, to database"""
+        devices_by_id = ZkDevice.objects.in_bulk(list(device_map.values()))
+        devices = {
+            ip: devices_by_id[device_id]
+            for ip, device_id in device_map.items()
+            if device_id in devices_by_id
+        }
         
-        with transaction.atomic():
-            for record_data in attendance_data:
-                try:
-                    device_ip = record_data['device_ip']
-                    device_id = device_map.get(device_ip)
-                    
-                    if not device_id:
-                        skipped_count += 1
-                        continue
-                    
-                    device = ZkDevice.objects.get(id=device_id)
-                    zkteco_id = record_data['zkteco_id']
-                    
-                    try:
-                        employee = Employee.objects.get(
-                            zkteco_id=zkteco_id,
-                            company=device.company
-                        )
-                    except Employee.DoesNotExist:
-                        missing_employees.add(zkteco_id)
-                        skipped_count += 1
-                        continue
-                    
-                    # Convert string timestamp back to datetime
-                    timestamp = datetime.fromisoformat(record_data['timestamp'])
-                    
-                    attendance_log, created = AttendanceLog.objects.get_or_create(
-                        device=device,
-                        employee=employee,
-                        timestamp=timestamp,
-                        defaults={
-                            'status_code': record_data.get('verify_type', 0),
-                            'punch_type': str(record_data.get('punch_type', 0)),
-                            'source_type': 'ZK',
-                        }
-                    )
-                    
-                    if created:
-                        imported_count += 1
-                    else:
-                        skipped_count += 1
-                        
-                except Exception as e:
-                    error_count += 1
-                    error_msg = f"Error importing record: {str(e)}"
-                    errors.append(error_msg)
-                    logger.error(error_msg)
+        result = import_attendance_log_chunks(attendance_chunks, devices, match_employee_id=False)
         
         return {
-            'imported_count': imported_count,
-            'skipped_count': skipped_count,
-            'error_count': error_count,
-            'missing_employees': list(missing_employees)[:10],
-            'errors': errors[:10],
+            'imported_count': result['imported'],
+            'skipped_count': result['duplicates'] + result['missing_employee'] + result['missing_device'],
+            'error_count': result['errors'],
+            'missing_employees': list(result['missing_employee_ids'])[:10],
+            'errors': result['error_messages'][:10],
         }
 
 @admin.register(AttendanceLog)
@@ -1620,7 +1594,7 @@ class AttendanceLogAdmin(CustomModelAdmin):
             context
         )
     def generate_attendance_execute_view(self, request):
-        """Direct implementation without importing external functions"""
+        """Queue attendance generation for the selected logs"""
         if request.method != 'POST':
             return JsonResponse({'error': 'Invalid request method'}, status=400)
         
@@ -1650,106 +1624,25 @@ class AttendanceLogAdmin(CustomModelAdmin):
                 return JsonResponse({'error': 'Could not determine company'}, status=400)
             
             # Get active configuration
-            config = AttendanceProcessorConfiguration.get_active_config(company)
-            if not config:
+            if not AttendanceProcessorConfiguration.get_rules(company):
                 return JsonResponse({'error': 'No active attendance configuration found'}, status=400)
             
-            config_dict = config.get_config_dict()
-            
-            # Initialize counters
-            created_count = 0
-            updated_count = 0
-            error_count = 0
-            
-            # Process each day in the range
-            current_date = start_date
-            while current_date <= end_date:
-                for employee in employees:
-                    try:
-                        # Get logs for this employee and date
-                        day_logs = logs.filter(
-                            employee=employee,
-                            timestamp__date=current_date
-                        ).order_by('timestamp')
-                        
-                        if not day_logs.exists():
-                            continue
-                        
-                        # Get first check-in and last check-out
-                        check_in = day_logs.first().timestamp if day_logs else None
-                        check_out = day_logs.last().timestamp if len(day_logs) > 1 else None
-                        
-                        # Skip if both are None
-                        if not check_in and not check_out:
-                            continue
-                        
-                        # Determine shift (simplified logic)
-                        shift = employee.default_shift
-                        
-                        # Calculate working hours
-                        working_hours = 0.0
-                        if check_in and check_out:
-                            total_seconds = (check_out - check_in).total_seconds()
-                            working_hours = round(total_seconds / 3600, 2)
-                        
-                        # Determine status (simplified)
-                        status = 'P' if working_hours > 0 else 'A'
-                        
-                        # Check if record already exists
-                        existing_attendance = Attendance.objects.filter(
-                            employee=employee,
-                            date=current_date
-                        ).first()
-                        
-                        if existing_attendance and not regenerate_existing:
-                            # Skip if exists and not regenerating
-                            continue
-                        
-                        # Create or update attendance record
-                        attendance_data = {
-                            'check_in_time': check_in,
-                            'check_out_time': check_out,
-                            'status': status,
-                            'overtime_hours': 0.0,  # Simplified
-                            'shift': shift,
-                        }
-                        
-                        if existing_attendance:
-                            # Update existing
-                            for field, value in attendance_data.items():
-                                setattr(existing_attendance, field, value)
-                            existing_attendance.save()
-                            updated_count += 1
-                        else:
-                            # Create new
-                            Attendance.objects.create(
-                                employee=employee,
-                                date=current_date,
-                                **attendance_data
-                            )
-                            created_count += 1
-                            
-                    except Exception as e:
-                        error_count += 1
-                        logger.error(f"Error processing {employee.name} on {current_date}: {str(e)}")
-                
-                current_date += timedelta(days=1)
+            # Generation runs in the attendance job worker; the page polls status_url
+            job = submit_job(company, 'log_generate', {
+                'log_ids': log_ids,
+                'start_date': start_date_str,
+                'end_date': end_date_str,
+                'regenerate_existing': regenerate_existing,
+            }, request.user)
             
             # Clear session data
             request.session.pop('generate_attendance_log_ids', None)
             
-            message = f'Successfully created {created_count} and updated {updated_count} attendance records'
-            if error_count > 0:
-                message += f' with {error_count} errors'
-            
             return JsonResponse({
                 'success': True,
-                'message': message,
-                'results': {
-                    'records_created': created_count,
-                    'records_updated': updated_count,
-                    'error_count': error_count
-                }
+                'job_id': job.id,
+                'status_url': reverse('zkteco:attendance_job_status', args=[job.id]),
+                'message': 'Attendance generation queued'
             })
                     
         except Exception as e:
@@ -1822,6 +1715,39 @@ class AttendanceAdmin(CustomModelAdmin):
         return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 
+@admin.register(AttendanceGenerationJob)
+class AttendanceGenerationJobAdmin(CustomModelAdmin):
+    list_display = (
+        'id', 'kind', 'status', 'company', 'processed_units', 'total_units',
+        'records_created', 'records_updated', 'error_count', 'created_by', 'created_at'
+    )
+    list_filter = ('kind', 'status', 'company', 'created_at')
+    search_fields = ('message', 'error', 'worker')
+    ordering = ('-created_at',)
+    list_select_related = ('company', 'created_by')
+    readonly_fields = (
+        'total_units', 'processed_units', 'records_created', 'records_updated',
+        'error_count', 'summary', 'result_file', 'message', 'error', 'worker',
+        'created_at', 'started_at', 'heartbeat_at', 'finished_at'
+    )
+
+
+@admin.register(ZkDeviceSyncRun)
+class ZkDeviceSyncRunAdmin(CustomModelAdmin):
+    list_display = (
+        'device', 'started_at', 'duration', 'success', 'timed_out', 'fetched',
+        'imported', 'duplicates', 'unmatched', 'cleared', 'worker'
+    )
+    list_filter = ('success', 'timed_out', 'device__company', 'started_at')
+    search_fields = ('device__name', 'device__ip_address', 'error', 'worker')
+    ordering = ('-started_at',)
+    list_select_related = ('device',)
+    readonly_fields = (
+        'device', 'worker', 'started_at', 'duration', 'success', 'timed_out', 'fetched',
+        'imported', 'duplicates', 'unmatched', 'cleared', 'error'
+    )
+
+
 @admin.register(AttendanceProcessorConfiguration)
 class AttendanceProcessorConfigurationAdmin(CustomModelAdmin):
     list_display = ['name', 'company', 'is_active', 'weekend_display', 'created_at']
@@ -0,0 +1,384 @@
+"""
+Synthetic attendance data and a benchmark harness for generation and reports.
+
+SyntheticAttendanceData fills a scratch database with one realistic company
+(departments, shifts, rosters, leaves, holidays and punch logs with
+configurable noise). AttendanceBenchmark times the preview, generation,
+admin log generation and report paths against such a company and returns
+wall time, query count and peak Python memory per phase.
+
+use_scratch_database switches the process to the scratch database first, so
+synthetic data never reaches the configured one.
+"""
+
+import logging
+import os
+import random
+import time as time_module
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.test import RequestFactory
+from django.utils import timezone
+
+from core.models import Company
+from . import attendance_parallel
+from .attendance_summary import rebuild_day_summaries
+from .models import (
+    Attendance, AttendanceGenerationJob, AttendanceLog, AttendanceProcessorConfiguration,
+    Department, Employee, Holiday, LeaveApplication, LeaveType, Roster, RosterAssignment,
+    RosterDay, Shift, ZkDevice,
+)
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_COMPANY_PREFIX = 'BENCH'
+
+BENCHMARK_PHASES = ('preview', 'generate', 'log_generate', 'reports')
+
+# (name, start, end, break minutes) of the synthetic shifts
+SYNTHETIC_SHIFTS = (
+    ('Morning', time(9, 0), time(17, 0), 60),
+    ('Evening', time(14, 0), time(22, 0), 30),
+    ('Night', time(22, 0), time(6, 0), 30),
+)
+
+
+def benchmark_company_code(employees, days, seed):
+    return f'{BENCHMARK_COMPANY_PREFIX}{employees}D{days}S{seed}'
+
+
+class SyntheticAttendanceData:
+    """
+    Build one synthetic company with employees and punch history.
+
+    All randomness comes from a seeded generator, so the same arguments
+    always produce the same data.
+    """
+
+    def __init__(self, employees, days, start_date, seed=0, noise_minutes=20,
+                 absent_rate=0.05, missing_out_rate=0.03, duplicate_rate=0.02,
+                 leave_rate=0.02, roster_share=0.2, departments=10, batch_size=5000):
+        self.employees = employees
+        self.days = days
+        self.start_date = start_date
+        self.end_date = start_date + timedelta(days=days - 1)
+        self.seed = seed
+        self.noise_minutes = noise_minutes
+        self.absent_rate = absent_rate
+        self.missing_out_rate = missing_out_rate
+        self.duplicate_rate = duplicate_rate
+        self.leave_rate = leave_rate
+        self.roster_share = roster_share
+        self.departments = departments
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+
+    def create(self):
+        """Create the company and all of its data, returning the company"""
+        code = benchmark_company_code(self.employees, self.days, self.seed)
+        with transaction.atomic():
+            company = Company.objects.create(company_code=code, name=f'Benchmark {code}')
+            self.config = AttendanceProcessorConfiguration.objects.create(
+                company=company,
+                name='Benchmark Configuration',
+                is_active=True,
+                enable_dynamic_shift_detection=True,
+            )
+            self.weekend_days = self.config.compile_rules().weekend_day_set
+            self.device = ZkDevice.objects.create(
+                company=company, name='Benchmark Device', ip_address='127.0.0.1'
+            )
+            self.shifts = [
+                Shift.objects.create(
+                    company=company, name=name, start_time=start, end_time=end, break_time=break_time
+                )
+                for name, start, end, break_time in SYNTHETIC_SHIFTS
+            ]
+            self.create_holidays(company)
+            employees = self.create_employees(company)
+            roster_shifts = self.create_rosters(company, employees)
+            leave_days = self.create_leaves(company, employees)
+
+        self.create_logs(employees, roster_shifts, leave_days)
+        # bulk_create skips the log signals, so build the report summaries here
+        rebuild_day_summaries(company)
+        return company
+
+    def create_holidays(self, company):
+        self.holidays = set()
+        for offset in range(self.random.randint(3, 10), self.days, 15):
+            holiday = self.start_date + timedelta(days=offset)
+            self.holidays.add(holiday)
+            Holiday.objects.create(company=company, name=f'Holiday {offset}', date=holiday)
+
+    def create_employees(self, company):
+        Department.objects.bulk_create([
+            Department(company=company, name=f'Department {i}', code=f'D{i:03d}')
+            for i in range(self.departments)
+        ])
+        departments = list(Department.objects.filter(company=company))
+        Employee.objects.bulk_create([
+            Employee(
+                company=company,
+                department=self.random.choice(departments),
+                employee_id=f'{company.company_code}-{i:06d}',
+                zkteco_id=f'{company.pk}{i + 1:06d}',
+                name=f'Employee {i}',
+                default_shift=self.random.choice(self.shifts) if self.random.random() < 0.6 else None,
+                base_salary=self.random.randrange(15000, 90000, 500),
+            )
+            for i in range(self.employees)
+        ], batch_size=self.batch_size)
+        return list(Employee.objects.filter(company=company).select_related('default_shift'))
+
+    def create_rosters(self, company, employees):
+        """Rotate a share of the employees through the shifts weekly"""
+        roster_shifts = {}
+        rostered = [e for e in employees if self.random.random() < self.roster_share]
+        if not rostered:
+            return roster_shifts
+
+        roster = Roster.objects.create(
+            company=company, name='Benchmark Roster',
+            start_date=self.start_date, end_date=self.end_date
+        )
+        RosterAssignment.objects.bulk_create([
+            RosterAssignment(roster=roster, employee=employee, shift=self.shifts[0])
+            for employee in rostered
+        ], batch_size=self.batch_size)
+        assignments = RosterAssignment.objects.filter(roster=roster).order_by('employee_id')
+
+        roster_days = []
+        for assignment in assignments:
+            first = self.random.randrange(len(self.shifts))
+            for offset in range(self.days):
+                shift = self.shifts[(first + offset // 7) % len(self.shifts)]
+                day = self.start_date + timedelta(days=offset)
+                roster_shifts[(assignment.employee_id, day)] = shift
+                roster_days.append(RosterDay(roster_assignment=assignment, date=day, shift=shift))
+            if len(roster_days) >= self.batch_size:
+                RosterDay.objects.bulk_create(roster_days)
+                roster_days = []
+        RosterDay.objects.bulk_create(roster_days)
+        return roster_shifts
+
+    def create_leaves(self, company, employees):
+        leave_type = LeaveType.objects.create(company=company, name='Casual', code='CL')
+        leave_days = set()
+        applications = []
+        for employee in employees:
+            if self.random.random() >= self.leave_rate * min(self.days, 30) / 3:
+                continue
+            start = self.start_date + timedelta(days=self.random.randrange(self.days))
+            end = min(start + timedelta(days=self.random.randint(0, 3)), self.end_date)
+            applications.append(LeaveApplication(
+                employee=employee, leave_type=leave_type,
+                start_date=start, end_date=end, status='A'
+            ))
+            for offset in range((end - start).days + 1):
+                leave_days.add((employee.id, start + timedelta(days=offset)))
+        LeaveApplication.objects.bulk_create(applications, batch_size=self.batch_size)
+        return leave_days
+
+    def create_logs(self, employees, roster_shifts, leave_days):
+        """Punches around each employee's shift, inserted in batches"""
+        pending = []
+        for employee in employees:
+            fallback_shift = self.random.choice(self.shifts)
+            for offset in range(self.days):
+                day = self.start_date + timedelta(days=offset)
+                if (employee.id, day) in leave_days or self.random.random() < self.absent_rate:
+                    continue
+                if (day.weekday() in self.weekend_days or day in self.holidays) and self.random.random() < 0.9:
+                    continue
+
+                shift = roster_shifts.get((employee.id, day)) or employee.default_shift or fallback_shift
+                pending.extend(self.day_punches(employee, day, shift))
+
+            if len(pending) >= self.batch_size:
+                AttendanceLog.objects.bulk_create(pending, batch_size=self.batch_size)
+                pending = []
+        AttendanceLog.objects.bulk_create(pending, batch_size=self.batch_size)
+
+    def day_punches(self, employee, day, shift):
+        check_in = timezone.make_aware(datetime.combine(day, shift.start_time))
+        check_out = timezone.make_aware(datetime.combine(day, shift.end_time))
+        if check_out <= check_in:
+            check_out += timedelta(days=1)
+
+        check_in += timedelta(minutes=self.random.gauss(0, self.noise_minutes))
+        check_out += timedelta(minutes=self.random.gauss(0, self.noise_minutes))
+        timestamps = [check_in]
+        if self.random.random() >= self.missing_out_rate:
+            timestamps.append(check_out)
+        if self.random.random() < self.duplicate_rate:
+            timestamps.append(check_in + timedelta(seconds=self.random.randint(5, 120)))
+
+        return [
+            AttendanceLog(device=self.device, employee=employee, timestamp=timestamp.replace(microsecond=0))
+            for timestamp in timestamps
+        ]
+
+
+def use_scratch_database(name):
+    """
+    Point the default connection at a scratch database (a file path for
+    SQLite) and migrate it. Generation workers follow the connection.
+    """
+    default = settings.DATABASES['default']
+    if os.path.abspath(name) == os.path.abspath(default['NAME']):
+        raise ValueError('The scratch database must not be the configured default database')
+
+    connections['default'].close()
+    default['NAME'] = name
+    connections['default'].settings_dict['NAME'] = name
+    # Keep cached rules and reports of the scratch companies apart from a shared cache
+    cache.key_prefix = f'{cache.key_prefix}benchmark:'
+    call_command('migrate', verbosity=0, interactive=False)
+
+
+def get_or_create_benchmark_company(employees, days, start_date, seed=0, fresh=False, **options):
+    """Reuse the synthetic company of these dimensions, creating it if needed"""
+    code = benchmark_company_code(employees, days, seed)
+    company = Company.objects.filter(company_code=code).first()
+    if company and fresh:
+        company.delete()
+        company = None
+    if company:
+        return company, False
+    return SyntheticAttendanceData(employees, days, start_date, seed=seed, **options).create(), True
+
+
+@contextmanager
+def generation_workers(workers):
+    """Temporarily set the process count used by generation jobs"""
+    previous = attendance_parallel.ATTENDANCE_GENERATION_WORKERS
+    attendance_parallel.ATTENDANCE_GENERATION_WORKERS = workers
+    try:
+        yield
+    finally:
+        attendance_parallel.ATTENDANCE_GENERATION_WORKERS = previous
+
+
+class QueryCounter:
+    """Database execute wrapper that counts queries without storing them"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class AttendanceBenchmark:
+    """Time the generation and report paths for one synthetic company"""
+
+    def __init__(self, company, start_date, days, workers=1, measure_memory=True):
+        self.company = company
+        self.start_date = start_date
+        self.end_date = start_date + timedelta(days=days - 1)
+        self.days = days
+        self.workers = workers
+        self.measure_memory = measure_memory
+        self.rules = AttendanceProcessorConfiguration.get_rules(company)
+        self.employee_count = Employee.objects.filter(company=company, is_active=True).count()
+
+    @property
+    def params(self):
+        return {
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat(),
+            'regenerate_existing': True,
+        }
+
+    def measure(self, phase, func):
+        """Run func once and return its metrics"""
+        counter = QueryCounter()
+        if self.measure_memory:
+            tracemalloc.start()
+        started = time_module.perf_counter()
+        try:
+            with connection.execute_wrapper(counter):
+                records = func()
+            elapsed = time_module.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] if self.measure_memory else None
+        finally:
+            if self.measure_memory:
+                tracemalloc.stop()
+
+        return {
+            'phase': phase,
+            'employees': self.employee_count,
+            'days': self.days,
+            'records': records,
+            'wall_seconds': round(elapsed, 4),
+            'queries': counter.count,
+            'peak_memory_bytes': peak,
+        }
+
+    def run(self, phases=BENCHMARK_PHASES):
+        return [self.measure(phase, getattr(self, f'run_{phase}')) for phase in phases]
+
+    def run_job(self, kind, params):
+        from .attendance_jobs import run_job
+
+        job = AttendanceGenerationJob.objects.create(
+            company=self.company, kind=kind, params=params, status='running'
+        )
+        job = run_job(job)
+        if job.status != 'completed':
+            raise RuntimeError(f'{kind} job failed: {job.error}')
+        if job.result_file:
+            os.remove(job.result_file)
+        return job
+
+    def run_preview(self):
+        with generation_workers(self.workers):
+            job = self.run_job('preview', self.params)
+        return job.summary['total_records']
+
+    def run_generate(self):
+        Attendance.objects.filter(
+            employee__company=self.company, date__range=[self.start_date, self.end_date]
+        ).delete()
+        with generation_workers(self.workers):
+            job = self.run_job('generate', self.params)
+        return job.records_created + job.records_updated
+
+    def run_log_generate(self):
+        log_ids = list(
+            AttendanceLog.objects.filter(
+                employee__company=self.company,
+                timestamp__date__range=[self.start_date, self.end_date]
+            ).values_list('id', flat=True)
+        )
+        job = self.run_job('log_generate', dict(self.params, log_ids=log_ids))
+        return job.records_created + job.records_updated
+
+    def run_reports(self):
+        """Daily and monthly CSV exports, bound to the benchmark company"""
+        from django.contrib.auth.models import AnonymousUser
+        from .views.attendance_log_reports import ExportAttendanceReportView
+
+        factory = RequestFactory()
+        requests = [
+            {'type': 'daily', 'date': self.start_date.isoformat()},
+            {'type': 'monthly', 'start_date': self.start_date.isoformat(),
+             'end_date': self.end_date.isoformat()},
+        ]
+        size = 0
+        for query in requests:
+            request = factory.get('/', query)
+            request.user = AnonymousUser()
+            view = ExportAttendanceReportView()
+            view.setup(request)
+            view.get_company = lambda request: self.company
+            size += sum(len(chunk) for chunk in view.get(request))
+        return size
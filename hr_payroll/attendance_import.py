@@ -0,0 +1,167 @@
+"""
+Bulk ingestion of device punches into AttendanceLog.
+
+A punch is identified by (employee, device, timestamp), which the database
+enforces as unique. Employees and devices are resolved once per call,
+repeated punches are dropped in memory, and the remaining rows are written
+with bulk_create(ignore_conflicts=True), so an import can be re-run, or
+race another import of the same punches, without creating duplicates.
+
+bulk_create does not send post_save, so the employee-days of the inserted
+punches are marked dirty explicitly for incremental attendance generation,
+and their day summaries refreshed, once the import commits. Imports of the
+same devices are serialized by locking the device rows, so the punches a
+call reports and marks as imported are exactly the ones it inserted.
+"""
+
+import logging
+from datetime import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .attendance_incremental import mark_logs_dirty
+from .models import AttendanceLog, Employee
+from .zkteco_sync import lock_devices, resolve_device_users
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement
+ATTENDANCE_IMPORT_BATCH_SIZE = 1000
+
+
+def parse_punch_timestamp(value):
+    """Aware datetime of a punch given as a datetime or an ISO 8601 string"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def resolve_zkteco_users(company_id, zkteco_ids):
+    """Map device user IDs to employee IDs by ZKTeco ID only"""
+    return dict(
+        Employee.objects.filter(
+            company_id=company_id, zkteco_id__in=set(zkteco_ids)
+        ).order_by('-pk').values_list('zkteco_id', 'id')
+    )
+
+
+def import_attendance_logs(records, devices, match_employee_id=True, source_type='ZK',
+                           batch_size=ATTENDANCE_IMPORT_BATCH_SIZE):
+    """
+    Store device punches, skipping the ones already stored.
+
+    records are dicts with zkteco_id, timestamp (datetime or ISO string),
+    device_ip and optionally punch_type and verify_type. devices maps device
+    IPs to ZkDevice objects; each punch is matched to an employee of its
+    device's company, by ZKTeco ID and, with match_employee_id, by employee
+    ID as a fallback.
+
+    Returns the counts of imported and duplicate punches, punches of
+    unknown employees or devices and invalid records, plus the unknown
+    device user IDs and the first error messages.
+    """
+    result = {
+        'imported': 0,
+        'duplicates': 0,
+        'missing_employee': 0,
+        'missing_device': 0,
+        'errors': 0,
+        'missing_employee_ids': set(),
+        'error_messages': [],
+    }
+
+    # Group the punches by company, since device user IDs are per company
+    by_company = {}
+    for record in records:
+        device = devices.get(record.get('device_ip'))
+        if not device:
+            result['missing_device'] += 1
+            continue
+        try:
+            timestamp = parse_punch_timestamp(record['timestamp'])
+            zkteco_id = str(record['zkteco_id'])
+        except (KeyError, TypeError, ValueError) as e:
+            result['errors'] += 1
+            result['error_messages'].append(f"Invalid record {record}: {str(e)}")
+            continue
+        by_company.setdefault(device.company_id, []).append((device, zkteco_id, timestamp, record))
+
+    punches = {}
+    for company_id, company_records in by_company.items():
+        zkteco_ids = {zkteco_id for _, zkteco_id, _, _ in company_records}
+        if match_employee_id:
+            employees = resolve_device_users(company_id, zkteco_ids)
+        else:
+            employees = resolve_zkteco_users(company_id, zkteco_ids)
+
+        for device, zkteco_id, timestamp, record in company_records:
+            employee_id = employees.get(zkteco_id)
+            if not employee_id:
+                result['missing_employee'] += 1
+                result['missing_employee_ids'].add(zkteco_id)
+                continue
+            key = (employee_id, device.id, timestamp)
+            if key in punches:
+                result['duplicates'] += 1
+                continue
+            punches[key] = record
+
+    if not punches:
+        return result
+
+    device_ids = {device_id for _, device_id, _ in punches}
+    timestamps = [timestamp for _, _, timestamp in punches]
+    window = AttendanceLog.objects.filter(
+        device_id__in=device_ids, timestamp__range=[min(timestamps), max(timestamps)]
+    )
+
+    with transaction.atomic():
+        lock_devices(device_ids)
+        existing = set(window.values_list('employee_id', 'device_id', 'timestamp'))
+        new_logs = [
+            AttendanceLog(
+                employee_id=employee_id,
+                device_id=device_id,
+                timestamp=timestamp,
+                status_code=record.get('verify_type') or 0,
+                punch_type=str(record.get('punch_type', 0)),
+                source_type=source_type,
+            )
+            for (employee_id, device_id, timestamp), record in punches.items()
+            if (employee_id, device_id, timestamp) not in existing
+        ]
+        AttendanceLog.objects.bulk_create(new_logs, batch_size=batch_size, ignore_conflicts=True)
+
+        # ignore_conflicts hides which rows were skipped, so read back what
+        # this call added to the window
+        added = set()
+        if new_logs:
+            added = set(window.values_list('employee_id', 'device_id', 'timestamp')) - existing
+        inserted = [
+            log for log in new_logs if (log.employee_id, log.device_id, log.timestamp) in added
+        ]
+        mark_logs_dirty(((log.employee_id, log.timestamp) for log in inserted), on_commit=True)
+
+    result['imported'] = len(inserted)
+    result['duplicates'] += len(punches) - len(inserted)
+    if result['error_messages']:
+        logger.warning(f"Skipped {result['errors']} invalid attendance record(s)")
+    return result
+
+
+def import_attendance_log_chunks(chunks, devices, **kwargs):
+    """import_attendance_logs over an iterable of record lists, with the results added up"""
+    total = None
+    for records in chunks:
+        result = import_attendance_logs(records, devices, **kwargs)
+        if total is None:
+            total = result
+            continue
+        for key in ('imported', 'duplicates', 'missing_employee', 'missing_device', 'errors'):
+            total[key] += result[key]
+        total['missing_employee_ids'] |= result['missing_employee_ids']
+        total['error_messages'].extend(result['error_messages'])
+    return total or import_attendance_logs([], devices, **kwargs)
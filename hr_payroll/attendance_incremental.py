@@ -0,0 +1,185 @@
+"""
+Incremental attendance regeneration.
+
+Changed AttendanceLog rows mark their (employee, work date) pairs in the
+AttendanceDirtyDay table; IncrementalAttendanceProcessor recomputes only
+those Attendance rows instead of a whole date range. The same pairs'
+AttendanceDaySummary rows are refreshed straight away.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .attendance_summary import refresh_day_summaries
+from .models import AttendanceDirtyDay, AttendanceProcessorConfiguration, Employee
+
+logger = logging.getLogger(__name__)
+
+# Dirty rows are cleared in slices to stay under backend parameter limits
+CLEAR_SLICE = 500
+
+
+def log_work_dates(timestamp):
+    """
+    Work dates a punch can be grouped under.
+
+    Generation filters logs by local date but groups them by the stored
+    (UTC) date, so both are marked when they differ.
+    """
+    dates = {timezone.localtime(timestamp).date()}
+    if timezone.is_aware(timestamp):
+        dates.add(timestamp.astimezone(dt_timezone.utc).date())
+    return dates
+
+
+def mark_dirty(pairs):
+    """Record (employee_id, work_date) pairs as needing regeneration"""
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    now = timezone.now()
+    rows = [
+        AttendanceDirtyDay(employee_id=employee_id, work_date=work_date, marked_at=now)
+        for employee_id, work_date in pairs
+    ]
+    # Re-marking refreshes marked_at so a run in progress does not clear it
+    if connection.features.supports_update_conflicts:
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ['employee', 'work_date']
+        AttendanceDirtyDay.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=unique_fields,
+            update_fields=['marked_at'], batch_size=1000
+        )
+    else:
+        AttendanceDirtyDay.objects.bulk_create(rows, ignore_conflicts=True, batch_size=1000)
+    return len(pairs)
+
+
+def mark_logs_dirty(logs, on_commit=False):
+    """
+    Mark the employee-days of (employee_id, timestamp) log values and
+    refresh their day summaries.
+
+    With on_commit the marks are written after the surrounding transaction
+    commits, skipping employees that no longer exist.
+    """
+    pairs = {
+        (employee_id, work_date)
+        for employee_id, timestamp in logs
+        if employee_id and timestamp
+        for work_date in log_work_dates(timestamp)
+    }
+    if not pairs:
+        return
+
+    if not on_commit:
+        mark_dirty(pairs)
+        refresh_day_summaries(pairs)
+        return
+
+    def write():
+        existing = set(
+            Employee.objects.filter(
+                id__in={employee_id for employee_id, _ in pairs}
+            ).values_list('id', flat=True)
+        )
+        mark_dirty(pair for pair in pairs if pair[0] in existing)
+        refresh_day_summaries(pair for pair in pairs if pair[0] in existing)
+
+    transaction.on_commit(write)
+
+
+class IncrementalAttendanceProcessor:
+    """
+    Recompute the Attendance rows of dirty employee-days.
+
+    Dirty pairs are grouped by company and date. Each date D is generated
+    over a [D, D + 1] window, which yields the same record for D as a full
+    range run, and only dirty pairs are written. Marks are cleared only if
+    they were not refreshed while the run was in progress.
+    """
+
+    def __init__(self, company=None, limit=None, batch_size=None):
+        self.company = company
+        self.limit = limit
+        self.batch_size = batch_size
+        self.days_processed = 0
+        self.records_created = 0
+        self.records_updated = 0
+        self.error_count = 0
+
+    def pending(self):
+        queryset = AttendanceDirtyDay.objects.all()
+        if self.company:
+            queryset = queryset.filter(employee__company=self.company)
+        return queryset
+
+    def run(self):
+        from .simple_attendance_generation_views import AttendanceBulkWriter
+
+        snapshot = timezone.now()
+        dirty = self.pending().filter(marked_at__lte=snapshot).order_by('work_date', 'employee_id')
+        if self.limit:
+            dirty = dirty[:self.limit]
+
+        dirty_ids = defaultdict(list)
+        by_company = defaultdict(lambda: defaultdict(set))
+        for dirty_id, employee_id, company_id, work_date in dirty.values_list(
+            'id', 'employee_id', 'employee__company_id', 'work_date'
+        ):
+            dirty_ids[company_id].append(dirty_id)
+            by_company[company_id][work_date].add(employee_id)
+
+        for company_id, dates in by_company.items():
+            if not self.process_company(company_id, dates, AttendanceBulkWriter):
+                continue
+
+            ids = dirty_ids[company_id]
+            for i in range(0, len(ids), CLEAR_SLICE):
+                AttendanceDirtyDay.objects.filter(
+                    id__in=ids[i:i + CLEAR_SLICE], marked_at__lte=snapshot
+                ).delete()
+        return self.results()
+
+    def process_company(self, company_id, dates, writer_class):
+        from core.models import Company
+        from .simple_attendance_generation_views import AttendanceGenerationEngine
+
+        company = Company.objects.get(pk=company_id)
+        rules = AttendanceProcessorConfiguration.get_rules(company)
+        if not rules:
+            logger.warning(f"Skipping dirty attendance for company {company_id}: no active configuration")
+            return False
+
+        writer = writer_class(company, batch_size=self.batch_size)
+        for work_date in sorted(dates):
+            employee_ids = dates[work_date]
+            engine = AttendanceGenerationEngine(
+                company, rules, work_date, work_date + timedelta(days=1),
+                employee_ids=sorted(employee_ids), regenerate_existing=True,
+            )
+            with transaction.atomic():
+                for record in engine.iter_records():
+                    if record['date'] == work_date.isoformat():
+                        writer.add(record)
+                writer.flush()
+            self.days_processed += len(employee_ids)
+
+        self.records_created += writer.created_count
+        self.records_updated += writer.updated_count
+        self.error_count += writer.error_count
+        return True
+
+    def results(self):
+        return {
+            'days_processed': self.days_processed,
+            'records_created': self.records_created,
+            'records_updated': self.records_updated,
+            'error_count': self.error_count,
+        }
@@ -0,0 +1,350 @@
+"""
+Database-backed job runner for attendance generation.
+
+Views submit jobs with submit_job(); the run_attendance_jobs management
+command claims queued jobs and runs them, writing progress counters that the
+job status endpoint exposes for polling. No broker is needed - the
+AttendanceGenerationJob table is the queue.
+"""
+
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Attendance, AttendanceGenerationJob, AttendanceLog, Employee
+
+logger = logging.getLogger(__name__)
+
+JOB_RESULTS_DIR = os.path.join(settings.MEDIA_ROOT, 'attendance_jobs')
+
+# Seconds between progress writes while a job is running
+PROGRESS_INTERVAL = 2.0
+
+# Selected log IDs are loaded in slices to stay under backend parameter limits
+LOG_ID_SLICE = 500
+
+# Job fields a handler may set, written when the job finishes
+JOB_OUTCOME_FIELDS = [
+    'status', 'total_units', 'processed_units', 'records_created', 'records_updated',
+    'error_count', 'summary', 'result_file', 'message', 'error', 'heartbeat_at', 'finished_at',
+]
+
+
+class JobLost(Exception):
+    """The running job was requeued or claimed by another worker"""
+
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def submit_job(company, kind, params, user=None):
+    """Queue a generation job"""
+    return AttendanceGenerationJob.objects.create(
+        company=company,
+        kind=kind,
+        params=params,
+        created_by=user if user is not None and user.is_authenticated else None,
+    )
+
+
+def claim_next_job(worker_name):
+    """
+    Claim the oldest queued job.
+
+    The claim is a conditional UPDATE on status, so two workers can never
+    run the same job regardless of database backend.
+    """
+    queued_ids = (
+        AttendanceGenerationJob.objects.filter(status='queued')
+        .order_by('created_at')
+        .values_list('id', flat=True)[:10]
+    )
+    for job_id in queued_ids:
+        now = timezone.now()
+        claimed = AttendanceGenerationJob.objects.filter(id=job_id, status='queued').update(
+            status='running', worker=worker_name, started_at=now, heartbeat_at=now
+        )
+        if claimed:
+            return AttendanceGenerationJob.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale_jobs(stale_after):
+    """Put running jobs whose worker stopped heart-beating back in the queue"""
+    cutoff = timezone.now() - stale_after
+    return AttendanceGenerationJob.objects.filter(
+        status='running', heartbeat_at__lt=cutoff
+    ).update(status='queued', worker='', processed_units=0)
+
+
+def cleanup_job_results(retention):
+    """Delete result files of finished jobs older than the retention period"""
+    cutoff = timezone.now() - retention
+    jobs = AttendanceGenerationJob.objects.filter(
+        finished_at__lt=cutoff
+    ).exclude(result_file='')
+
+    count = 0
+    for job in jobs:
+        try:
+            os.remove(job.result_file)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove job result {job.result_file}: {e}")
+            continue
+        job.result_file = ''
+        job.save(update_fields=['result_file'])
+        count += 1
+    return count
+
+
+class JobProgress:
+    """
+    Throttled progress writer for a running job. Each write is also the
+    job's heartbeat; it raises JobLost once the job is no longer running
+    under this worker, so a requeued job stops instead of running twice.
+    """
+
+    def __init__(self, job, interval=PROGRESS_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self._last_write = 0.0
+
+    def set_total(self, total_units):
+        self.job.total_units = total_units
+        self.save()
+
+    def advance(self, units):
+        self.job.processed_units += units
+        if time.monotonic() - self._last_write >= self.interval:
+            self.save()
+
+    def save(self):
+        self._last_write = time.monotonic()
+        updated = owned_job(self.job).update(
+            total_units=self.job.total_units,
+            processed_units=self.job.processed_units,
+            records_created=self.job.records_created,
+            records_updated=self.job.records_updated,
+            error_count=self.job.error_count,
+            heartbeat_at=timezone.now(),
+        )
+        if not updated:
+            raise JobLost(f'Job {self.job.pk} is no longer run by {self.job.worker!r}')
+
+
+def owned_job(job):
+    """The job's row while it is still running under the worker that claimed it"""
+    return AttendanceGenerationJob.objects.filter(pk=job.pk, worker=job.worker, status='running')
+
+
+# ==================== JOB HANDLERS ====================
+
+def _build_engine(job):
+    from .simple_attendance_generation_views import AttendanceGenerationEngine
+    from .models import AttendanceProcessorConfiguration
+    from .attendance_parallel import ATTENDANCE_GENERATION_WORKERS
+
+    rules = AttendanceProcessorConfiguration.get_rules(job.company)
+    if not rules:
+        raise ValueError('No active configuration found')
+    return AttendanceGenerationEngine.from_params(
+        job.company, rules, job.params, workers=ATTENDANCE_GENERATION_WORKERS
+    )
+
+
+def run_preview_job(job, progress):
+    """Compute a preview and store its records as NDJSON on disk"""
+    from .simple_attendance_generation_views import finalize_summary
+
+    engine = _build_engine(job)
+    progress.set_total(len(engine.employee_ids) * engine.total_days)
+
+    os.makedirs(JOB_RESULTS_DIR, exist_ok=True)
+    path = os.path.join(JOB_RESULTS_DIR, f'job_{job.pk}.ndjson')
+
+    with open(path, 'w', encoding='utf-8') as result_file:
+        for chunk_ids, records in engine.iter_chunk_records():
+            for record in records:
+                result_file.write(json.dumps(record) + '\n')
+            progress.advance(len(chunk_ids) * engine.total_days)
+
+    summary = finalize_summary(engine.summary)
+    job.result_file = path
+    job.summary = summary
+    job.message = f"Successfully generated {summary['total_records']} preview records"
+
+
+def iter_job_records(job):
+    """The records a finished preview job stored, in order"""
+    with open(job.result_file, encoding='utf-8') as result_file:
+        for line in result_file:
+            yield json.loads(line)
+
+
+def run_generate_job(job, progress):
+    """Generate and write attendance records, committing per employee chunk"""
+    from .simple_attendance_generation_views import AttendanceBulkWriter, finalize_summary
+
+    engine = _build_engine(job)
+    progress.set_total(len(engine.employee_ids) * engine.total_days)
+    writer = AttendanceBulkWriter(job.company, batch_size=job.params.get('batch_size'))
+
+    for chunk_ids, records in engine.iter_chunk_records():
+        with transaction.atomic():
+            for record in records:
+                writer.add(record)
+            writer.flush()
+
+        job.records_created = writer.created_count
+        job.records_updated = writer.updated_count
+        job.error_count = writer.error_count
+        progress.advance(len(chunk_ids) * engine.total_days)
+
+    job.summary = finalize_summary(engine.summary)
+    job.message = f'Generated {writer.created_count}, Updated {writer.updated_count}'
+    if writer.error_count > 0:
+        job.message += f', Errors {writer.error_count}'
+
+
+def run_log_generate_job(job, progress):
+    """
+    Generate attendance from a selection of AttendanceLog rows.
+
+    Each employee-day with selected logs becomes one record: first punch as
+    check-in, last punch as check-out, present when any time was worked.
+    Records are committed per write batch.
+    """
+    from .simple_attendance_generation_views import AttendanceBulkWriter
+
+    params = job.params
+    log_ids = params.get('log_ids', [])
+    start_date = datetime.strptime(params['start_date'], '%Y-%m-%d').date()
+    end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+    regenerate_existing = params.get('regenerate_existing', False)
+
+    day_punches = defaultdict(list)
+    for i in range(0, len(log_ids), LOG_ID_SLICE):
+        punches = AttendanceLog.objects.filter(
+            id__in=log_ids[i:i + LOG_ID_SLICE],
+            timestamp__date__range=[start_date, end_date]
+        ).values_list('employee_id', 'timestamp')
+        for employee_id, timestamp in punches:
+            day_punches[(employee_id, timezone.localtime(timestamp).date())].append(timestamp)
+
+    employee_ids = {key[0] for key in day_punches}
+    default_shift_ids = dict(
+        Employee.objects.filter(id__in=employee_ids).values_list('id', 'default_shift_id')
+    )
+    existing_keys = set()
+    if not regenerate_existing:
+        existing_keys = set(
+            Attendance.objects.filter(
+                employee_id__in=employee_ids,
+                date__range=[start_date, end_date]
+            ).values_list('employee_id', 'date')
+        )
+
+    progress.set_total(len(day_punches))
+    writer = AttendanceBulkWriter(job.company, batch_size=params.get('batch_size'))
+
+    day_items = sorted(day_punches.items())
+    for start in range(0, len(day_items), writer.batch_size):
+        batch = day_items[start:start + writer.batch_size]
+        with transaction.atomic():
+            for (employee_id, day), timestamps in batch:
+                if (employee_id, day) in existing_keys:
+                    continue
+
+                timestamps.sort()
+                check_in = timestamps[0]
+                check_out = timestamps[-1] if len(timestamps) > 1 else None
+
+                working_hours = 0.0
+                if check_in and check_out:
+                    working_hours = round((check_out - check_in).total_seconds() / 3600, 2)
+
+                writer.add_attendance(Attendance(
+                    employee_id=employee_id,
+                    date=day,
+                    check_in_time=check_in,
+                    check_out_time=check_out,
+                    status='P' if working_hours > 0 else 'A',
+                    overtime_hours=0,
+                    shift_id=default_shift_ids.get(employee_id),
+                ))
+            writer.flush()
+
+        # Progress is written after the batch commits so other workers see it
+        job.records_created = writer.created_count
+        job.records_updated = writer.updated_count
+        job.error_count = writer.error_count
+        progress.advance(len(batch))
+
+    job.message = (
+        f'Successfully created {writer.created_count} and updated '
+        f'{writer.updated_count} attendance records'
+    )
+    if writer.error_count > 0:
+        job.message += f' with {writer.error_count} errors'
+
+
+def run_rebuild_summaries_job(job, progress):
+    """Rebuild the day summaries of the company, or of the employees in the params"""
+    from .attendance_summary import rebuild_day_summaries
+
+    written = rebuild_day_summaries(
+        job.company, employee_ids=job.params.get('employee_ids'), progress=progress
+    )
+    job.records_created = written
+    job.message = f'Rebuilt {written} day summaries'
+
+
+JOB_HANDLERS = {
+    'preview': run_preview_job,
+    'generate': run_generate_job,
+    'log_generate': run_log_generate_job,
+    'rebuild_summaries': run_rebuild_summaries_job,
+}
+
+
+def run_job(job):
+    """
+    Run a claimed job to completion and record its outcome.
+
+    The outcome is only written while the job is still running under this
+    worker; a job requeued as stale meanwhile keeps the state of its new
+    run, which is returned instead.
+    """
+    progress = JobProgress(job)
+    try:
+        JOB_HANDLERS[job.kind](job, progress)
+        job.status = 'completed'
+    except JobLost as e:
+        logger.warning(f"Attendance job {job.pk} stopped: {str(e)}")
+        job.refresh_from_db()
+        return job
+    except Exception as e:
+        logger.error(f"Attendance job {job.pk} failed: {str(e)}", exc_info=True)
+        job.status = 'failed'
+        job.error = str(e)
+
+    job.finished_at = timezone.now()
+    job.heartbeat_at = job.finished_at
+    finished = owned_job(job).update(
+        **{field: getattr(job, field) for field in JOB_OUTCOME_FIELDS}
+    )
+    if not finished:
+        logger.warning(f"Attendance job {job.pk} was requeued before it finished; outcome dropped")
+        job.refresh_from_db()
+    return job
@@ -0,0 +1,299 @@
+"""
+Batch attendance calculation kernel.
+
+Computes working hours, overtime, status and late/early-out flags for a
+batch of employee-days from columnar inputs in one pass. NumPy is used when
+it is installed; otherwise the same arithmetic runs as a plain loop.
+
+Both paths give identical results: instants are integer epoch
+microseconds so differences are exact, and hours are rounded with Python's
+round() in either case (numpy.round rounds differently at some .xx5 values).
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+US_PER_SECOND = 1000000
+US_PER_MINUTE = 60 * US_PER_SECOND
+US_PER_DAY = 24 * 60 * US_PER_MINUTE
+EPOCH_ORDINAL = EPOCH.date().toordinal()
+
+COLUMNS = (
+    'check_in',         # epoch microseconds, None when missing
+    'check_out',        # epoch microseconds, None when missing
+    'check_in_day',     # epoch microseconds of the midnight shift start is anchored to
+    'check_out_day',    # epoch microseconds of the midnight shift end is anchored to
+    'shift_start',      # seconds since midnight, None without a shift
+    'shift_end',        # seconds since midnight, None without a shift
+    'break_minutes',
+    'grace_minutes',
+    'expected_hours',
+    'is_weekend',
+    'is_holiday',
+    'has_leave',
+)
+
+
+def to_epoch_us(value):
+    """Aware datetime to integer epoch microseconds"""
+    if value is None:
+        return None
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def from_epoch_us(value):
+    """Integer epoch microseconds to an aware UTC datetime"""
+    return EPOCH + timedelta(microseconds=value)
+
+
+def time_to_seconds(value):
+    """Seconds since midnight of a time, None passes through"""
+    if value is None:
+        return None
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+class DayBatch:
+    """Columnar inputs for a batch of employee-days"""
+
+    def __init__(self):
+        for name in COLUMNS:
+            setattr(self, name, [])
+
+    def append(self, **values):
+        for name in COLUMNS:
+            getattr(self, name).append(values[name])
+
+    def __len__(self):
+        return len(self.check_in)
+
+
+class KernelRules:
+    """Configuration values the kernel reads, looked up once per batch"""
+
+    def __init__(self, config):
+        self.break_deduction_method = config.get('break_deduction_method', 'fixed')
+        self.holiday_overtime_full_day = bool(config.get('holiday_overtime_full_day'))
+        self.weekend_overtime_full_day = bool(config.get('weekend_overtime_full_day'))
+        self.overtime_start_hours = config.get('overtime_start_after_minutes', 15) / 60
+        self.minimum_overtime_hours = config.get('minimum_overtime_minutes', 60) / 60
+        self.separate_ot_break_minutes = config.get('separate_ot_break_time', 0)
+        self.early_out_threshold_minutes = config.get('early_out_threshold_minutes', 30)
+        self.require_both_in_and_out = bool(config.get('require_both_in_and_out'))
+        self.enable_minimum_working_hours_rule = bool(config.get('enable_minimum_working_hours_rule'))
+        self.minimum_working_hours_for_present = config.get('minimum_working_hours_for_present', 4.0)
+        self.enable_maximum_working_hours_rule = bool(config.get('enable_maximum_working_hours_rule'))
+        self.maximum_allowable_working_hours = config.get('maximum_allowable_working_hours', 16.0)
+        self.enable_working_hours_half_day_rule = bool(config.get('enable_working_hours_half_day_rule'))
+        self.half_day_minimum_hours = config.get('half_day_minimum_hours', 4.0)
+        self.half_day_maximum_hours = config.get('half_day_maximum_hours', 6.0)
+
+
+def compute_day_batch(batch, config, use_numpy=None):
+    """
+    Calculate a batch of employee-days.
+
+    Returns a dict of equal-length lists: working_hours, overtime_hours,
+    status, is_late and is_early_out.
+    """
+    rules = config if isinstance(config, KernelRules) else KernelRules(config)
+    if use_numpy is None:
+        use_numpy = NUMPY_AVAILABLE
+    if not len(batch):
+        return {'working_hours': [], 'overtime_hours': [], 'status': [],
+                'is_late': [], 'is_early_out': []}
+    if use_numpy:
+        return _compute_numpy(batch, rules)
+    return _compute_python(batch, rules)
+
+
+def _compute_python(batch, rules):
+    working_hours = []
+    overtime_hours = []
+    statuses = []
+    late_flags = []
+    early_flags = []
+
+    for i in range(len(batch)):
+        check_in = batch.check_in[i]
+        check_out = batch.check_out[i]
+        shift_start = batch.shift_start[i]
+        shift_end = batch.shift_end[i]
+        is_weekend = batch.is_weekend[i]
+        is_holiday = batch.is_holiday[i]
+
+        # Working hours
+        if check_in is None or check_out is None:
+            hours = 0.0
+        else:
+            total_hours = (check_out - check_in) / US_PER_SECOND / 3600
+            if rules.break_deduction_method == 'fixed' or total_hours > 4:
+                hours = max(0.0, total_hours - batch.break_minutes[i] / 60)
+            else:
+                hours = total_hours
+        hours = round(hours, 2)
+
+        # Overtime
+        if (is_holiday and rules.holiday_overtime_full_day) or \
+                (is_weekend and rules.weekend_overtime_full_day):
+            overtime = hours
+        else:
+            overtime = max(0.0, hours - batch.expected_hours[i] - rules.overtime_start_hours)
+            if overtime < rules.minimum_overtime_hours:
+                overtime = 0.0
+            if rules.separate_ot_break_minutes > 0 and overtime > 0:
+                overtime = max(0.0, overtime - rules.separate_ot_break_minutes / 60)
+            overtime = round(overtime, 2)
+
+        # Status
+        if is_weekend:
+            status = 'W'
+        elif is_holiday:
+            status = 'H'
+        elif batch.has_leave[i]:
+            status = 'L'
+        elif check_in is None and check_out is None:
+            status = 'A'
+        elif rules.require_both_in_and_out and (check_in is None or check_out is None):
+            status = 'A'
+        elif rules.enable_minimum_working_hours_rule and hours < rules.minimum_working_hours_for_present:
+            status = 'A'
+        else:
+            if rules.enable_maximum_working_hours_rule and hours > rules.maximum_allowable_working_hours:
+                logger.warning(f"Excessive working hours: {hours}")
+            if rules.enable_working_hours_half_day_rule and \
+                    rules.half_day_minimum_hours <= hours <= rules.half_day_maximum_hours:
+                status = 'HD'
+            else:
+                status = 'P'
+
+        # Late and early out
+        is_late = False
+        if check_in is not None and shift_start is not None:
+            grace_end = (batch.check_in_day[i] + shift_start * US_PER_SECOND
+                         + batch.grace_minutes[i] * US_PER_MINUTE)
+            is_late = check_in > grace_end
+
+        is_early_out = False
+        if check_out is not None and shift_end is not None:
+            end = batch.check_out_day[i] + shift_end * US_PER_SECOND
+            if shift_end < shift_start:
+                end += US_PER_DAY
+            is_early_out = check_out < end - rules.early_out_threshold_minutes * US_PER_MINUTE
+
+        working_hours.append(hours)
+        overtime_hours.append(overtime)
+        statuses.append(status)
+        late_flags.append(is_late)
+        early_flags.append(is_early_out)
+
+    return {
+        'working_hours': working_hours,
+        'overtime_hours': overtime_hours,
+        'status': statuses,
+        'is_late': late_flags,
+        'is_early_out': early_flags,
+    }
+
+
+def _column(values, fill=np.nan if NUMPY_AVAILABLE else None):
+    """Float array with None replaced by fill; epoch microseconds stay exact below 2**53"""
+    return np.array([fill if v is None else v for v in values], dtype=np.float64)
+
+
+def _round_array(values):
+    return np.array([round(v, 2) for v in values.tolist()], dtype=np.float64)
+
+
+def _compute_numpy(batch, rules):
+    check_in = _column(batch.check_in)
+    check_out = _column(batch.check_out)
+    shift_start = _column(batch.shift_start)
+    shift_end = _column(batch.shift_end)
+    break_minutes = _column(batch.break_minutes, 0)
+    grace_minutes = _column(batch.grace_minutes, 0)
+    expected_hours = _column(batch.expected_hours)
+    is_weekend = np.array(batch.is_weekend, dtype=bool)
+    is_holiday = np.array(batch.is_holiday, dtype=bool)
+    has_leave = np.array(batch.has_leave, dtype=bool)
+
+    has_in = ~np.isnan(check_in)
+    has_out = ~np.isnan(check_out)
+    has_shift = ~np.isnan(shift_start)
+    both = has_in & has_out
+
+    # Working hours
+    with np.errstate(invalid='ignore'):
+        total_hours = np.where(both, (check_out - check_in) / US_PER_SECOND / 3600, 0.0)
+    deducted = np.maximum(0.0, total_hours - break_minutes / 60)
+    if rules.break_deduction_method == 'fixed':
+        hours = np.where(both, deducted, 0.0)
+    else:
+        hours = np.where(both & (total_hours > 4), deducted, total_hours)
+    hours = _round_array(hours)
+
+    # Overtime
+    overtime = np.maximum(0.0, hours - expected_hours - rules.overtime_start_hours)
+    overtime = np.where(overtime < rules.minimum_overtime_hours, 0.0, overtime)
+    if rules.separate_ot_break_minutes > 0:
+        overtime = np.where(
+            overtime > 0,
+            np.maximum(0.0, overtime - rules.separate_ot_break_minutes / 60),
+            overtime
+        )
+    overtime = _round_array(overtime)
+    full_day = np.zeros(len(batch), dtype=bool)
+    if rules.holiday_overtime_full_day:
+        full_day |= is_holiday
+    if rules.weekend_overtime_full_day:
+        full_day |= is_weekend
+    overtime = np.where(full_day, hours, overtime)
+
+    # Status: the first matching condition wins, as in the plain loop
+    conditions = [
+        is_weekend,
+        is_holiday,
+        has_leave,
+        ~has_in & ~has_out,
+        rules.require_both_in_and_out & ~both,
+        rules.enable_minimum_working_hours_rule & (hours < rules.minimum_working_hours_for_present),
+    ]
+    decided = np.logical_or.reduce(conditions)
+    if rules.enable_maximum_working_hours_rule:
+        for value in hours[~decided & (hours > rules.maximum_allowable_working_hours)].tolist():
+            logger.warning(f"Excessive working hours: {value}")
+    if rules.enable_working_hours_half_day_rule:
+        conditions.append(
+            (rules.half_day_minimum_hours <= hours) & (hours <= rules.half_day_maximum_hours)
+        )
+    choices = ['W', 'H', 'L', 'A', 'A', 'A', 'HD'][:len(conditions)]
+    status = np.select(conditions, choices, default='P')
+
+    # Late and early out
+    with np.errstate(invalid='ignore'):
+        grace_end = (_column(batch.check_in_day) + shift_start * US_PER_SECOND
+                     + grace_minutes * US_PER_MINUTE)
+        is_late = has_in & has_shift & (check_in > grace_end)
+
+        shift_end_at = _column(batch.check_out_day) + shift_end * US_PER_SECOND
+        shift_end_at = np.where(shift_end < shift_start, shift_end_at + US_PER_DAY, shift_end_at)
+        is_early_out = has_out & has_shift & (
+            check_out < shift_end_at - rules.early_out_threshold_minutes * US_PER_MINUTE
+        )
+
+    return {
+        'working_hours': hours.tolist(),
+        'overtime_hours': overtime.tolist(),
+        'status': status.tolist(),
+        'is_late': is_late.tolist(),
+        'is_early_out': is_early_out.tolist(),
+    }
@@ -18,6 +18,12 @@ from datetime import datetime
 
 from .models import AttendanceLog, Employee, ZkDevice, Location
 from .zkteco_device_manager import ZKTecoDeviceManager
+from .zkteco_pool import device_pool
+from .zkteco_sync import map_device_users, stored_log_keys
+from .attendance_import import import_attendance_log_chunks
+from .device_fetch_staging import (
+    discard_fetch, get_fetch, iter_staged_chunks, remember_fetch, stage_records,
+)
 from core.models import Company
 
 logger = logging.getLogger(__name__)
@@ -441,35 +447,39 @@ class FetchAttendanceDataView(LoginRequiredMixin, CompanyAccessMixin, View):
             end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
             
             # Use the device manager directly
-            device_manager = ZKTecoDeviceManager()
+            device_manager = ZKTecoDeviceManager(pool=device_pool)
             attendance_data, fetch_results = device_manager.get_multiple_attendance_data(
                 device_list, start_date_obj, end_date_obj
             )
             
+            # Resolve employees and already imported punches once, then classify in memory
+            employees = map_device_users(self.company, (r['zkteco_id'] for r in attendance_data))
+            timestamps = [
+                timezone.make_aware(r['timestamp']) if timezone.is_naive(r['timestamp']) else r['timestamp']
+                for r in attendance_data
+            ]
+            matched = [
+                timestamp for record, timestamp in zip(attendance_data, timestamps)
+                if record['zkteco_id'] in employees
+            ]
+            existing_keys = stored_log_keys(self.company, min(matched), max(matched)) if matched else set()
+            
             # Process and format the data with duplicate checking
             formatted_data = []
-            for record in attendance_data:
-                # Find matching employee
-                employee = Employee.objects.filter(
-                    Q(zkteco_id=record['zkteco_id']) | Q(employee_id=record['zkteco_id']),
-                    company=self.company
-                ).first()
+            for record, timestamp in zip(attendance_data, timestamps):
+                employee = employees.get(record['zkteco_id'])
                 
                 # Check if already imported (duplicate check)
                 is_imported = False
                 if employee:
-                    is_imported = AttendanceLog.objects.filter(
-                        employee=employee,
-                        timestamp=record['timestamp'],
-                        device__ip_address=record['device_ip']
-                    ).exists()
+                    is_imported = (employee['id'], timestamp, record['device_ip']) in existing_keys
                 
                 formatted_record = {
                     'device_name': record['device_name'],
                     'device_ip': record['device_ip'],
                     'zkteco_id': record['zkteco_id'],
-                    'employee_id': employee.employee_id if employee else record['zkteco_id'],
-                    'employee_name': employee.name if employee else 'Unknown Employee',
+                    'employee_id': employee['employee_id'] if employee else record['zkteco_id'],
+                    'employee_name': employee['name'] if employee else 'Unknown Employee',
                     'timestamp': record['timestamp'].strftime('%Y-%m-%d %H:%M:%S'),
                     'date': record['timestamp'].strftime('%Y-%m-%d'),
                     'time': record['timestamp'].strftime('%H:%M:%S'),
@@ -486,11 +496,11 @@ class FetchAttendanceDataView(LoginRequiredMixin, CompanyAccessMixin, View):
             # Sort by timestamp (newest first)
             formatted_data.sort(key=lambda x: x['raw_timestamp'], reverse=True)
             
-            # Store in session for import (only importable records)
-            session_data = []
+            # Stage the importable records server-side; the session keeps only the token
+            staged_data = []
             for record in formatted_data:
                 if record['can_import']:
-                    session_record = {
+                    staged_record = {
                         'zkteco_id': record['zkteco_id'],
                         'timestamp': record['raw_timestamp'].isoformat(),
                         'device_ip': record['device_ip'],
@@ -498,12 +508,14 @@ class FetchAttendanceDataView(LoginRequiredMixin, CompanyAccessMixin, View):
                         'verify_type': record['verify_type'],
                         'source_type': record['source_type']
                     }
-                    session_data.append(session_record)
+                    staged_data.append(staged_record)
             
-            request.session['fetched_attendance_data'] = session_data
+            fetch = stage_records('attendance', staged_data, company=self.company, user=request.user)
+            remember_fetch(request.session, 'fetched_attendance_token', fetch)
             
             return JsonResponse({
                 'success': True,
+                'fetch_token': str(fetch.token),
                 'data': formatted_data,
                 'total_records': len(formatted_data),
                 'new_records': len([r for r in formatted_data if r['can_import']]),
@@ -531,11 +543,6 @@ class ImportAttendanceDataView(LoginRequiredMixin, CompanyAccessMixin, View):
             selected_indices = data.get('selected_indices', [])
             import_all = data.get('import_all', False)
             
-            fetched_data = request.session.get('fetched_attendance_data', [])
-            
-            if not fetched_data:
-                return JsonResponse({'success': False, 'error': 'No data to import. Please fetch data first.'})
-            
             # Use company from mixin
             if not self.company:
                 return JsonResponse({
@@ -543,70 +550,33 @@ class ImportAttendanceDataView(LoginRequiredMixin, CompanyAccessMixin, View):
                     'error': 'No company access found. Please ensure your user account is linked to an employee record.'
                 })
             
-            if import_all:
-                records_to_import = fetched_data
-            else:
-                if not selected_indices:
-                    return JsonResponse({'success': False, 'error': 'No records selected for import'})
-                records_to_import = [fetched_data[i] for i in selected_indices if i < len(fetched_data)]
-            
-            imported_count = 0
-            duplicate_count = 0
-            error_count = 0
-            missing_employee_count = 0
-            
-            with transaction.atomic():
-                for record in records_to_import:
-                    try:
-                        # Find employee
-                        employee = Employee.objects.filter(
-                            Q(zkteco_id=record['zkteco_id']) | Q(employee_id=record['zkteco_id']),
-                            company=self.company
-                        ).first()
-                        
-                        if not employee:
-                            missing_employee_count += 1
-                            continue
-                        
-                        # Find device
-                        device = ZkDevice.objects.filter(
-                            ip_address=record['device_ip'], 
-                            company=self.company
-                        ).first()
-                        
-                        # Convert timestamp back to datetime
-                        timestamp = datetime.fromisoformat(record['timestamp'].replace('Z', '+00:00'))
-                        if timestamp.tzinfo is None:
-                            timestamp = timezone.make_aware(timestamp)
-                        
-                        # Final duplicate check
-                        existing = AttendanceLog.objects.filter(
-                            employee=employee,
-                            timestamp=timestamp,
-                            device=device
-                        ).exists()
-                        
-                        if existing:
-                            duplicate_count += 1
-                            continue
-                        
-                        # Create attendance log
-                        AttendanceLog.objects.create(
-                            employee=employee,
-                            device=device,
-                            timestamp=timestamp,
-                            source_type=record.get('source_type', 'device')
-                        )
-                        
-                        imported_count += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error importing record {record}: {str(e)}")
-                        error_count += 1
-            
-            # Clear session data after successful import
-            if 'fetched_attendance_data' in request.session:
-                del request.session['fetched_attendance_data']
+            token = data.get('fetch_token') or request.session.get('fetched_attendance_token')
+            fetch = get_fetch(token, 'attendance', company=self.company, user=request.user)
+            
+            if not fetch or not fetch.record_count:
+                return JsonResponse({'success': False, 'error': 'No data to import. Please fetch data first.'})
+            
+            if not import_all and not selected_indices:
+                return JsonResponse({'success': False, 'error': 'No records selected for import'})
+            
+            devices = {
+                device.ip_address: device
+                for device in ZkDevice.objects.filter(company=self.company)
+            }
+            result = import_attendance_log_chunks(
+                iter_staged_chunks(fetch, None if import_all else selected_indices), devices
+            )
+            
+            imported_count = result['imported']
+            duplicate_count = result['duplicates']
+            error_count = result['errors'] + result['missing_device']
+            missing_employee_count = result['missing_employee']
+            for message in result['error_messages']:
+                logger.error(f"Error importing record: {message}")
+            
+            # Drop the staged data after a successful import
+            discard_fetch(fetch)
+            request.session.pop('fetched_attendance_token', None)
             
             return JsonResponse({
                 'success': True,
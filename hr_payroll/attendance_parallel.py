@@ -0,0 +1,113 @@
+"""
+Multi-process attendance generation.
+
+The engine's employee chunks are independent, so they can be computed in
+worker processes, each with its own database connection. Chunks are
+submitted in order and their records are consumed in the same order, and
+the parent rebuilds the running summary from those records, so the output
+is identical to the serial path.
+"""
+
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Worker processes used by background generation jobs (1 = serial)
+ATTENDANCE_GENERATION_WORKERS = getattr(settings, 'ATTENDANCE_GENERATION_WORKERS', 1)
+
+# Chunks queued per worker; bounds how many finished chunks wait in memory
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+
+
+def _init_worker(database):
+    """
+    Set up Django in a freshly spawned worker and open the database the
+    parent uses, given by its connection settings: the parent may have
+    switched databases at runtime (the test runner does), which the
+    worker's settings module does not know about.
+    """
+    import django
+    from django.apps import apps
+    from django.db import DEFAULT_DB_ALIAS, connections
+    from django.db.utils import load_backend
+
+    if not apps.ready:
+        django.setup()
+    backend = load_backend(database['ENGINE'])
+    connections[DEFAULT_DB_ALIAS] = backend.DatabaseWrapper(database, DEFAULT_DB_ALIAS)
+
+
+def _generate_chunk(company_id, rules, start_date, end_date, regenerate_existing, employee_ids):
+    """Compute one employee chunk in a worker and return its records"""
+    from django.db import connections
+    from core.models import Company
+    from .simple_attendance_generation_views import AttendanceGenerationEngine
+
+    try:
+        company = Company.objects.get(pk=company_id)
+        engine = AttendanceGenerationEngine(
+            company, rules, start_date, end_date,
+            employee_ids=employee_ids, regenerate_existing=regenerate_existing,
+            chunk_size=len(employee_ids),
+        )
+        return list(engine.process_chunk(employee_ids))
+    finally:
+        connections.close_all()
+
+
+def _accumulate(engine, records):
+    """Yield records while adding them to the engine's summary"""
+    from .simple_attendance_generation_views import update_summary
+
+    for record in records:
+        update_summary(engine.summary, record)
+        yield record
+
+
+def iter_parallel_chunks(engine, workers):
+    """
+    Yield (chunk_ids, records) for every chunk of the engine, in chunk order.
+
+    Workers are spawned rather than forked so they never share the parent's
+    database connections. An in-memory SQLite database cannot be opened by
+    another process, so the chunks are computed serially instead.
+    """
+    if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+        for chunk_ids in engine.iter_chunks():
+            yield chunk_ids, engine.process_chunk(chunk_ids)
+        return
+
+    chunks = list(engine.iter_chunks())
+    workers = min(workers, len(chunks))
+    max_in_flight = workers * CHUNKS_IN_FLIGHT_PER_WORKER
+    args = (
+        engine.company.pk, engine.rules, engine.start_date, engine.end_date,
+        engine.regenerate_existing,
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(dict(connection.settings_dict),),
+    ) as executor:
+        pending = deque()
+        next_chunk = 0
+        try:
+            while next_chunk < len(chunks) or pending:
+                while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                    chunk_ids = chunks[next_chunk]
+                    pending.append((chunk_ids, executor.submit(_generate_chunk, *args, chunk_ids)))
+                    next_chunk += 1
+
+                chunk_ids, future = pending.popleft()
+                yield chunk_ids, _accumulate(engine, future.result())
+        finally:
+            for _, future in pending:
+                future.cancel()
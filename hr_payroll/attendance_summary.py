@@ -0,0 +1,482 @@
+"""
+Materialized per-employee, per-day summaries of AttendanceLog punches.
+
+An AttendanceDaySummary row exists for every employee-day with punches and
+holds the punch count, first and last punch, late/early flags and the
+status of the day under the company's active attendance configuration, so
+the log reports read one row per employee-day instead of recomputing them
+from raw logs. Work and overtime hours are not stored: the reports compute
+them per row from the exact first and last punch (day_hours), as from the
+raw punches, and sum them in Python rather than in the database, since the
+break, minimum-overtime and expected-hours rules apply day by day.
+
+Rows are refreshed whenever logs change (mark_logs_dirty) and when a
+holiday or approved leave changes. Changing the configuration, a shift's
+times or an employee's default shift queues a rebuild job on the attendance
+job queue (queue_summary_rebuild); the rebuild_attendance_summaries command
+rebuilds them directly. Migrations do not build summaries: after migrating a
+database with existing logs, run rebuild_attendance_summaries once.
+
+AttendanceLogRules holds the day rules shared with the log report views,
+and AttendanceCalendar the holidays and leave they are applied with.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+
+from .models import (
+    AttendanceDaySummary, AttendanceGenerationJob, AttendanceLog, AttendanceProcessorConfiguration,
+    Employee, Holiday, LeaveApplication,
+)
+from .report_cache import invalidate_report_cache
+
+logger = logging.getLogger(__name__)
+
+# Summary rows written per statement
+SUMMARY_BATCH_SIZE = 1000
+
+SUMMARY_UPDATE_FIELDS = [
+    'company', 'punch_count', 'first_punch', 'last_punch', 'is_late', 'late_minutes',
+    'is_early', 'early_minutes', 'status_code', 'status_display', 'computed_at',
+]
+
+
+class AttendanceCalendar:
+    """
+    Holidays and approved leave between two dates.
+
+    Each is loaded with one query and indexed by date, so lookups take
+    constant time. Leave is loaded for the given employees, or for all
+    employees when employees is None.
+    """
+
+    def __init__(self, company, start_date, end_date, employees=None):
+        self.company_id = getattr(company, 'pk', company)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.employee_ids = None
+        if employees is not None:
+            self.employee_ids = {getattr(employee, 'pk', employee) for employee in employees}
+
+        # Holiday names by date; holidays belong to a company
+        self.holiday_names = {}
+        if self.company_id is not None:
+            self.holiday_names = dict(
+                Holiday.objects.filter(
+                    company_id=self.company_id, date__range=[start_date, end_date]
+                ).values_list('date', 'name')
+            )
+
+        # Leave type names by (employee ID, date), and leave dates by employee ID
+        self.leave_types = {}
+        self.leave_dates = defaultdict(set)
+        leaves = LeaveApplication.objects.filter(
+            start_date__lte=end_date,
+            end_date__gte=start_date,
+            status='A'  # Approved
+        )
+        if self.employee_ids is not None:
+            leaves = leaves.filter(employee_id__in=self.employee_ids)
+        for employee_id, leave_start, leave_end, leave_type in leaves.order_by('pk').values_list(
+            'employee_id', 'start_date', 'end_date', 'leave_type__name'
+        ):
+            current_date = max(leave_start, start_date)
+            while current_date <= min(leave_end, end_date):
+                self.leave_types.setdefault((employee_id, current_date), leave_type)
+                self.leave_dates[employee_id].add(current_date)
+                current_date += timedelta(days=1)
+
+    def covers(self, company, start_date, end_date, employees=None):
+        """Whether the calendar holds the company's holidays and the employees' leave"""
+        if getattr(company, 'pk', company) != self.company_id:
+            return False
+        if start_date < self.start_date or end_date > self.end_date:
+            return False
+        if self.employee_ids is None:
+            return True
+        return employees is not None and all(
+            getattr(employee, 'pk', employee) in self.employee_ids for employee in employees
+        )
+
+    def holiday_name(self, date_obj):
+        return self.holiday_names.get(date_obj)
+
+    def is_holiday(self, date_obj):
+        return date_obj in self.holiday_names
+
+    def leave_type(self, employee_id, date_obj):
+        return self.leave_types.get((employee_id, date_obj))
+
+    def is_on_leave(self, employee_id, date_obj):
+        return (employee_id, date_obj) in self.leave_types
+
+
+class AttendanceLogRules:
+    """Attendance rules of a day, applied to its punch timestamps"""
+
+    def is_weekend(self, date_obj, config):
+        """Check if date is weekend based on config"""
+        if not config:
+            return date_obj.weekday() == 4  # Default Friday
+
+        weekday = date_obj.weekday()
+        return weekday in config.weekend_days
+
+    def calculate_work_hours(self, first_punch, last_punch, config):
+        """Calculate work hours with break deduction"""
+        if not first_punch or not last_punch or first_punch == last_punch:
+            return 0.0
+
+        duration = last_punch - first_punch
+        work_hours = duration.total_seconds() / 3600
+
+        # Deduct break time
+        if config:
+            break_minutes = config.default_break_minutes
+            work_hours -= (break_minutes / 60)
+
+        return max(work_hours, 0.0)
+
+    def calculate_overtime(self, work_hours, expected_hours, config, is_weekend=False, is_holiday=False):
+        """Calculate overtime hours based on config"""
+        if not config:
+            if work_hours <= expected_hours:
+                return 0.0
+            return work_hours - expected_hours
+
+        # Weekend/Holiday full day overtime
+        if is_weekend and config.weekend_overtime_full_day:
+            return work_hours
+
+        if is_holiday and config.holiday_overtime_full_day:
+            return work_hours
+
+        # Regular overtime calculation
+        if work_hours <= expected_hours:
+            return 0.0
+
+        overtime = work_hours - expected_hours
+
+        # Apply minimum overtime rule
+        if overtime * 60 < config.minimum_overtime_minutes:
+            return 0.0
+
+        return overtime
+
+    def day_hours(self, first_punch, last_punch, expected_hours, config, is_weekend=False, is_holiday=False):
+        """Work and overtime hours of a day from its first and last punch"""
+        work_hours = self.calculate_work_hours(first_punch, last_punch, config)
+        overtime_hours = self.calculate_overtime(
+            work_hours, expected_hours, config, is_weekend, is_holiday
+        )
+        return work_hours, overtime_hours
+
+    def determine_day_status(self, date_obj, punches, config, holiday_name=None, leave_type=None):
+        """
+        Determine attendance status from a day's punch timestamps in order,
+        the day's holiday name and the employee's leave type, if any
+        """
+        # Check leave first
+        if leave_type is not None:
+            return 'L', f'Leave ({leave_type})'
+
+        # Check weekend
+        if self.is_weekend(date_obj, config):
+            if punches:
+                return 'W', 'Weekly Off (Worked)'
+            return 'W', 'Weekly Off'
+
+        # Check holiday
+        if holiday_name is not None:
+            if punches:
+                return 'H', f'Holiday (Worked) - {holiday_name}'
+            return 'H', f'Holiday - {holiday_name}'
+
+        # No logs - Absent
+        if not punches:
+            return 'A', 'Absent'
+
+        first_punch = punches[0]
+        last_punch = punches[-1]
+
+        # Calculate work hours
+        work_hours = self.calculate_work_hours(first_punch, last_punch, config)
+
+        # Apply config rules
+        if config:
+            # Rule: Require both in and out
+            if config.require_both_in_and_out and len(punches) == 1:
+                return 'A', 'Absent (Missing Punch)'
+
+            # Rule: Minimum working hours
+            if config.enable_minimum_working_hours_rule:
+                if work_hours < config.minimum_working_hours_for_present:
+                    return 'A', f'Absent (Insufficient Hours: {work_hours:.2f}h)'
+
+            # Rule: Half day
+            if config.enable_working_hours_half_day_rule:
+                if config.half_day_minimum_hours <= work_hours <= config.half_day_maximum_hours:
+                    return 'HD', 'Half Day'
+
+        # Default: Present
+        return 'P', 'Present'
+
+    def get_day_punches(self, logs, start_date, end_date):
+        """
+        Load the punch timestamps of logs between two dates in one query,
+        grouped by (employee ID, local date) in punch order
+        """
+        period_start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        period_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+
+        punches = defaultdict(list)
+        for employee_id, timestamp in logs.filter(
+            timestamp__gte=period_start, timestamp__lt=period_end
+        ).order_by('timestamp').values_list('employee_id', 'timestamp'):
+            punches[(employee_id, timezone.localtime(timestamp).date())].append(timestamp)
+        return punches
+
+    def check_late_arrival(self, check_in_time, shift, date_obj, config):
+        """Check if employee arrived late"""
+        if not shift or not check_in_time:
+            return False, 0
+
+        shift_start = timezone.datetime.combine(date_obj, shift.start_time)
+        shift_start = timezone.make_aware(shift_start)
+
+        grace_minutes = config.grace_minutes if config else 15
+        grace_time = shift_start + timedelta(minutes=grace_minutes)
+
+        if check_in_time > grace_time:
+            late_minutes = int((check_in_time - shift_start).total_seconds() / 60)
+            return True, late_minutes
+
+        return False, 0
+
+    def check_early_departure(self, check_out_time, shift, date_obj, config):
+        """Check if employee left early"""
+        if not shift or not check_out_time:
+            return False, 0
+
+        shift_end = timezone.datetime.combine(date_obj, shift.end_time)
+        shift_end = timezone.make_aware(shift_end)
+
+        # Handle overnight shifts
+        if shift.end_time < shift.start_time:
+            shift_end += timedelta(days=1)
+
+        threshold_minutes = config.early_out_threshold_minutes if config else 30
+        early_threshold = shift_end - timedelta(minutes=threshold_minutes)
+
+        if check_out_time < early_threshold:
+            early_minutes = int((shift_end - check_out_time).total_seconds() / 60)
+            return True, early_minutes
+
+        return False, 0
+
+    def summarize_day(self, employee, date_obj, punches, config, holiday_name=None, leave_type=None):
+        """Unsaved AttendanceDaySummary of an employee's punch timestamps on a day"""
+        status_code, status_display = self.determine_day_status(
+            date_obj, punches, config, holiday_name=holiday_name, leave_type=leave_type
+        )
+        first_punch = punches[0]
+        last_punch = punches[-1]
+        is_late, late_minutes = self.check_late_arrival(
+            first_punch, employee.default_shift, date_obj, config
+        )
+        is_early, early_minutes = self.check_early_departure(
+            last_punch, employee.default_shift, date_obj, config
+        )
+        return AttendanceDaySummary(
+            employee_id=employee.id,
+            company_id=employee.company_id,
+            date=date_obj,
+            punch_count=len(punches),
+            first_punch=first_punch,
+            last_punch=last_punch,
+            is_late=is_late,
+            late_minutes=late_minutes,
+            is_early=is_early,
+            early_minutes=early_minutes,
+            status_code=status_code,
+            status_display=status_display[:150],
+            computed_at=timezone.now(),
+        )
+
+    def build_day_summaries(self, company, employees, start_date, end_date):
+        """Summaries of the employees' punched days between two dates, by (employee ID, date)"""
+        employees = {employee.id: employee for employee in employees}
+        if not employees:
+            return {}
+
+        config = AttendanceProcessorConfiguration.get_rules(company)
+        day_punches = self.get_day_punches(
+            AttendanceLog.objects.filter(employee_id__in=list(employees)), start_date, end_date
+        )
+        calendar = AttendanceCalendar(company, start_date, end_date, list(employees))
+
+        summaries = {}
+        for (employee_id, date_obj), punches in day_punches.items():
+            if not start_date <= date_obj <= end_date:
+                continue
+            summaries[(employee_id, date_obj)] = self.summarize_day(
+                employees[employee_id], date_obj, punches, config,
+                holiday_name=calendar.holiday_name(date_obj),
+                leave_type=calendar.leave_type(employee_id, date_obj),
+            )
+        return summaries
+
+
+def write_day_summaries(summaries):
+    """Insert or update summary rows"""
+    summaries = list(summaries)
+    if not summaries:
+        return
+    if connection.features.supports_update_conflicts:
+        unique_fields = None
+        if connection.features.supports_update_conflicts_with_target:
+            unique_fields = ['employee', 'date']
+        AttendanceDaySummary.objects.bulk_create(
+            summaries, update_conflicts=True, unique_fields=unique_fields,
+            update_fields=SUMMARY_UPDATE_FIELDS, batch_size=SUMMARY_BATCH_SIZE
+        )
+        return
+
+    by_employee = defaultdict(set)
+    for summary in summaries:
+        by_employee[summary.employee_id].add(summary.date)
+    for employee_id, dates in by_employee.items():
+        AttendanceDaySummary.objects.filter(employee_id=employee_id, date__in=dates).delete()
+    AttendanceDaySummary.objects.bulk_create(summaries, batch_size=SUMMARY_BATCH_SIZE)
+
+
+def refresh_day_summaries(pairs):
+    """Recompute the summaries of (employee_id, date) pairs from their current logs"""
+    by_employee = defaultdict(set)
+    for employee_id, work_date in pairs:
+        by_employee[employee_id].add(work_date)
+    if not by_employee:
+        return 0
+
+    by_company = defaultdict(list)
+    for employee in Employee.objects.filter(
+        id__in=list(by_employee)
+    ).select_related('company', 'default_shift'):
+        by_company[employee.company_id].append(employee)
+
+    rules = AttendanceLogRules()
+    refreshed = 0
+    for employees in by_company.values():
+        dates = {work_date for employee in employees for work_date in by_employee[employee.id]}
+        summaries = rules.build_day_summaries(employees[0].company, employees, min(dates), max(dates))
+
+        with transaction.atomic():
+            write_day_summaries(
+                summary for key, summary in summaries.items() if key[1] in by_employee[key[0]]
+            )
+            # Days left without punches have no summary
+            for employee in employees:
+                emptied = [
+                    work_date for work_date in by_employee[employee.id]
+                    if (employee.id, work_date) not in summaries
+                ]
+                if emptied:
+                    AttendanceDaySummary.objects.filter(
+                        employee=employee, date__in=emptied
+                    ).delete()
+            invalidate_report_cache()
+        refreshed += sum(len(by_employee[employee.id]) for employee in employees)
+    return refreshed
+
+
+def refresh_summaries_between(start_date, end_date, company_id=None, employee_id=None):
+    """Recompute the existing summaries of a company or employee between two dates"""
+    summaries = AttendanceDaySummary.objects.filter(date__range=[start_date, end_date])
+    if company_id:
+        summaries = summaries.filter(company_id=company_id)
+    if employee_id:
+        summaries = summaries.filter(employee_id=employee_id)
+    return refresh_day_summaries(summaries.values_list('employee_id', 'date'))
+
+
+def rebuild_day_summaries(company, start_date=None, end_date=None, employee_ids=None, progress=None):
+    """
+    Rebuild all of a company's summaries between two dates, a month at a
+    time, or only those of the given employees; the dates default to the
+    range of their logs. A job's progress, if given, advances per month.
+    """
+    employees = Employee.objects.filter(company=company)
+    if employee_ids is not None:
+        employees = employees.filter(id__in=employee_ids)
+
+    if start_date is None or end_date is None:
+        bounds = AttendanceLog.objects.filter(employee__in=employees).aggregate(
+            first=Min('timestamp'), last=Max('timestamp')
+        )
+        if not bounds['first']:
+            return 0
+        start_date = start_date or timezone.localtime(bounds['first']).date()
+        end_date = end_date or timezone.localtime(bounds['last']).date()
+
+    employees = list(employees.select_related('default_shift'))
+    if progress is not None:
+        progress.set_total(
+            (end_date.year - start_date.year) * 12 + end_date.month - start_date.month + 1
+        )
+    rules = AttendanceLogRules()
+    written = 0
+    window_start = start_date
+    while window_start <= end_date:
+        next_month = (window_start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = min(end_date, next_month - timedelta(days=1))
+
+        summaries = rules.build_day_summaries(company, employees, window_start, window_end)
+        with transaction.atomic():
+            stale = AttendanceDaySummary.objects.filter(
+                company=company, date__range=[window_start, window_end]
+            )
+            if employee_ids is not None:
+                stale = stale.filter(employee__in=employees)
+            stale.delete()
+            AttendanceDaySummary.objects.bulk_create(
+                summaries.values(), batch_size=SUMMARY_BATCH_SIZE
+            )
+            invalidate_report_cache()
+        written += len(summaries)
+        window_start = window_end + timedelta(days=1)
+        if progress is not None:
+            progress.advance(1)
+    return written
+
+
+def queue_summary_rebuild(company_id, employee_ids=None):
+    """
+    Queue a rebuild of a company's summaries, or of some of its employees',
+    on the attendance job queue once the current transaction commits. A
+    queued rebuild of the whole company, or of the same employees, covers it.
+    """
+    if employee_ids is not None:
+        employee_ids = sorted(employee_ids)
+        if not employee_ids:
+            return
+
+    params = {'employee_ids': employee_ids}
+
+    def submit():
+        queued = AttendanceGenerationJob.objects.filter(
+            company_id=company_id, kind='rebuild_summaries', status='queued'
+        )
+        if queued.filter(Q(params__employee_ids=None) | Q(params=params)).exists():
+            return
+        AttendanceGenerationJob.objects.create(
+            company_id=company_id,
+            kind='rebuild_summaries',
+            params=params,
+        )
+
+    transaction.on_commit(submit)
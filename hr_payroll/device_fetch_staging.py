@@ -0,0 +1,124 @@
+"""
+Server-side staging of data fetched from ZKTeco devices.
+
+The fetch views show the fetched records for review and import the chosen
+ones on a later request. Instead of carrying the records in the session,
+they are stored as DeviceFetchRecord rows under a DeviceFetch token; the
+session and the browser keep only the token and the selected indices, and
+the import streams the records back in chunks. Fetches expire after
+DEVICE_FETCH_TTL seconds and are purged whenever a new fetch is staged, or
+by the purge_device_fetches command.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DeviceFetch, DeviceFetchRecord
+
+logger = logging.getLogger(__name__)
+
+# Seconds a fetch stays available for import
+DEVICE_FETCH_TTL = getattr(settings, 'DEVICE_FETCH_TTL', 3600)
+
+# Records written or read per query
+DEVICE_FETCH_CHUNK_SIZE = 1000
+
+
+def purge_expired_fetches(now=None):
+    """Delete expired fetches and their records, returning the number of fetches removed"""
+    expired = DeviceFetch.objects.filter(expires_at__lte=now or timezone.now())
+    removed = 0
+    for fetch_ids in _chunks(list(expired.values_list('id', flat=True)), DEVICE_FETCH_CHUNK_SIZE):
+        DeviceFetchRecord.objects.filter(fetch_id__in=fetch_ids).delete()
+        removed += DeviceFetch.objects.filter(id__in=fetch_ids).delete()[1].get(DeviceFetch._meta.label, 0)
+    return removed
+
+
+def stage_records(kind, records, company=None, user=None, ttl=DEVICE_FETCH_TTL):
+    """Store records under a new fetch and return it; records keep their list positions"""
+    try:
+        purge_expired_fetches()
+    except Exception as e:
+        logger.warning(f"Could not purge expired device fetches: {str(e)}")
+
+    with transaction.atomic():
+        fetch = DeviceFetch.objects.create(
+            kind=kind,
+            company=company,
+            user=user if user is not None and user.is_authenticated else None,
+            expires_at=timezone.now() + timedelta(seconds=ttl),
+        )
+        count = 0
+        for chunk in _chunks(records, DEVICE_FETCH_CHUNK_SIZE):
+            DeviceFetchRecord.objects.bulk_create([
+                DeviceFetchRecord(fetch=fetch, index=count + offset, data=record)
+                for offset, record in enumerate(chunk)
+            ])
+            count += len(chunk)
+        fetch.record_count = count
+        fetch.save(update_fields=['record_count'])
+    return fetch
+
+
+def get_fetch(token, kind, company=None, user=None):
+    """The unexpired fetch of this kind, company and user with the token, or None"""
+    if not token:
+        return None
+    fetches = DeviceFetch.objects.filter(kind=kind, expires_at__gt=timezone.now())
+    if company is not None:
+        fetches = fetches.filter(company=company)
+    if user is not None and user.is_authenticated:
+        fetches = fetches.filter(user=user)
+    try:
+        return fetches.get(token=token)
+    except (DeviceFetch.DoesNotExist, ValidationError, ValueError):
+        return None
+
+
+def iter_staged_chunks(fetch, indices=None, chunk_size=DEVICE_FETCH_CHUNK_SIZE):
+    """
+    Yield the fetch's records as lists of up to chunk_size, in fetch order.
+    indices, if given, selects records by position; unknown ones are ignored.
+    """
+    records = DeviceFetchRecord.objects.filter(fetch=fetch).order_by('index')
+    if indices is None:
+        for start in range(0, fetch.record_count, chunk_size):
+            yield list(
+                records.filter(index__gte=start, index__lt=start + chunk_size)
+                .values_list('data', flat=True)
+            )
+        return
+
+    wanted = sorted({int(index) for index in indices if 0 <= int(index) < fetch.record_count})
+    for selection in _chunks(wanted, chunk_size):
+        yield list(records.filter(index__in=selection).values_list('data', flat=True))
+
+
+def remember_fetch(session, key, fetch):
+    """Keep the fetch's token in the session, discarding the fetch it replaces"""
+    previous = session.get(key)
+    if previous and previous != str(fetch.token):
+        DeviceFetch.objects.filter(token=previous).delete()
+    session[key] = str(fetch.token)
+
+
+def discard_fetch(fetch):
+    """Delete a fetch once it has been imported"""
+    DeviceFetchRecord.objects.filter(fetch=fetch).delete()
+    fetch.delete()
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
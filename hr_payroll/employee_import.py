@@ -0,0 +1,119 @@
+"""
+Batch creation of employees from users enrolled on ZKTeco devices.
+
+The same person is usually enrolled on several terminals, so device users
+are deduplicated by user ID first. Employee and ZKTeco IDs are unique
+across all companies; the IDs already taken are loaded in one query, then
+new employees are inserted with bulk_create. A batch that still fails (an
+employee created concurrently) is retried row by row so only the
+offending rows are reported.
+"""
+
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import Employee
+from .report_cache import invalidate_report_cache
+
+logger = logging.getLogger(__name__)
+
+# Employees per INSERT statement
+EMPLOYEE_IMPORT_BATCH_SIZE = 500
+
+
+def import_device_users(company, users, department=None, designation=None,
+                        batch_size=EMPLOYEE_IMPORT_BATCH_SIZE):
+    """
+    Create employees of company for device users not enrolled yet.
+
+    users are dicts with user_id, name and optionally device_ip. The user ID
+    becomes both the employee ID and the ZKTeco ID. Returns the counts of
+    imported, duplicate and failed users, with an entry per failed row.
+    """
+    result = {
+        'imported': 0,
+        'duplicates': 0,
+        'errors': 0,
+        'row_errors': [],
+    }
+
+    def fail(user, message):
+        result['errors'] += 1
+        result['row_errors'].append({
+            'user_id': user.get('user_id'),
+            'name': user.get('name'),
+            'device_ip': user.get('device_ip'),
+            'error': message,
+        })
+
+    id_length = Employee._meta.get_field('employee_id').max_length
+    name_length = Employee._meta.get_field('name').max_length
+
+    candidates = {}
+    for user in users:
+        user_id = str(user.get('user_id') or '').strip()
+        if not user_id:
+            fail(user, 'Missing user ID')
+            continue
+        if len(user_id) > id_length:
+            fail(user, f'User ID longer than {id_length} characters')
+            continue
+        if user_id in candidates:
+            # Same user enrolled on another device
+            result['duplicates'] += 1
+            continue
+        candidates[user_id] = user
+
+    if not candidates:
+        return result
+
+    taken = {}
+    for company_id, zkteco_id, employee_id in Employee.objects.filter(
+        Q(zkteco_id__in=candidates) | Q(employee_id__in=candidates)
+    ).values_list('company_id', 'zkteco_id', 'employee_id'):
+        for value in (zkteco_id, employee_id):
+            if value in candidates:
+                taken[value] = taken.get(value) or company_id == company.id
+
+    new_employees = []
+    for user_id, user in candidates.items():
+        if user_id in taken:
+            if taken[user_id]:
+                result['duplicates'] += 1
+            else:
+                fail(user, 'ID is already used by an employee of another company')
+            continue
+        new_employees.append((user, Employee(
+            company=company,
+            department=department,
+            designation=designation,
+            employee_id=user_id,
+            zkteco_id=user_id,
+            name=(user.get('name') or f"User_{user_id}")[:name_length],
+            expected_working_hours=8.00,
+            overtime_grace_minutes=15,
+            is_active=True
+        )))
+
+    for start in range(0, len(new_employees), batch_size):
+        batch = new_employees[start:start + batch_size]
+        try:
+            with transaction.atomic():
+                Employee.objects.bulk_create([employee for _, employee in batch])
+            result['imported'] += len(batch)
+        except IntegrityError:
+            for user, employee in batch:
+                try:
+                    with transaction.atomic():
+                        employee.save()
+                    result['imported'] += 1
+                except IntegrityError as e:
+                    logger.error(f"Error importing user {user}: {str(e)}")
+                    fail(user, str(e))
+
+    if result['imported']:
+        # bulk_create skips the Employee signals
+        invalidate_report_cache()
+    return result
@@ -0,0 +1,133 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from hr_payroll.attendance_benchmark import (
+    BENCHMARK_PHASES, AttendanceBenchmark, get_or_create_benchmark_company, use_scratch_database,
+)
+
+
+def int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+class Command(BaseCommand):
+    help = 'Time attendance preview, generation and reports on synthetic data and print JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int_list,
+            default=[100, 1000, 10000],
+            help='Comma separated employee counts (default: 100,1000,10000)',
+        )
+        parser.add_argument(
+            '--days',
+            type=int_list,
+            default=[7, 31, 90],
+            help='Comma separated range lengths in days (default: 7,31,90)',
+        )
+        parser.add_argument(
+            '--phases',
+            default=','.join(BENCHMARK_PHASES),
+            help=f"Comma separated phases to run (default: {','.join(BENCHMARK_PHASES)})",
+        )
+        parser.add_argument(
+            '--start-date',
+            default='2025-01-01',
+            help='First day of the synthetic history (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed of the synthetic data',
+        )
+        parser.add_argument(
+            '--noise-minutes',
+            type=float,
+            default=20,
+            help='Standard deviation of punch times around the shift start and end',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Worker processes for preview and generation',
+        )
+        parser.add_argument(
+            '--no-memory',
+            action='store_true',
+            help='Skip peak memory tracking, which slows Python code down',
+        )
+        parser.add_argument(
+            '--fresh',
+            action='store_true',
+            help='Recreate synthetic companies instead of reusing them',
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout',
+        )
+        parser.add_argument(
+            '--database',
+            required=True,
+            help='Scratch database to write to (a file path for SQLite); '
+                 'it is created and migrated as needed and must not be the configured database',
+        )
+
+    def handle(self, *args, **options):
+        phases = [phase.strip() for phase in options['phases'].split(',') if phase.strip()]
+        unknown = set(phases) - set(BENCHMARK_PHASES)
+        if unknown:
+            raise CommandError(f"Unknown phase(s): {', '.join(sorted(unknown))}")
+
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Invalid --start-date, expected YYYY-MM-DD')
+
+        try:
+            use_scratch_database(options['database'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # One company per headcount covers every range length
+        max_days = max(options['days'])
+        results = []
+        for employees in options['employees']:
+            company, created = get_or_create_benchmark_company(
+                employees, max_days, start_date, seed=options['seed'],
+                fresh=options['fresh'], noise_minutes=options['noise_minutes'],
+            )
+            self.stderr.write(f"{'Created' if created else 'Reusing'} {company.company_code}")
+
+            for days in options['days']:
+                benchmark = AttendanceBenchmark(
+                    company, start_date, days,
+                    workers=options['workers'], measure_memory=not options['no_memory'],
+                )
+                for result in benchmark.run(phases):
+                    self.stderr.write(
+                        f"  {employees} x {days}d {result['phase']}: "
+                        f"{result['wall_seconds']}s, {result['queries']} queries"
+                    )
+                    results.append(result)
+
+        report = json.dumps({
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'workers': options['workers'],
+            'seed': options['seed'],
+            'results': results,
+        }, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(report + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hr_payroll.attendance_benchmark import get_or_create_benchmark_company, use_scratch_database
+from hr_payroll.models import AttendanceLog, Employee
+
+
+class Command(BaseCommand):
+    help = 'Fill a scratch database with a synthetic company, rosters, leaves and punch logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--employees',
+            type=int,
+            default=100,
+            help='Number of employees to create',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=31,
+            help='Number of days of punch history',
+        )
+        parser.add_argument(
+            '--start-date',
+            default='2025-01-01',
+            help='First day of the history (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed; the same seed always produces the same data',
+        )
+        parser.add_argument(
+            '--noise-minutes',
+            type=float,
+            default=20,
+            help='Standard deviation of punch times around the shift start and end',
+        )
+        parser.add_argument(
+            '--absent-rate',
+            type=float,
+            default=0.05,
+            help='Probability of an employee having no punches on a working day',
+        )
+        parser.add_argument(
+            '--fresh',
+            action='store_true',
+            help='Delete and recreate the company if it already exists',
+        )
+        parser.add_argument(
+            '--database',
+            required=True,
+            help='Scratch database to write to (a file path for SQLite); '
+                 'it is created and migrated as needed and must not be the configured database',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('Invalid --start-date, expected YYYY-MM-DD')
+
+        try:
+            use_scratch_database(options['database'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        company, created = get_or_create_benchmark_company(
+            options['employees'], options['days'], start_date,
+            seed=options['seed'], fresh=options['fresh'],
+            noise_minutes=options['noise_minutes'], absent_rate=options['absent_rate'],
+        )
+
+        employees = Employee.objects.filter(company=company).count()
+        logs = AttendanceLog.objects.filter(employee__company=company).count()
+        action = 'Created' if created else 'Reused'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} company {company.company_code} (ID {company.pk}): '
+            f'{employees} employees, {logs} punch logs'
+        ))
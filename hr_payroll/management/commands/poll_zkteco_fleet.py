@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from hr_payroll.models import ZkDevice
+from hr_payroll.zkteco_device_manager import ZKTecoDeviceManager
+from hr_payroll.zkteco_fleet import (
+    ZKTECO_FLEET_CONCURRENCY, ZKTECO_FLEET_DEADLINE, ZKTECO_SITE_RATE,
+    make_probe_poller, make_sync_poller,
+)
+from hr_payroll.zkteco_pool import DeviceConnectionPool
+
+
+class Command(BaseCommand):
+    help = 'Poll all active ZKTeco devices concurrently, reporting each device as it finishes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--action',
+            choices=['sync', 'probe'],
+            default='sync',
+            help='Import new punches (sync) or only check that devices answer (probe)',
+        )
+        parser.add_argument(
+            '--device-id',
+            type=int,
+            action='append',
+            dest='device_ids',
+            help='Only poll this device (can be repeated); default is all active devices',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=ZKTECO_FLEET_CONCURRENCY,
+            help='Devices polled at the same time',
+        )
+        parser.add_argument(
+            '--deadline',
+            type=float,
+            default=ZKTECO_FLEET_DEADLINE,
+            help='Seconds a device may take before it is reported as timed out',
+        )
+        parser.add_argument(
+            '--site-rate',
+            type=float,
+            default=ZKTECO_SITE_RATE,
+            help='New device sessions per second on one site (0 = unlimited)',
+        )
+        parser.add_argument(
+            '--connect-timeout',
+            type=int,
+            default=10,
+            help='Socket timeout in seconds for each connection attempt',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Poll again every this many seconds and keep running (0 = poll once and exit)',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Sync: ignore the high-water marks and re-read whole device buffers',
+        )
+        clear = parser.add_mutually_exclusive_group()
+        clear.add_argument(
+            '--clear-after-import',
+            action='store_true',
+            help='Sync: clear device buffers after a verified import, overriding the device setting',
+        )
+        clear.add_argument(
+            '--keep-device-data',
+            action='store_false',
+            dest='clear_after_import',
+            help='Sync: never clear device buffers, overriding the device setting',
+        )
+        parser.set_defaults(clear_after_import=None)
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        pool = DeviceConnectionPool(timeout=options['connect_timeout'])
+        manager = ZKTecoDeviceManager(pool=pool)
+        poller_options = {
+            'concurrency': options['concurrency'],
+            'deadline': options['deadline'],
+            'site_rate': options['site_rate'],
+        }
+        if options['action'] == 'probe':
+            poller = make_probe_poller(manager, **poller_options)
+        else:
+            poller = make_sync_poller(
+                manager,
+                clear_after_import=options.get('clear_after_import'),
+                full=options['full'],
+                **poller_options
+            )
+
+        interval = options['interval']
+        try:
+            while True:
+                started = time.monotonic()
+                close_old_connections()
+                devices = self.get_devices(options.get('device_ids'))
+
+                failed = asyncio.run(self.poll_round(poller, devices))
+
+                if not interval:
+                    if failed:
+                        raise CommandError(f'{failed} device(s) failed')
+                    break
+                time.sleep(max(0.0, interval - (time.monotonic() - started)))
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+        finally:
+            poller.close()
+            pool.close_all()
+
+    def get_devices(self, device_ids):
+        devices = ZkDevice.objects.filter(is_active=True).select_related('company')
+        if device_ids:
+            devices = ZkDevice.objects.filter(id__in=device_ids).select_related('company')
+            if not devices:
+                raise CommandError('No matching devices found')
+        return list(devices)
+
+    async def poll_round(self, poller, devices):
+        started = time.monotonic()
+        succeeded = failed = timed_out = 0
+
+        async for result in poller.poll(devices):
+            if result['success']:
+                succeeded += 1
+                self.stdout.write(self.style.SUCCESS(self.describe(result)))
+            else:
+                failed += 1
+                timed_out += result['timed_out']
+                self.stdout.write(self.style.ERROR(
+                    f"{result['device_name']} ({result['device_ip']}): {result['error']}"
+                ))
+        await poller.drain()
+
+        self.stdout.write(
+            f'Polled {len(devices)} device(s) in {time.monotonic() - started:.1f}s: '
+            f'{succeeded} succeeded, {failed} failed ({timed_out} timed out)'
+        )
+        return failed
+
+    def describe(self, result):
+        message = f"{result['device_name']} ({result['device_ip']}) in {result['duration']:.1f}s"
+        if 'fetched' in result:
+            message += (
+                f": fetched {result['fetched']}, imported {result['imported']}, "
+                f"duplicates {result['duplicates']}, unmatched users {result['unmatched']}"
+            )
+            if result['cleared']:
+                message += ', device buffer cleared'
+        elif result.get('info'):
+            info = result['info']
+            message += f": users {info.get('user_count', 0)}, records {info.get('attendance_count', 0)}"
+        return message
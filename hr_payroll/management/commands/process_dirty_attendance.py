@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from hr_payroll.attendance_incremental import IncrementalAttendanceProcessor
+
+
+class Command(BaseCommand):
+    help = 'Regenerate attendance only for employee-days whose logs changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='Only process dirty days of this company',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Maximum number of dirty employee-days to process in this run',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Attendance rows written per bulk statement',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many employee-days are pending',
+        )
+
+    def handle(self, *args, **options):
+        company = None
+        if options.get('company_id'):
+            try:
+                company = Company.objects.get(id=options['company_id'])
+            except Company.DoesNotExist:
+                raise CommandError(f"Company with ID {options['company_id']} does not exist")
+
+        processor = IncrementalAttendanceProcessor(
+            company=company,
+            limit=options.get('limit'),
+            batch_size=options.get('batch_size'),
+        )
+
+        pending = processor.pending().count()
+        if options.get('dry_run') or not pending:
+            self.stdout.write(f'{pending} dirty employee-day(s) pending')
+            return
+
+        results = processor.run()
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {results['days_processed']} employee-day(s): "
+            f"created {results['records_created']}, updated {results['records_updated']}, "
+            f"errors {results['error_count']}"
+        ))
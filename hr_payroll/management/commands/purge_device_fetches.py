@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hr_payroll.device_fetch_staging import purge_expired_fetches
+
+
+class Command(BaseCommand):
+    help = 'Delete staged device fetches that expired without being imported'
+
+    def handle(self, *args, **options):
+        removed = purge_expired_fetches()
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} expired device fetch(es)'))
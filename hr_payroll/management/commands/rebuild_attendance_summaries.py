@@ -0,0 +1,53 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from hr_payroll.attendance_summary import rebuild_day_summaries
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-employee daily attendance summaries from the attendance logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--company-id',
+            type=int,
+            help='Only rebuild summaries of this company',
+        )
+        parser.add_argument(
+            '--start-date',
+            help='First day to rebuild (YYYY-MM-DD); default is the first logged day',
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Last day to rebuild (YYYY-MM-DD); default is the last logged day',
+        )
+
+    def handle(self, *args, **options):
+        start_date = self.parse_date(options.get('start_date'), '--start-date')
+        end_date = self.parse_date(options.get('end_date'), '--end-date')
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date must not be after --end-date')
+
+        companies = Company.objects.all()
+        if options.get('company_id'):
+            companies = companies.filter(id=options['company_id'])
+            if not companies:
+                raise CommandError(f"Company with ID {options['company_id']} does not exist")
+
+        total = 0
+        for company in companies:
+            written = rebuild_day_summaries(company, start_date, end_date)
+            total += written
+            self.stdout.write(f'{company}: {written} day summary row(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} day summary row(s)'))
+
+    def parse_date(self, value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid {option}, expected YYYY-MM-DD')
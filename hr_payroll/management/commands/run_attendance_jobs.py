@@ -0,0 +1,92 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from hr_payroll.attendance_jobs import (
+    claim_next_job, cleanup_job_results, default_worker_name,
+    requeue_stale_jobs, run_job,
+)
+
+
+class Command(BaseCommand):
+    help = 'Run queued attendance generation jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run all queued jobs and exit instead of polling',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=10,
+            help='Minutes without a heartbeat before a running job is requeued',
+        )
+        parser.add_argument(
+            '--retention-hours',
+            type=int,
+            default=24,
+            help='Hours to keep preview result files of finished jobs',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=0,
+            help='Exit after running this many jobs (0 = no limit)',
+        )
+        parser.add_argument(
+            '--worker-name',
+            help='Name recorded on claimed jobs (default: host:pid)',
+        )
+
+    def handle(self, *args, **options):
+        worker_name = options.get('worker_name') or default_worker_name()
+        stale_after = timedelta(minutes=options['stale_after'])
+        retention = timedelta(hours=options['retention_hours'])
+        max_jobs = options['max_jobs']
+        once = options['once']
+
+        self.stdout.write(f'Attendance job worker {worker_name} started')
+        jobs_run = 0
+
+        while True:
+            close_old_connections()
+
+            requeued = requeue_stale_jobs(stale_after)
+            if requeued:
+                self.stdout.write(self.style.WARNING(f'Requeued {requeued} stale job(s)'))
+
+            job = claim_next_job(worker_name)
+            if job:
+                self.stdout.write(f'Running job {job.pk} ({job.kind})')
+                job = run_job(job)
+                if job.status == 'completed':
+                    self.stdout.write(self.style.SUCCESS(f'Job {job.pk} completed: {job.message}'))
+                elif job.status == 'failed':
+                    self.stdout.write(self.style.ERROR(f'Job {job.pk} failed: {job.error}'))
+                else:
+                    self.stdout.write(self.style.WARNING(f'Job {job.pk} was requeued while running'))
+
+                jobs_run += 1
+                if max_jobs and jobs_run >= max_jobs:
+                    break
+                continue
+
+            removed = cleanup_job_results(retention)
+            if removed:
+                self.stdout.write(f'Removed {removed} expired job result file(s)')
+
+            if once:
+                break
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'Worker stopped after {jobs_run} job(s)'))
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import random
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Company
+from hr_payroll.models import Employee, ZkDevice
+from hr_payroll.zkteco_simulator import (
+    DeviceSimulator, FaultProfile, SimulatedDevice, device_addresses, generate_punches,
+)
+
+
+class Command(BaseCommand):
+    help = 'Serve simulated ZKTeco devices on localhost for offline fetch, sync and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--devices',
+            type=int,
+            default=1,
+            help='Number of simulated devices',
+        )
+        parser.add_argument(
+            '--first-address',
+            default='127.0.0.1',
+            help='Loopback address of the first device; the others follow it',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=4370,
+            help='Device port (the first port with --same-address)',
+        )
+        parser.add_argument(
+            '--same-address',
+            action='store_true',
+            help='Serve every device on the first address, on consecutive ports',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Synthetic users per device (ignored with --company)',
+        )
+        parser.add_argument(
+            '--company',
+            help='Company code whose employees are enrolled, spread across the devices',
+        )
+        parser.add_argument(
+            '--register',
+            action='store_true',
+            help='Create or update ZkDevice rows of the company pointing at the simulated devices',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Days of punch history in each device buffer',
+        )
+        parser.add_argument(
+            '--punches-per-day',
+            type=int,
+            default=2,
+            help='Punches per user per day',
+        )
+        parser.add_argument(
+            '--password',
+            type=int,
+            default=0,
+            help='Communication password of the devices (0 = none)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Milliseconds added to every reply',
+        )
+        parser.add_argument(
+            '--jitter',
+            type=float,
+            default=0,
+            help='Up to this many random milliseconds added on top of the latency',
+        )
+        parser.add_argument(
+            '--loss',
+            type=float,
+            default=0,
+            help='Probability of a reply packet being lost',
+        )
+        parser.add_argument(
+            '--disconnect-rate',
+            type=float,
+            default=0,
+            help='Probability of the device dropping the client on a command',
+        )
+        parser.add_argument(
+            '--live-punch-interval',
+            type=float,
+            help='Seconds between new punches recorded on every device while running',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed for users, punches and faults',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Allow --register when DEBUG is off',
+        )
+
+    def handle(self, *args, **options):
+        count = options['devices']
+        if count < 1:
+            raise CommandError('--devices must be at least 1')
+        if options['register']:
+            if not options.get('company'):
+                raise CommandError('--register needs --company')
+            if options['same_address']:
+                raise CommandError('--register needs a separate address per device; drop --same-address')
+            if not settings.DEBUG and not options['force']:
+                raise CommandError('Refusing to register simulated devices with DEBUG off; use --force')
+
+        addresses = device_addresses(
+            count, options['first_address'], options['port'], options['same_address']
+        )
+        enrolled = self.get_users(options, count)
+        seed = options['seed']
+
+        devices = []
+        for index, (host, port) in enumerate(addresses):
+            users = enrolled[index]
+            devices.append(SimulatedDevice(
+                host, port,
+                users=users,
+                attendances=generate_punches(
+                    [user_id for user_id, _ in users], options['days'],
+                    options['punches_per_day'], seed=seed + index,
+                ),
+                password=options['password'],
+                faults=FaultProfile(
+                    latency=options['latency'] / 1000,
+                    jitter=options['jitter'] / 1000,
+                    loss=options['loss'],
+                    disconnect_rate=options['disconnect_rate'],
+                    seed=seed + index,
+                ),
+            ))
+
+        if options['register']:
+            self.register(options['company'], devices, options['password'])
+
+        total_records = sum(len(device.attendances) for device in devices)
+        self.stdout.write(
+            f'Serving {count} simulated device(s) from {addresses[0][0]}:{addresses[0][1]} '
+            f'with {total_records} punch(es); press Ctrl+C to stop'
+        )
+
+        simulator = DeviceSimulator(devices)
+        try:
+            asyncio.run(simulator.run(options.get('live_punch_interval'), random.Random(seed)))
+        except OSError as e:
+            raise CommandError(
+                f'Could not start the devices: {e}. Only 127.0.0.1 may be available here; '
+                'try --same-address'
+            )
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(json.dumps(simulator.stats(), indent=2))
+
+    def get_users(self, options, count):
+        """Users enrolled on each device"""
+        if not options.get('company'):
+            per_device = options['users']
+            return [
+                [(str(index * per_device + k + 1), f'Sim User {index * per_device + k + 1}')
+                 for k in range(per_device)]
+                for index in range(count)
+            ]
+
+        try:
+            company = Company.objects.get(company_code=options['company'])
+        except Company.DoesNotExist:
+            raise CommandError(f"Company {options['company']} not found")
+
+        employees = [
+            (zkteco_id or employee_id, name or employee_id)
+            for zkteco_id, employee_id, name in Employee.objects.filter(company=company)
+            .order_by('pk').values_list('zkteco_id', 'employee_id', 'name')
+        ]
+        if not employees:
+            raise CommandError(f'Company {company.company_code} has no employees')
+        return [employees[index::count] for index in range(count)]
+
+    def register(self, company_code, devices, password):
+        company = Company.objects.get(company_code=company_code)
+        for device in devices:
+            ZkDevice.objects.update_or_create(
+                company=company,
+                ip_address=device.host,
+                defaults={
+                    'name': f'Simulator {device.host}',
+                    'port': device.port,
+                    'password': str(password) if password else None,
+                    'is_active': True,
+                },
+            )
+        self.stdout.write(f'Registered {len(devices)} device(s) for company {company.company_code}')
@@ -0,0 +1,166 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from hr_payroll.attendance_jobs import default_worker_name
+from hr_payroll.zkteco_device_manager import ZKTecoDeviceManager
+from hr_payroll.zkteco_fleet import (
+    ZKTECO_FLEET_CONCURRENCY, ZKTECO_FLEET_DEADLINE, ZKTECO_SITE_RATE, make_daemon_poller,
+)
+from hr_payroll.zkteco_pool import DeviceConnectionPool
+from hr_payroll.zkteco_sync import claim_due_devices, prune_sync_runs
+
+
+class Command(BaseCommand):
+    help = 'Continuously import new punches from all active ZKTeco devices'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=300,
+            help='Seconds between syncs of the same device',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=10,
+            help='Seconds to wait between checks for devices due a sync',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Sync the devices that are due and exit instead of polling',
+        )
+        parser.add_argument(
+            '--device-id',
+            type=int,
+            action='append',
+            dest='device_ids',
+            help='Only sync this device (can be repeated); default is all active devices',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=ZKTECO_FLEET_CONCURRENCY,
+            help='Devices synced at the same time',
+        )
+        parser.add_argument(
+            '--deadline',
+            type=float,
+            default=ZKTECO_FLEET_DEADLINE,
+            help='Seconds a device may take before it is reported as timed out',
+        )
+        parser.add_argument(
+            '--lease-seconds',
+            type=int,
+            help='Seconds a claimed device stays locked if this daemon dies (default: twice the deadline)',
+        )
+        parser.add_argument(
+            '--site-rate',
+            type=float,
+            default=ZKTECO_SITE_RATE,
+            help='New device sessions per second on one site (0 = unlimited)',
+        )
+        parser.add_argument(
+            '--connect-timeout',
+            type=int,
+            default=10,
+            help='Socket timeout in seconds for each connection attempt',
+        )
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=30,
+            help='Days to keep per-device sync metrics',
+        )
+        parser.add_argument(
+            '--worker-name',
+            help='Name recorded on device leases and sync runs (default: host:pid)',
+        )
+        clear = parser.add_mutually_exclusive_group()
+        clear.add_argument(
+            '--clear-after-import',
+            action='store_true',
+            help='Clear device buffers after a verified import, overriding the device setting',
+        )
+        clear.add_argument(
+            '--keep-device-data',
+            action='store_false',
+            dest='clear_after_import',
+            help='Never clear device buffers, overriding the device setting',
+        )
+        parser.set_defaults(clear_after_import=None)
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+
+        worker_name = options.get('worker_name') or default_worker_name()
+        interval = options['interval']
+        lease_seconds = options.get('lease_seconds') or int(options['deadline'] * 2)
+        retention = timedelta(days=options['retention_days'])
+
+        pool = DeviceConnectionPool(timeout=options['connect_timeout'])
+        poller = make_daemon_poller(
+            ZKTecoDeviceManager(pool=pool),
+            worker_name,
+            interval,
+            clear_after_import=options.get('clear_after_import'),
+            deadline=options['deadline'],
+            concurrency=options['concurrency'],
+            site_rate=options['site_rate'],
+        )
+
+        self.stdout.write(f'ZKTeco sync daemon {worker_name} started')
+        try:
+            while True:
+                close_old_connections()
+
+                # One round's worth, so no lease waits for a free slot
+                devices = claim_due_devices(
+                    worker_name, interval, lease_seconds, options.get('device_ids'),
+                    limit=options['concurrency'],
+                )
+                if devices:
+                    asyncio.run(self.sync_round(poller, devices))
+                else:
+                    removed = prune_sync_runs(retention)
+                    if removed:
+                        self.stdout.write(f'Removed {removed} expired sync run record(s)')
+
+                if not devices:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+        finally:
+            poller.close()
+            pool.close_all()
+
+        self.stdout.write(self.style.SUCCESS(f'Sync daemon {worker_name} stopped'))
+
+    async def sync_round(self, poller, devices):
+        started = time.monotonic()
+        imported = failed = 0
+
+        async for result in poller.poll(devices):
+            if result['success']:
+                imported += result['imported']
+                self.stdout.write(self.style.SUCCESS(
+                    f"{result['device_name']}: fetched {result['fetched']}, imported {result['imported']} "
+                    f"in {result['duration']:.1f}s"
+                ))
+            else:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{result['device_name']}: {result['error']}"))
+        await poller.drain()
+
+        self.stdout.write(
+            f'Synced {len(devices)} device(s) in {time.monotonic() - started:.1f}s: '
+            f'{imported} punch(es) imported, {failed} device(s) failed'
+        )
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hr_payroll.models import ZkDevice
+from hr_payroll.zkteco_sync import sync_devices
+
+
+class Command(BaseCommand):
+    help = 'Import punches recorded on ZKTeco devices since their last sync'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--device-id',
+            type=int,
+            action='append',
+            dest='device_ids',
+            help='Only sync this device (can be repeated); default is all active devices',
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the high-water marks and re-read the whole device buffer',
+        )
+        clear = parser.add_mutually_exclusive_group()
+        clear.add_argument(
+            '--clear-after-import',
+            action='store_true',
+            help='Clear device buffers after a verified import, overriding the device setting',
+        )
+        clear.add_argument(
+            '--keep-device-data',
+            action='store_false',
+            dest='clear_after_import',
+            help='Never clear device buffers, overriding the device setting',
+        )
+        parser.set_defaults(clear_after_import=None)
+
+    def handle(self, *args, **options):
+        devices = ZkDevice.objects.filter(is_active=True).select_related('company')
+        if options.get('device_ids'):
+            devices = ZkDevice.objects.filter(id__in=options['device_ids']).select_related('company')
+            if not devices:
+                raise CommandError('No matching devices found')
+
+        results = sync_devices(
+            list(devices),
+            clear_after_import=options.get('clear_after_import'),
+            full=options['full'],
+        )
+
+        failed = 0
+        for result in results:
+            if not result['success']:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{result['device_name']}: {result['error']}"))
+                continue
+
+            message = (
+                f"{result['device_name']}: fetched {result['fetched']}, imported {result['imported']}, "
+                f"duplicates {result['duplicates']}, unmatched users {result['unmatched']}"
+            )
+            if result['cleared']:
+                message += ', device buffer cleared'
+            self.stdout.write(self.style.SUCCESS(message))
+
+        if failed:
+            raise CommandError(f'{failed} device(s) failed to sync')
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_delete_projectrole'),
+        ('hr_payroll', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceGenerationJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('preview', 'Preview'), ('generate', 'Generate'), ('log_generate', 'Generate From Logs')], max_length=20, verbose_name='Kind')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='queued', max_length=20, verbose_name='Status')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Parameters')),
+                ('total_units', models.PositiveIntegerField(default=0, verbose_name='Total Units')),
+                ('processed_units', models.PositiveIntegerField(default=0, verbose_name='Processed Units')),
+                ('records_created', models.PositiveIntegerField(default=0, verbose_name='Records Created')),
+                ('records_updated', models.PositiveIntegerField(default=0, verbose_name='Records Updated')),
+                ('error_count', models.PositiveIntegerField(default=0, verbose_name='Error Count')),
+                ('summary', models.JSONField(blank=True, default=dict, verbose_name='Summary')),
+                ('result_file', models.CharField(blank=True, default='', max_length=255, verbose_name='Result File')),
+                ('message', models.TextField(blank=True, default='', verbose_name='Message')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('worker', models.CharField(blank=True, default='', max_length=100, verbose_name='Worker')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Started At')),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True, verbose_name='Heartbeat At')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Finished At')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.company', verbose_name='Company')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attendance_generation_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Created By')),
+            ],
+            options={
+                'verbose_name': 'Attendance Generation Job',
+                'verbose_name_plural': 'Attendance Generation Jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='hr_payroll__status_0ec040_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:26
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_payroll', '0002_attendancegenerationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDirtyDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('work_date', models.DateField(verbose_name='Work Date')),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Marked At')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dirty_attendance_days', to='hr_payroll.employee', verbose_name='Employee')),
+            ],
+            options={
+                'verbose_name': 'Dirty Attendance Day',
+                'verbose_name_plural': 'Dirty Attendance Days',
+                'ordering': ['work_date'],
+                'indexes': [models.Index(fields=['marked_at'], name='hr_payroll__marked__a38821_idx')],
+                'unique_together': {('employee', 'work_date')},
+            },
+        ),
+    ]
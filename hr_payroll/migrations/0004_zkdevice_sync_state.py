@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_payroll', '0003_attendancedirtyday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zkdevice',
+            name='clear_after_import',
+            field=models.BooleanField(default=False, help_text="Clear the device's attendance buffer after a verified sync", verbose_name='Clear After Import'),
+        ),
+        migrations.AddField(
+            model_name='zkdevice',
+            name='sync_high_water_mark',
+            field=models.DateTimeField(blank=True, help_text='Timestamp of the newest punch synced from the device', null=True, verbose_name='Sync High-Water Mark'),
+        ),
+        migrations.AddField(
+            model_name='zkdevice',
+            name='sync_record_index',
+            field=models.PositiveIntegerField(default=0, help_text='Number of records in the device buffer already synced', verbose_name='Synced Record Index'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_payroll', '0004_zkdevice_sync_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zkdevice',
+            name='sync_lease_expires',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Sync Lease Expires'),
+        ),
+        migrations.AddField(
+            model_name='zkdevice',
+            name='sync_lease_owner',
+            field=models.CharField(blank=True, default='', help_text='Sync daemon currently polling the device', max_length=100, verbose_name='Sync Lease Owner'),
+        ),
+        migrations.CreateModel(
+            name='ZkDeviceSyncRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('worker', models.CharField(blank=True, default='', max_length=100, verbose_name='Worker')),
+                ('started_at', models.DateTimeField(verbose_name='Started At')),
+                ('duration', models.FloatField(default=0, verbose_name='Duration (seconds)')),
+                ('success', models.BooleanField(default=False, verbose_name='Success')),
+                ('timed_out', models.BooleanField(default=False, verbose_name='Timed Out')),
+                ('fetched', models.PositiveIntegerField(default=0, verbose_name='Fetched')),
+                ('imported', models.PositiveIntegerField(default=0, verbose_name='Imported')),
+                ('duplicates', models.PositiveIntegerField(default=0, verbose_name='Duplicates')),
+                ('unmatched', models.PositiveIntegerField(default=0, verbose_name='Unmatched')),
+                ('cleared', models.BooleanField(default=False, verbose_name='Device Buffer Cleared')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Error')),
+                ('device', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_runs', to='hr_payroll.zkdevice', verbose_name='Device')),
+            ],
+            options={
+                'verbose_name': 'ZKTeco Device Sync Run',
+                'verbose_name_plural': 'ZKTeco Device Sync Runs',
+                'ordering': ['-started_at'],
+                'indexes': [models.Index(fields=['device', 'started_at'], name='hr_payroll__device__4aa0b8_idx'), models.Index(fields=['started_at'], name='hr_payroll__started_06289a_idx')],
+            },
+        ),
+    ]
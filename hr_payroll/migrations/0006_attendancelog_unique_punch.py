@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:51
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def delete_duplicate_punches(apps, schema_editor):
+    """Keep the first log of each (employee, device, timestamp) punch"""
+    AttendanceLog = apps.get_model('hr_payroll', 'AttendanceLog')
+    duplicates = (
+        AttendanceLog.objects.values('employee_id', 'device_id', 'timestamp')
+        .annotate(count=Count('id'), keep_id=Min('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for punch in list(duplicates):
+        AttendanceLog.objects.filter(
+            employee_id=punch['employee_id'],
+            device_id=punch['device_id'],
+            timestamp=punch['timestamp'],
+        ).exclude(id=punch['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_payroll', '0005_zkdevice_sync_daemon'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_punches, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='attendancelog',
+            unique_together={('employee', 'device', 'timestamp')},
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-16 19:52
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_delete_projectrole'),
+        ('hr_payroll', '0006_attendancelog_unique_punch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeviceFetch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True, verbose_name='Token')),
+                ('kind', models.CharField(choices=[('attendance', 'Attendance'), ('users', 'Users')], max_length=20, verbose_name='Kind')),
+                ('record_count', models.PositiveIntegerField(default=0, verbose_name='Record Count')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expires At')),
+                ('company', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='device_fetches', to='core.company', verbose_name='Company')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='device_fetches', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Device Fetch',
+                'verbose_name_plural': 'Device Fetches',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeviceFetchRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField(verbose_name='Index')),
+                ('data', models.JSONField(verbose_name='Data')),
+                ('fetch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='hr_payroll.devicefetch', verbose_name='Fetch')),
+            ],
+            options={
+                'verbose_name': 'Device Fetch Record',
+                'verbose_name_plural': 'Device Fetch Records',
+                'ordering': ['fetch', 'index'],
+                'unique_together': {('fetch', 'index')},
+            },
+        ),
+    ]
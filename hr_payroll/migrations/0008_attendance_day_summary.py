@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_delete_projectrole'),
+        ('hr_payroll', '0007_device_fetch_staging'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDaySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('punch_count', models.PositiveIntegerField(default=0, verbose_name='Punch Count')),
+                ('first_punch', models.DateTimeField(verbose_name='First Punch')),
+                ('last_punch', models.DateTimeField(verbose_name='Last Punch')),
+                ('is_late', models.BooleanField(default=False, verbose_name='Late')),
+                ('late_minutes', models.IntegerField(default=0, verbose_name='Late Minutes')),
+                ('is_early', models.BooleanField(default=False, verbose_name='Early Departure')),
+                ('early_minutes', models.IntegerField(default=0, verbose_name='Early Departure Minutes')),
+                ('status_code', models.CharField(max_length=2, verbose_name='Status Code')),
+                ('status_display', models.CharField(max_length=150, verbose_name='Status')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Computed At')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.company', verbose_name='Company')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_summaries', to='hr_payroll.employee', verbose_name='Employee')),
+            ],
+            options={
+                'verbose_name': 'Attendance Day Summary',
+                'verbose_name_plural': 'Attendance Day Summaries',
+                'ordering': ['date'],
+                'indexes': [models.Index(fields=['company', 'date'], name='hr_payroll__company_2c9db4_idx')],
+                'unique_together': {('employee', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_payroll', '0008_attendance_day_summary'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancegenerationjob',
+            name='kind',
+            field=models.CharField(choices=[('preview', 'Preview'), ('generate', 'Generate'), ('log_generate', 'Generate From Logs'), ('rebuild_summaries', 'Rebuild Day Summaries')], max_length=20, verbose_name='Kind'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-16 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hr_payroll', '0009_attendancegenerationjob_rebuild_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='Version')),
+            ],
+            options={
+                'verbose_name': 'Attendance Data Version',
+                'verbose_name_plural': 'Attendance Data Versions',
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -6,13 +6,17 @@ from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 import os
 import logging
+import uuid
 from django.utils.dateparse import parse_datetime
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, pre_save, post_delete, pre_delete
+from django.conf import settings
+from django.core.cache import cache
 from django.dispatch import receiver
 # Import Company model from custom_auth app
 from core.models import Company
+from .report_cache import invalidate_report_cache
 
 try:
     from zk import ZK
@@ -435,6 +439,7 @@ class AttendanceProcessorConfiguration(models.Model):
                 is_active=True
             ).exclude(id=self.id).update(is_active=False)
         super().save(*args, **kwargs)
+        self.invalidate_rules(self.company_id)
     
     @classmethod
     def get_active_config(cls, company):
@@ -444,6 +449,58 @@ class AttendanceProcessorConfiguration(models.Model):
         except cls.DoesNotExist:
             return None
     
+    def compile_rules(self):
+        """Compile this configuration into an immutable AttendanceRules"""
+        return AttendanceRules(self.get_config_dict(), config_id=self.pk, company_id=self.company_id)
+    
+    @staticmethod
+    def rules_cache_key(company_id):
+        return f"attendance_rules_{company_id}"
+    
+    @classmethod
+    def get_rules(cls, company):
+        """
+        Compiled rules of the company's active configuration, or None.
+        
+        Cached per company together with the pk and updated_at of the
+        configuration they were compiled from. Each call checks that stamp
+        against the database with one small query, so a configuration saved
+        by another process (whose cache this one cannot see) is recompiled
+        here on the next call instead of after the cache timeout.
+        """
+        if not company:
+            return None
+        
+        stamp = cls.objects.filter(
+            company=company, is_active=True
+        ).values_list('pk', 'updated_at').first()
+        
+        key = cls.rules_cache_key(company.pk)
+        cached = cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        config = cls.objects.get(pk=stamp[0]) if stamp else None
+        rules = config.compile_rules() if config else None
+        cache.set(key, (stamp, rules), ATTENDANCE_RULES_CACHE_TIMEOUT)
+        return rules
+    
+    @classmethod
+    def invalidate_rules(cls, company_id):
+        """
+        Drop cached rules and reports once the current transaction commits,
+        and queue a rebuild of the day summaries computed with the rules.
+        
+        Deleting the key only frees this process's cache; other processes
+        notice the change through the stamp check in get_rules.
+        """
+        from .attendance_summary import queue_summary_rebuild
+        
+        key = cls.rules_cache_key(company_id)
+        transaction.on_commit(lambda: cache.delete(key))
+        invalidate_report_cache()
+        queue_summary_rebuild(company_id)
+    
     @classmethod
     def get_config_dict_for_company(cls, company):
         """Get configuration dictionary for a company"""
@@ -505,6 +562,51 @@ class AttendanceProcessorConfiguration(models.Model):
             'include_roster_info': True,
         }
 
+# Seconds compiled rules stay cached; a changed configuration stamp recompiles them sooner
+ATTENDANCE_RULES_CACHE_TIMEOUT = getattr(settings, 'ATTENDANCE_RULES_CACHE_TIMEOUT', 300)
+
+ATTENDANCE_RULE_FIELDS = tuple(AttendanceProcessorConfiguration.get_default_config())
+
+
+class AttendanceRules:
+    """
+    Compiled, read-only attendance configuration.
+    
+    Attributes carry the same names as the configuration fields, so hot
+    loops read plain attributes instead of string-keyed dict lookups.
+    Missing values fall back to get_default_config().
+    """
+    
+    __slots__ = ATTENDANCE_RULE_FIELDS + ('config_id', 'company_id', 'weekend_day_set')
+    
+    def __init__(self, values, config_id=None, company_id=None):
+        defaults = AttendanceProcessorConfiguration.get_default_config()
+        for name in ATTENDANCE_RULE_FIELDS:
+            object.__setattr__(self, name, values.get(name, defaults[name]))
+        object.__setattr__(self, 'weekend_days', tuple(self.weekend_days))
+        object.__setattr__(self, 'weekend_day_set', frozenset(self.weekend_days))
+        object.__setattr__(self, 'config_id', config_id)
+        object.__setattr__(self, 'company_id', company_id)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("AttendanceRules is immutable")
+    
+    def __delattr__(self, name):
+        raise AttributeError("AttendanceRules is immutable")
+    
+    def __reduce__(self):
+        return (AttendanceRules, (self.as_dict(), self.config_id, self.company_id))
+    
+    def get(self, name, default=None):
+        """Dict-style access for code written against get_config_dict()"""
+        return getattr(self, name, default)
+    
+    def as_dict(self):
+        values = {name: getattr(self, name) for name in ATTENDANCE_RULE_FIELDS}
+        values['weekend_days'] = list(self.weekend_days)
+        return values
+
+
 # ==================== EMPLOYEE INFORMATION ====================
 
 class Department(models.Model):
@@ -1170,6 +1272,30 @@ class ZkDevice(models.Model):
     is_active = models.BooleanField(_("Active"), default=True)
     description = models.TextField(_("Description"), blank=True, null=True)
     last_synced = models.DateTimeField(_("Last Synced"), null=True, blank=True)
+    sync_record_index = models.PositiveIntegerField(
+        _("Synced Record Index"),
+        default=0,
+        help_text=_("Number of records in the device buffer already synced")
+    )
+    sync_high_water_mark = models.DateTimeField(
+        _("Sync High-Water Mark"),
+        null=True,
+        blank=True,
+        help_text=_("Timestamp of the newest punch synced from the device")
+    )
+    clear_after_import = models.BooleanField(
+        _("Clear After Import"),
+        default=False,
+        help_text=_("Clear the device's attendance buffer after a verified sync")
+    )
+    sync_lease_owner = models.CharField(
+        _("Sync Lease Owner"),
+        max_length=100,
+        blank=True,
+        default='',
+        help_text=_("Sync daemon currently polling the device")
+    )
+    sync_lease_expires = models.DateTimeField(_("Sync Lease Expires"), null=True, blank=True)
     created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
     updated_at = models.DateTimeField(_("Updated At"), auto_now=True)
 
@@ -1182,6 +1308,103 @@ class ZkDevice(models.Model):
         unique_together = ('company', 'ip_address')
         ordering = ['name']
 
+
+class ZkDeviceSyncRun(models.Model):
+    """
+    One scheduled attendance sync of a ZKTeco device, recorded by the
+    run_zkteco_sync_daemon command for monitoring.
+    """
+    device = models.ForeignKey(
+        ZkDevice,
+        on_delete=models.CASCADE,
+        related_name='sync_runs',
+        verbose_name=_("Device")
+    )
+    worker = models.CharField(_("Worker"), max_length=100, blank=True, default='')
+    started_at = models.DateTimeField(_("Started At"))
+    duration = models.FloatField(_("Duration (seconds)"), default=0)
+    success = models.BooleanField(_("Success"), default=False)
+    timed_out = models.BooleanField(_("Timed Out"), default=False)
+    fetched = models.PositiveIntegerField(_("Fetched"), default=0)
+    imported = models.PositiveIntegerField(_("Imported"), default=0)
+    duplicates = models.PositiveIntegerField(_("Duplicates"), default=0)
+    unmatched = models.PositiveIntegerField(_("Unmatched"), default=0)
+    cleared = models.BooleanField(_("Device Buffer Cleared"), default=False)
+    error = models.TextField(_("Error"), blank=True, default='')
+    
+    def __str__(self):
+        return f"{self.device_id} at {self.started_at}"
+    
+    class Meta:
+        verbose_name = _("ZKTeco Device Sync Run")
+        verbose_name_plural = _("ZKTeco Device Sync Runs")
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['device', 'started_at']),
+            models.Index(fields=['started_at']),
+        ]
+
+class DeviceFetch(models.Model):
+    """
+    Data fetched from ZKTeco devices for review, staged server-side until it
+    is imported or expires. The browser only holds the token.
+    """
+    KIND_CHOICES = (
+        ('attendance', _('Attendance')),
+        ('users', _('Users')),
+    )
+
+    token = models.UUIDField(_("Token"), default=uuid.uuid4, unique=True, editable=False)
+    kind = models.CharField(_("Kind"), max_length=20, choices=KIND_CHOICES)
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name='device_fetches',
+        verbose_name=_("Company"),
+        null=True,
+        blank=True
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='device_fetches',
+        verbose_name=_("User"),
+        null=True,
+        blank=True
+    )
+    record_count = models.PositiveIntegerField(_("Record Count"), default=0)
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+    expires_at = models.DateTimeField(_("Expires At"), db_index=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} fetch {self.token}"
+
+    class Meta:
+        verbose_name = _("Device Fetch")
+        verbose_name_plural = _("Device Fetches")
+        ordering = ['-created_at']
+
+
+class DeviceFetchRecord(models.Model):
+    """One staged record of a DeviceFetch, at its position in the fetched list"""
+    fetch = models.ForeignKey(
+        DeviceFetch,
+        on_delete=models.CASCADE,
+        related_name='records',
+        verbose_name=_("Fetch")
+    )
+    index = models.PositiveIntegerField(_("Index"))
+    data = models.JSONField(_("Data"))
+
+    def __str__(self):
+        return f"{self.fetch_id} #{self.index}"
+
+    class Meta:
+        verbose_name = _("Device Fetch Record")
+        verbose_name_plural = _("Device Fetch Records")
+        ordering = ['fetch', 'index']
+        unique_together = ('fetch', 'index')
+
 class Location(models.Model):
     """Represents a geolocation for attendance tracking."""
     name = models.CharField(_("Name"), max_length=100)
@@ -1331,6 +1554,7 @@ class AttendanceLog(models.Model):
         verbose_name = _("Attendance Log")
         verbose_name_plural = _("Attendance Logs")
         ordering = ['-timestamp']
+        unique_together = ('employee', 'device', 'timestamp')
         indexes = [
             models.Index(fields=['employee', 'timestamp']),
             models.Index(fields=['device', 'timestamp']),
@@ -1340,6 +1564,44 @@ class AttendanceLog(models.Model):
         ]
 
 
+class AttendanceDaySummary(models.Model):
+    """
+    Summary of an employee's AttendanceLog punches on one (local) day,
+    maintained by attendance_summary for the log reports. Only days with
+    punches have a row.
+    """
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='day_summaries',
+        verbose_name=_("Employee")
+    )
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Company"))
+    date = models.DateField(_("Date"))
+    punch_count = models.PositiveIntegerField(_("Punch Count"), default=0)
+    first_punch = models.DateTimeField(_("First Punch"))
+    last_punch = models.DateTimeField(_("Last Punch"))
+    is_late = models.BooleanField(_("Late"), default=False)
+    late_minutes = models.IntegerField(_("Late Minutes"), default=0)
+    is_early = models.BooleanField(_("Early Departure"), default=False)
+    early_minutes = models.IntegerField(_("Early Departure Minutes"), default=0)
+    status_code = models.CharField(_("Status Code"), max_length=2)
+    status_display = models.CharField(_("Status"), max_length=150)
+    computed_at = models.DateTimeField(_("Computed At"), default=timezone.now)
+
+    def __str__(self):
+        return f"{self.employee_id} - {self.date} - {self.status_code}"
+
+    class Meta:
+        verbose_name = _("Attendance Day Summary")
+        verbose_name_plural = _("Attendance Day Summaries")
+        ordering = ['date']
+        unique_together = ('employee', 'date')
+        indexes = [
+            models.Index(fields=['company', 'date']),
+        ]
+
+
 
 class Attendance(models.Model):
     """
@@ -1385,6 +1647,145 @@ class Attendance(models.Model):
             models.Index(fields=['date']),
         ]
 
+class AttendanceDirtyDay(models.Model):
+    """
+    An employee-day whose AttendanceLog rows changed since its attendance
+    was last generated. Filled by AttendanceLog signals and bulk imports,
+    drained by the incremental attendance processor.
+    """
+    employee = models.ForeignKey(
+        Employee,
+        on_delete=models.CASCADE,
+        related_name='dirty_attendance_days',
+        verbose_name=_("Employee")
+    )
+    work_date = models.DateField(_("Work Date"))
+    marked_at = models.DateTimeField(_("Marked At"), default=timezone.now)
+    
+    def __str__(self):
+        return f"{self.employee_id} on {self.work_date}"
+    
+    class Meta:
+        verbose_name = _("Dirty Attendance Day")
+        verbose_name_plural = _("Dirty Attendance Days")
+        unique_together = ('employee', 'work_date')
+        ordering = ['work_date']
+        indexes = [
+            models.Index(fields=['marked_at']),
+        ]
+
+
+class AttendanceDataVersion(models.Model):
+    """
+    Single-row counter of changes to the data the attendance reports read.
+    Cached reports are keyed on it, so bumping it invalidates them in every
+    process sharing the database; see report_cache.
+    """
+    version = models.PositiveBigIntegerField(_("Version"), default=0)
+    
+    def __str__(self):
+        return str(self.version)
+    
+    class Meta:
+        verbose_name = _("Attendance Data Version")
+        verbose_name_plural = _("Attendance Data Versions")
+
+
+class AttendanceGenerationJob(models.Model):
+    """
+    Background attendance generation job.
+    Jobs are queued in the database and claimed by the run_attendance_jobs worker.
+    """
+    KIND_CHOICES = (
+        ('preview', _('Preview')),
+        ('generate', _('Generate')),
+        ('log_generate', _('Generate From Logs')),
+        ('rebuild_summaries', _('Rebuild Day Summaries')),
+    )
+    
+    STATUS_CHOICES = (
+        ('queued', _('Queued')),
+        ('running', _('Running')),
+        ('completed', _('Completed')),
+        ('failed', _('Failed')),
+    )
+    
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Company"))
+    kind = models.CharField(_("Kind"), max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(_("Status"), max_length=20, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField(_("Parameters"), default=dict, blank=True)
+    
+    # Progress counters
+    total_units = models.PositiveIntegerField(_("Total Units"), default=0)
+    processed_units = models.PositiveIntegerField(_("Processed Units"), default=0)
+    records_created = models.PositiveIntegerField(_("Records Created"), default=0)
+    records_updated = models.PositiveIntegerField(_("Records Updated"), default=0)
+    error_count = models.PositiveIntegerField(_("Error Count"), default=0)
+    
+    # Results
+    summary = models.JSONField(_("Summary"), default=dict, blank=True)
+    result_file = models.CharField(_("Result File"), max_length=255, blank=True, default='')
+    message = models.TextField(_("Message"), blank=True, default='')
+    error = models.TextField(_("Error"), blank=True, default='')
+    
+    # Worker bookkeeping
+    worker = models.CharField(_("Worker"), max_length=100, blank=True, default='')
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attendance_generation_jobs',
+        verbose_name=_("Created By")
+    )
+    created_at = models.DateTimeField(_("Created At"), auto_now_add=True)
+    started_at = models.DateTimeField(_("Started At"), null=True, blank=True)
+    heartbeat_at = models.DateTimeField(_("Heartbeat At"), null=True, blank=True)
+    finished_at = models.DateTimeField(_("Finished At"), null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.get_status_display()})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+    
+    @property
+    def progress_percent(self):
+        if self.status == 'completed':
+            return 100
+        if not self.total_units:
+            return 0
+        return min(100, round(self.processed_units * 100 / self.total_units))
+    
+    def to_status_dict(self):
+        """JSON-serializable status for polling"""
+        return {
+            'job_id': self.pk,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress_percent,
+            'total_units': self.total_units,
+            'processed_units': self.processed_units,
+            'records_created': self.records_created,
+            'records_updated': self.records_updated,
+            'error_count': self.error_count,
+            'summary': self.summary,
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+    
+    class Meta:
+        verbose_name = _("Attendance Generation Job")
+        verbose_name_plural = _("Attendance Generation Jobs")
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
 class Shift(models.Model):
     """Represents a work shift with start and end times."""
     company = models.ForeignKey(Company, on_delete=models.CASCADE, verbose_name=_("Company"))
@@ -2014,6 +2415,161 @@ class Complaint(models.Model):
 
 # ==================== SIGNALS ====================
 
+@receiver(pre_save, sender=AttendanceLog)
+def remember_original_log_day(sender, instance, **kwargs):
+    """Keep the pre-edit employee and timestamp so the old day is marked too"""
+    instance._original_log_day = None
+    if instance.pk and not instance._state.adding:
+        instance._original_log_day = AttendanceLog.objects.filter(
+            pk=instance.pk
+        ).values_list('employee_id', 'timestamp').first()
+
+
+@receiver(post_save, sender=AttendanceLog)
+def mark_attendance_dirty_on_log_save(sender, instance, raw=False, **kwargs):
+    """Record the employee-days affected by a created or edited log"""
+    if raw:
+        return
+    from .attendance_incremental import mark_logs_dirty
+    
+    changed = [(instance.employee_id, instance.timestamp)]
+    original = getattr(instance, '_original_log_day', None)
+    if original and original != changed[0]:
+        changed.append(original)
+    mark_logs_dirty(changed)
+
+
+@receiver(post_delete, sender=AttendanceLog)
+def mark_attendance_dirty_on_log_delete(sender, instance, **kwargs):
+    """Record the employee-day of a deleted log"""
+    from .attendance_incremental import mark_logs_dirty
+    # Deferred: the delete may be cascading from the employee itself
+    mark_logs_dirty([(instance.employee_id, instance.timestamp)], on_commit=True)
+
+
+@receiver(pre_save, sender=Holiday)
+def remember_original_holiday_date(sender, instance, **kwargs):
+    """Keep the pre-edit date so its day summaries are refreshed too"""
+    instance._original_holiday_date = None
+    if instance.pk and not instance._state.adding:
+        instance._original_holiday_date = Holiday.objects.filter(
+            pk=instance.pk
+        ).values_list('date', flat=True).first()
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+def refresh_day_summaries_on_holiday_change(sender, instance, raw=False, **kwargs):
+    """Holidays change the status of the punched days they fall on"""
+    if raw:
+        return
+    from .attendance_summary import refresh_summaries_between
+    
+    for holiday_date in {instance.date, getattr(instance, '_original_holiday_date', None)} - {None}:
+        refresh_summaries_between(holiday_date, holiday_date, company_id=instance.company_id)
+
+
+@receiver(post_save, sender=LeaveApplication)
+@receiver(post_delete, sender=LeaveApplication)
+def refresh_day_summaries_on_leave_change(sender, instance, raw=False, **kwargs):
+    """Approved leave changes the status of the employee's punched days"""
+    if raw:
+        return
+    from .attendance_summary import refresh_summaries_between
+    
+    start_date, end_date = instance.start_date, instance.end_date
+    original = getattr(instance, '_original_dates', None)
+    if original:
+        start_date, end_date = min(start_date, original[0]), max(end_date, original[1])
+    refresh_summaries_between(start_date, end_date, employee_id=instance.employee_id)
+
+
+@receiver(pre_save, sender=Shift)
+def remember_original_shift_times(sender, instance, **kwargs):
+    """Keep the pre-edit times to tell whether day summaries need a rebuild"""
+    instance._original_shift_times = None
+    if instance.pk and not instance._state.adding:
+        instance._original_shift_times = Shift.objects.filter(
+            pk=instance.pk
+        ).values_list('start_time', 'end_time').first()
+
+
+@receiver(post_save, sender=Shift)
+def rebuild_day_summaries_on_shift_change(sender, instance, created=False, raw=False, **kwargs):
+    """Late arrival and early departure of a day depend on the employee's shift times"""
+    if raw or created:
+        return
+    original = getattr(instance, '_original_shift_times', None)
+    if original == (instance.start_time, instance.end_time):
+        return
+    from .attendance_summary import queue_summary_rebuild
+    
+    queue_summary_rebuild(
+        instance.company_id,
+        Employee.objects.filter(default_shift=instance).values_list('id', flat=True),
+    )
+
+
+@receiver(pre_delete, sender=Shift)
+def rebuild_day_summaries_on_shift_delete(sender, instance, **kwargs):
+    """Employees of a deleted shift lose their default shift"""
+    from .attendance_summary import queue_summary_rebuild
+    
+    queue_summary_rebuild(
+        instance.company_id,
+        Employee.objects.filter(default_shift=instance).values_list('id', flat=True),
+    )
+
+
+@receiver(pre_save, sender=Employee)
+def remember_original_default_shift(sender, instance, **kwargs):
+    """Keep the pre-edit default shift to tell whether day summaries need a rebuild"""
+    instance._original_default_shift_id = None
+    if instance.pk and not instance._state.adding:
+        instance._original_default_shift_id = Employee.objects.filter(
+            pk=instance.pk
+        ).values_list('default_shift_id', flat=True).first()
+
+
+@receiver(post_save, sender=Employee)
+def rebuild_day_summaries_on_default_shift_change(sender, instance, created=False, raw=False, **kwargs):
+    """Late arrival and early departure of a day depend on the employee's default shift"""
+    if raw or created:
+        return
+    if getattr(instance, '_original_default_shift_id', None) == instance.default_shift_id:
+        return
+    from .attendance_summary import queue_summary_rebuild
+    
+    queue_summary_rebuild(instance.company_id, [instance.pk])
+
+
+@receiver(post_delete, sender=AttendanceProcessorConfiguration)
+def invalidate_attendance_rules_on_delete(sender, instance, **kwargs):
+    """Deleting a configuration may remove the company's active rules"""
+    AttendanceProcessorConfiguration.invalidate_rules(instance.company_id)
+
+
+@receiver(post_save, sender=Holiday)
+@receiver(post_delete, sender=Holiday)
+@receiver(post_save, sender=Shift)
+@receiver(post_delete, sender=Shift)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+@receiver(post_save, sender=Designation)
+@receiver(post_delete, sender=Designation)
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_save, sender=LeaveApplication)
+@receiver(post_delete, sender=LeaveApplication)
+def invalidate_reports_on_data_change(sender, instance, raw=False, **kwargs):
+    """Cached attendance reports read this data"""
+    if raw:
+        return
+    invalidate_report_cache()
+
+
 @receiver(post_save, sender=LeaveApplication)
 def update_leave_balance_on_approval(sender, instance, created, **kwargs):
     """
@@ -2077,6 +2633,7 @@ def store_original_status(sender, instance, **kwargs):
         try:
             original = LeaveApplication.objects.get(pk=instance.pk)
             instance._original_status = original.status
+            instance._original_dates = (original.start_date, original.end_date)
         except LeaveApplication.DoesNotExist:
             instance._original_status = None
     else:
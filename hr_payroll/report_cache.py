@@ -0,0 +1,80 @@
+"""
+Cached results of the attendance reports.
+
+A report's computed data is cached under its name, its company, its
+resolved parameters and the attendance data version. The version is a
+counter in the database (AttendanceDataVersion); whenever data a report
+reads changes (attendance logs and records, day summaries, holidays, leave,
+shifts, employees or the attendance configuration) it is bumped once the
+transaction commits, so every report cached under the old value becomes
+unreachable and the next request computes fresh results. Keeping the
+version in the database rather than the cache means a change made by any
+process (web workers, the jobs worker, the device sync daemon) invalidates
+the reports cached by all of them, whatever cache backend they use. Entries
+expire after ATTENDANCE_REPORT_CACHE_TIMEOUT seconds.
+
+The version is global rather than per company: the reports list employees
+and rows of every company, so a change in any company can alter them.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+# Seconds a computed report stays cached
+ATTENDANCE_REPORT_CACHE_TIMEOUT = getattr(settings, 'ATTENDANCE_REPORT_CACHE_TIMEOUT', 900)
+
+DATA_VERSION_PK = 1
+
+
+def get_data_version():
+    """The current data version, 0 before the first change"""
+    from .models import AttendanceDataVersion
+
+    version = AttendanceDataVersion.objects.filter(pk=DATA_VERSION_PK).values_list(
+        'version', flat=True
+    ).first()
+    return version or 0
+
+
+def bump_data_version():
+    """Increment the data version, creating its row on first use"""
+    from .models import AttendanceDataVersion
+
+    versions = AttendanceDataVersion.objects.filter(pk=DATA_VERSION_PK)
+    if not versions.update(version=F('version') + 1):
+        _, created = AttendanceDataVersion.objects.get_or_create(
+            pk=DATA_VERSION_PK, defaults={'version': 1}
+        )
+        if not created:
+            versions.update(version=F('version') + 1)
+
+
+def invalidate_report_cache():
+    """Bump the data version once the current transaction commits"""
+    transaction.on_commit(bump_data_version)
+
+
+def report_cache_key(report, company_id, params):
+    """Cache key of a report of the company at the current data version"""
+    digest = hashlib.md5(repr(sorted(params.items())).encode()).hexdigest()
+    return f"attendance_report_{report}_{company_id}_{get_data_version()}_{digest}"
+
+
+def get_cached_report(report, company, build, **params):
+    """
+    The cached result of report for the company and params, calling build
+    to compute and cache it on a miss. params must identify the result:
+    pass resolved values (dates, filters), not raw request input.
+    """
+    company_id = company.pk if company else None
+    # The version is read before build so data changed meanwhile invalidates it
+    key = report_cache_key(report, company_id, params)
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, ATTENDANCE_REPORT_CACHE_TIMEOUT)
+    return result
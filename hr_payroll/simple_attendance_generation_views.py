@@ -5,25 +5,36 @@
 """
 
 from django.shortcuts import render, redirect
-from django.http import JsonResponse, HttpResponse
+from django.urls import reverse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db import transaction
+from django.db import transaction, connection
 from django.utils import timezone
 from datetime import datetime, date, timedelta, time
 from django.core.cache import cache
+from django.conf import settings
 from decimal import Decimal
 import json
 import logging
-import csv
-from collections import defaultdict
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
 
 from .models import (
     Employee, Attendance, AttendanceProcessorConfiguration,
     Shift, Holiday, LeaveApplication, AttendanceLog,
-    RosterAssignment, RosterDay
+    RosterAssignment, RosterDay, AttendanceGenerationJob
+)
+from .attendance_jobs import iter_job_records, submit_job
+from .report_cache import invalidate_report_cache
+from .streaming import iter_csv_lines
+from .attendance_parallel import iter_parallel_chunks
+from .attendance_kernel import (
+    DayBatch, KernelRules, compute_day_batch, time_to_seconds, to_epoch_us, from_epoch_us,
+    EPOCH_ORDINAL, US_PER_DAY,
 )
 from core.models import Company
 
@@ -50,6 +61,60 @@ def safe_datetime_comparison(dt1, dt2):
     return dt1 > dt2
 
 
+def minute_of_day(value):
+    """Minutes since midnight of a time or local datetime, with fractions"""
+    return value.hour * 60 + value.minute + value.second / 60 + value.microsecond / 60000000
+
+
+class ShiftIndex:
+    """
+    In-memory index of a company's shift start times.
+    
+    Start times are kept as sorted minute-of-day offsets, so matching a
+    check-in is a bisect over the tolerance window instead of a query and a
+    datetime per shift. Windows crossing midnight are searched on the
+    neighbouring days as well.
+    """
+    
+    MINUTES_PER_DAY = 24 * 60
+    
+    def __init__(self, shifts):
+        # Stable sort keeps the Shift default ordering for equal start times
+        entries = sorted(
+            ((minute_of_day(shift.start_time), position, shift)
+             for position, shift in enumerate(shifts)),
+            key=lambda entry: entry[0]
+        )
+        self.offsets = [entry[0] for entry in entries]
+        self.positions = [entry[1] for entry in entries]
+        self.shifts = [entry[2] for entry in entries]
+    
+    @classmethod
+    def for_company(cls, company):
+        return cls(list(Shift.objects.filter(company=company)))
+    
+    def find(self, check_in_minute, tolerance_minutes):
+        """Shifts starting within the tolerance of a check-in minute, in shift order"""
+        best = {}
+        for day_shift in (-self.MINUTES_PER_DAY, 0, self.MINUTES_PER_DAY):
+            target = check_in_minute - day_shift
+            lo = bisect_left(self.offsets, target - tolerance_minutes)
+            hi = bisect_right(self.offsets, target + tolerance_minutes)
+            for i in range(lo, hi):
+                diff_minutes = abs(target - self.offsets[i])
+                if i not in best or diff_minutes < best[i]:
+                    best[i] = diff_minutes
+        
+        return [
+            {
+                'shift': self.shifts[i],
+                'score': tolerance_minutes - diff_minutes,
+                'diff_minutes': diff_minutes
+            }
+            for i, diff_minutes in sorted(best.items(), key=lambda item: self.positions[item[0]])
+        ]
+
+
 class ShiftMatcher:
     """Dynamic Shift Detection Helper"""
     
@@ -57,39 +122,26 @@ class ShiftMatcher:
         self.config = config
         self.tolerance_minutes = config.get('dynamic_shift_tolerance_minutes', 30)
         self.priority = config.get('multiple_shift_priority', 'least_break')
+        self._indexes = {}
+    
+    def get_index(self, company):
+        """Shift index for a company, built once per matcher"""
+        index = self._indexes.get(company.pk)
+        if index is None:
+            index = self._indexes[company.pk] = ShiftIndex.for_company(company)
+        return index
     
     def find_matching_shifts(self, company, check_in_time):
         """Find all shifts that match the check-in time"""
         if not check_in_time:
             return []
         
-        # Ensure timezone aware
-        check_in_time = ensure_timezone_aware(check_in_time)
-        
-        shifts = Shift.objects.filter(company=company)
-        matching_shifts = []
-        
-        for shift in shifts:
-            # Use the actual check-in date for comparison
-            check_in_date = check_in_time.date()
-            
-            # Calculate time difference
-            shift_start = timezone.make_aware(
-                datetime.combine(check_in_date, shift.start_time)
-            )
-            
-            # Calculate difference in minutes
-            diff_minutes = abs((check_in_time - shift_start).total_seconds() / 60)
-            
-            if diff_minutes <= self.tolerance_minutes:
-                score = self.tolerance_minutes - diff_minutes
-                matching_shifts.append({
-                    'shift': shift,
-                    'score': score,
-                    'diff_minutes': diff_minutes
-                })
+        # Compare in local time so shift start times line up with the punch
+        check_in_time = timezone.localtime(ensure_timezone_aware(check_in_time))
         
-        return matching_shifts
+        return self.get_index(company).find(
+            minute_of_day(check_in_time), self.tolerance_minutes
+        )
     
     def select_best_shift(self, matching_shifts):
         """Select best shift based on priority"""
@@ -106,261 +158,152 @@ class ShiftMatcher:
             return sorted(matching_shifts, key=lambda x: x['shift'].name)[0]['shift']
 
 
-class AttendanceCalculator:
-    """Attendance Calculation Helper"""
-    
-    def __init__(self, config):
-        self.config = config
-    
-    def calculate_working_hours(self, check_in, check_out, shift):
-        """Calculate actual working hours with break deduction"""
-        if not check_in or not check_out:
-            return 0.0
-        
-        # Ensure both are timezone aware
-        check_in = ensure_timezone_aware(check_in)
-        check_out = ensure_timezone_aware(check_out)
-        
-        # Total time
-        total_seconds = (check_out - check_in).total_seconds()
-        total_hours = total_seconds / 3600
-        
-        # Deduct break time
-        if self.config.get('use_shift_break_time') and shift:
-            break_minutes = shift.break_time
-        else:
-            break_minutes = self.config.get('default_break_minutes', 60)
-        
-        # Apply break deduction method
-        method = self.config.get('break_deduction_method', 'fixed')
-        
-        if method == 'fixed':
-            # Fixed break deduction
-            break_hours = break_minutes / 60
-            working_hours = max(0, total_hours - break_hours)
-        else:  # proportional
-            # Proportional break based on working hours
-            if total_hours > 4:
-                break_hours = break_minutes / 60
-                working_hours = max(0, total_hours - break_hours)
-            else:
-                working_hours = total_hours
-        
-        return round(working_hours, 2)
-    
-    def calculate_overtime(self, working_hours, shift, employee, is_weekend, is_holiday):
-        """Calculate overtime hours"""
-        config = self.config
-        
-        # Weekend/Holiday full day overtime
-        if is_holiday and config.get('holiday_overtime_full_day'):
-            return working_hours
-        if is_weekend and config.get('weekend_overtime_full_day'):
-            return working_hours
-        
-        # Determine expected hours
-        method = config.get('overtime_calculation_method', 'employee_based')
-        
-        if method == 'shift_based' and shift:
-            expected_hours = shift.duration_hours
-        elif method == 'employee_based':
-            expected_hours = employee.expected_working_hours
-        else:  # fixed_hours
-            expected_hours = 8.0
-        
-        # Calculate overtime
-        overtime_start_threshold = config.get('overtime_start_after_minutes', 15) / 60
-        overtime_hours = max(0, working_hours - expected_hours - overtime_start_threshold)
-        
-        # Check minimum overtime
-        minimum_ot_hours = config.get('minimum_overtime_minutes', 60) / 60
-        if overtime_hours < minimum_ot_hours:
-            overtime_hours = 0
-        
-        # Deduct separate OT break
-        ot_break_minutes = config.get('separate_ot_break_time', 0)
-        if ot_break_minutes > 0 and overtime_hours > 0:
-            overtime_hours = max(0, overtime_hours - (ot_break_minutes / 60))
-        
-        return round(overtime_hours, 2)
-    
-    def is_late(self, check_in_time, shift, employee):
-        """Check if employee is late"""
-        if not check_in_time or not shift:
-            return False
-        
-        # Ensure timezone aware
-        check_in_time = ensure_timezone_aware(check_in_time)
-        
-        # Get grace time
-        if self.config.get('use_shift_grace_time') and shift:
-            grace_minutes = shift.grace_time
-        elif self.config.get('use_employee_specific_grace') and employee.overtime_grace_minutes:
-            grace_minutes = employee.overtime_grace_minutes
-        else:
-            grace_minutes = self.config.get('grace_minutes', 15)
-        
-        # Calculate late - use check_in date
-        shift_start = timezone.make_aware(
-            datetime.combine(check_in_time.date(), shift.start_time)
-        )
-        grace_end = shift_start + timedelta(minutes=grace_minutes)
-        
-        return check_in_time > grace_end
-    
-    def is_early_out(self, check_out_time, shift):
-        """Check if employee left early"""
-        if not check_out_time or not shift:
-            return False
-        
-        # Ensure timezone aware
-        check_out_time = ensure_timezone_aware(check_out_time)
-        
-        threshold_minutes = self.config.get('early_out_threshold_minutes', 30)
-        
-        # Use check_out date
-        shift_end = timezone.make_aware(
-            datetime.combine(check_out_time.date(), shift.end_time)
-        )
-        
-        # Handle overnight shifts
-        if shift.end_time < shift.start_time:
-            shift_end += timedelta(days=1)
-        
-        early_threshold = shift_end - timedelta(minutes=threshold_minutes)
-        
-        return check_out_time < early_threshold
-    
-    def determine_status(self, check_in, check_out, working_hours, shift, is_weekend, is_holiday, has_leave):
-        """Determine attendance status based on rules"""
-        config = self.config
-        
-        # Weekend
-        if is_weekend:
-            return 'W'
-        
-        # Holiday
-        if is_holiday:
-            return 'H'
-        
-        # Leave
-        if has_leave:
-            return 'L'
-        
-        # No attendance logs
-        if not check_in and not check_out:
-            return 'A'
-        
-        # Both in and out required
-        if config.get('require_both_in_and_out'):
-            if not check_in or not check_out:
-                return 'A'
-        
-        # Minimum working hours rule
-        if config.get('enable_minimum_working_hours_rule'):
-            min_hours = config.get('minimum_working_hours_for_present', 4.0)
-            if working_hours < min_hours:
-                return 'A'
-        
-        # Maximum working hours rule (flag for review)
-        if config.get('enable_maximum_working_hours_rule'):
-            max_hours = config.get('maximum_allowable_working_hours', 16.0)
-            if working_hours > max_hours:
-                logger.warning(f"Excessive working hours: {working_hours}")
-        
-        # Working hours half day rule
-        if config.get('enable_working_hours_half_day_rule'):
-            min_half = config.get('half_day_minimum_hours', 4.0)
-            max_half = config.get('half_day_maximum_hours', 6.0)
-            if min_half <= working_hours <= max_half:
-                return 'HD'  # Half Day
-        
-        # Present
-        return 'P'
+LogPunch = namedtuple('LogPunch', ['employee_id', 'timestamp'])
 
 
 class AttendancePreprocessor:
-    """Preprocess data for efficient generation"""
+    """
+    Preprocess data for efficient generation.
+    
+    Storage is columnar to keep large ranges small: punches are per-employee
+    sorted array('q') buffers of epoch microseconds, approved leaves are
+    merged date intervals searched with bisect, and holidays are a bitmap
+    over the range. Punches are bucketed by their stored (UTC) date, as the
+    generation has always done.
+    """
     
-    def __init__(self, company, start_date, end_date):
+    def __init__(self, company, start_date, end_date, employee_ids=None):
         self.company = company
         self.start_date = start_date
         self.end_date = end_date
+        self.employee_ids = employee_ids
         self._load_data()
     
+    def _for_employees(self, queryset, field='employee_id'):
+        """Restrict a queryset to the preprocessor's employees, if any"""
+        if self.employee_ids is None:
+            return queryset
+        return queryset.filter(**{f'{field}__in': self.employee_ids})
+    
     def _load_data(self):
         """Load all required data in bulk"""
-        # Holidays
-        self.holidays = set(
-            Holiday.objects.filter(
-                company=self.company,
-                date__range=[self.start_date, self.end_date]
-            ).values_list('date', flat=True)
-        )
+        start_ordinal = self.start_date.toordinal()
+        end_ordinal = self.end_date.toordinal()
         
-        # Leave Applications
-        self.leaves = defaultdict(set)
-        leave_apps = LeaveApplication.objects.filter(
+        # Holidays: one byte per day of the range
+        self.holidays = bytearray(end_ordinal - start_ordinal + 1)
+        for holiday_date in Holiday.objects.filter(
+            company=self.company,
+            date__range=[self.start_date, self.end_date]
+        ).values_list('date', flat=True):
+            self.holidays[holiday_date.toordinal() - start_ordinal] = 1
+        
+        # Leave Applications: merged (start, end) ordinal intervals per employee
+        intervals = defaultdict(list)
+        leave_apps = self._for_employees(LeaveApplication.objects.filter(
             employee__company=self.company,
             status='A',
             start_date__lte=self.end_date,
             end_date__gte=self.start_date
-        ).select_related('employee')
-        
-        for leave in leave_apps:
-            current = max(leave.start_date, self.start_date)
-            end = min(leave.end_date, self.end_date)
-            while current <= end:
-                self.leaves[leave.employee_id].add(current)
-                current += timedelta(days=1)
-        
-        # Attendance Logs (bulk load)
-        self.attendance_logs = defaultdict(list)
-        logs = AttendanceLog.objects.filter(
+        )).values_list('employee_id', 'start_date', 'end_date')
+        
+        for employee_id, leave_start, leave_end in leave_apps:
+            intervals[employee_id].append((
+                max(leave_start.toordinal(), start_ordinal),
+                min(leave_end.toordinal(), end_ordinal),
+            ))
+        
+        self.leave_starts = {}
+        self.leave_ends = {}
+        for employee_id, spans in intervals.items():
+            starts = []
+            ends = []
+            for span_start, span_end in sorted(spans):
+                if ends and span_start <= ends[-1] + 1:
+                    ends[-1] = max(ends[-1], span_end)
+                else:
+                    starts.append(span_start)
+                    ends.append(span_end)
+            self.leave_starts[employee_id] = starts
+            self.leave_ends[employee_id] = ends
+        
+        # Attendance Logs: sorted epoch microseconds per employee
+        self.punches = {}
+        logs = self._for_employees(AttendanceLog.objects.filter(
             employee__company=self.company,
             timestamp__date__range=[self.start_date, self.end_date]
-        ).select_related('employee').order_by('timestamp')
+        )).order_by('employee_id', 'timestamp').values_list('employee_id', 'timestamp')
         
-        for log in logs:
-            key = (log.employee_id, log.timestamp.date())
-            self.attendance_logs[key].append(log)
+        current_id = None
+        buffer = None
+        for employee_id, timestamp in logs.iterator(chunk_size=5000):
+            if employee_id != current_id:
+                current_id = employee_id
+                buffer = self.punches[employee_id] = array('q')
+            buffer.append(to_epoch_us(timestamp))
         
         # Roster Assignments
         self.roster_shifts = {}
-        roster_days = RosterDay.objects.filter(
+        roster_days = list(self._for_employees(RosterDay.objects.filter(
             roster_assignment__roster__company=self.company,
             date__range=[self.start_date, self.end_date]
-        ).select_related('roster_assignment__employee', 'shift')
+        ), field='roster_assignment__employee_id').values_list(
+            'roster_assignment__employee_id', 'date', 'shift_id'
+        ))
+        shifts = Shift.objects.in_bulk({shift_id for _, _, shift_id in roster_days if shift_id})
         
-        for rd in roster_days:
-            key = (rd.roster_assignment.employee_id, rd.date)
-            self.roster_shifts[key] = rd.shift
+        for employee_id, roster_date, shift_id in roster_days:
+            self.roster_shifts[(employee_id, roster_date)] = shifts.get(shift_id)
         
         # Existing Attendance (for adjacent day checks)
         buffer_start = self.start_date - timedelta(days=2)
         buffer_end = self.end_date + timedelta(days=2)
         
         self.existing_attendance = {}
-        existing = Attendance.objects.filter(
+        existing = self._for_employees(Attendance.objects.filter(
             employee__company=self.company,
             date__range=[buffer_start, buffer_end]
-        ).values('employee_id', 'date', 'status')
+        )).values_list('employee_id', 'date', 'status')
         
-        for att in existing:
-            key = (att['employee_id'], att['date'])
-            self.existing_attendance[key] = att['status']
+        for employee_id, attendance_date, status in existing:
+            self.existing_attendance[(employee_id, attendance_date)] = status
+    
+    def _day_slice(self, employee_id, date):
+        """Punch buffer of an employee and the index range of one UTC day"""
+        buffer = self.punches.get(employee_id)
+        if not buffer:
+            return None, 0, 0
+        day_start = (date.toordinal() - EPOCH_ORDINAL) * US_PER_DAY
+        lo = bisect_left(buffer, day_start)
+        hi = bisect_left(buffer, day_start + US_PER_DAY, lo)
+        return buffer, lo, hi
     
     def get_logs_for_day(self, employee_id, date):
         """Get attendance logs for specific employee and date"""
-        return self.attendance_logs.get((employee_id, date), [])
+        buffer, lo, hi = self._day_slice(employee_id, date)
+        return [LogPunch(employee_id, from_epoch_us(value)) for value in buffer[lo:hi]] if hi > lo else []
+    
+    def get_check_in_out(self, employee_id, date):
+        """First punch of the day, and the last one when there are at least two"""
+        buffer, lo, hi = self._day_slice(employee_id, date)
+        if hi == lo:
+            return None, None
+        check_out = from_epoch_us(buffer[hi - 1]) if hi - lo > 1 else None
+        return from_epoch_us(buffer[lo]), check_out
     
     def has_leave(self, employee_id, date):
         """Check if employee has leave on date"""
-        return date in self.leaves.get(employee_id, set())
+        starts = self.leave_starts.get(employee_id)
+        if not starts:
+            return False
+        ordinal = date.toordinal()
+        i = bisect_right(starts, ordinal) - 1
+        return i >= 0 and ordinal <= self.leave_ends[employee_id][i]
     
     def is_holiday(self, date):
         """Check if date is holiday"""
-        return date in self.holidays
+        index = (date - self.start_date).days
+        return 0 <= index < len(self.holidays) and bool(self.holidays[index])
     
     def get_roster_shift(self, employee_id, date):
         """Get shift from roster"""
@@ -377,6 +320,480 @@ class AttendancePreprocessor:
         return prev_status, next_status
 
 
+# ==================== GENERATION ENGINE ====================
+
+# Number of employees processed per chunk. Only one chunk's logs, leaves and
+# roster days are held in memory at a time.
+GENERATION_CHUNK_SIZE = getattr(settings, 'ATTENDANCE_GENERATION_CHUNK_SIZE', 250)
+
+CSV_HEADER = [
+    'Employee Code', 'Employee Name', 'Department', 'Date',
+    'Check In', 'Check Out', 'Working Hours', 'Overtime Hours',
+    'Overtime Amount', 'Status', 'Shift', 'Late', 'Early Out'
+]
+
+SUMMARY_STATUS_KEYS = {
+    'P': 'present_count',
+    'A': 'absent_count',
+    'L': 'leave_count',
+    'W': 'weekend_count',
+    'H': 'holiday_count',
+    'HD': 'half_day_count',
+}
+
+
+def new_summary():
+    """Empty running summary for a generation run"""
+    return {
+        'total_records': 0,
+        'present_count': 0,
+        'absent_count': 0,
+        'leave_count': 0,
+        'weekend_count': 0,
+        'holiday_count': 0,
+        'half_day_count': 0,
+        'late_count': 0,
+        'early_out_count': 0,
+        'total_overtime_hours': 0,
+        'total_overtime_amount': 0,
+    }
+
+
+def update_summary(summary, record):
+    """Add a single preview record to the running summary"""
+    summary['total_records'] += 1
+    status_key = SUMMARY_STATUS_KEYS.get(record['status'])
+    if status_key:
+        summary[status_key] += 1
+    
+    if record['is_late']:
+        summary['late_count'] += 1
+    if record['is_early_out']:
+        summary['early_out_count'] += 1
+    
+    summary['total_overtime_hours'] += record['overtime_hours']
+    summary['total_overtime_amount'] += record['overtime_amount']
+
+
+def finalize_summary(summary):
+    """Round summary totals for display"""
+    summary['total_overtime_hours'] = round(summary['total_overtime_hours'], 2)
+    summary['total_overtime_amount'] = round(summary['total_overtime_amount'], 2)
+    return summary
+
+
+def record_to_csv_row(record):
+    """Convert a preview record to a CSV row matching CSV_HEADER"""
+    return [
+        record.get('employee_code', ''),
+        record.get('employee_name', ''),
+        record.get('department', ''),
+        record.get('date', ''),
+        record.get('check_in_time', ''),
+        record.get('check_out_time', ''),
+        record.get('working_hours', 0),
+        record.get('overtime_hours', 0),
+        record.get('overtime_amount', 0),
+        record.get('status', ''),
+        record.get('shift_name', ''),
+        'Yes' if record.get('is_late') else 'No',
+        'Yes' if record.get('is_early_out') else 'No'
+    ]
+
+
+class AttendanceGenerationEngine:
+    """
+    Chunked attendance generation for large date ranges.
+    
+    Employees are split into chunks and each chunk is loaded with its own
+    preprocessor, so memory stays flat regardless of headcount or range.
+    Records are yielded one at a time; only the running summary is kept.
+    With workers > 1 the chunks are computed in a process pool.
+    """
+    
+    def __init__(self, company, rules, start_date, end_date, employee_ids=None,
+                 department_ids=None, regenerate_existing=False, chunk_size=None,
+                 workers=1):
+        self.company = company
+        self.rules = rules
+        self.weekend_days = rules.weekend_day_set
+        self.start_date = start_date
+        self.end_date = end_date
+        self.regenerate_existing = regenerate_existing
+        self.chunk_size = chunk_size or GENERATION_CHUNK_SIZE
+        self.workers = workers or 1
+        
+        self.shift_matcher = ShiftMatcher(rules)
+        self.kernel_rules = KernelRules(rules)
+        self._day_starts = {}
+        self.summary = new_summary()
+        
+        self.employee_ids = list(
+            self.select_employees(company, employee_ids, department_ids).values_list('id', flat=True)
+        )
+    
+    @staticmethod
+    def select_employees(company, employee_ids=None, department_ids=None):
+        """Active employees of the company, narrowed to the given employees and departments"""
+        employees_query = Employee.objects.filter(company=company, is_active=True)
+        if employee_ids:
+            employees_query = employees_query.filter(id__in=employee_ids)
+        if department_ids:
+            employees_query = employees_query.filter(department_id__in=department_ids)
+        return employees_query
+    
+    @classmethod
+    def from_params(cls, company, rules, params, **kwargs):
+        """Build an engine from preview request parameters"""
+        return cls(
+            company,
+            rules,
+            datetime.strptime(params['start_date'], '%Y-%m-%d').date(),
+            datetime.strptime(params['end_date'], '%Y-%m-%d').date(),
+            employee_ids=params.get('employee_ids'),
+            department_ids=params.get('department_ids'),
+            regenerate_existing=params.get('regenerate_existing', False),
+            **kwargs
+        )
+    
+    @property
+    def total_days(self):
+        return (self.end_date - self.start_date).days + 1
+    
+    def iter_chunks(self):
+        """Yield lists of employee IDs of at most chunk_size"""
+        for i in range(0, len(self.employee_ids), self.chunk_size):
+            yield self.employee_ids[i:i + self.chunk_size]
+    
+    def iter_chunk_records(self):
+        """Yield (chunk_ids, records) per chunk, in chunk order"""
+        if self.workers > 1 and len(self.employee_ids) > self.chunk_size:
+            yield from iter_parallel_chunks(self, self.workers)
+            return
+        
+        for chunk_ids in self.iter_chunks():
+            yield chunk_ids, self.process_chunk(chunk_ids)
+    
+    def iter_records(self):
+        """Yield preview records for the whole range, chunk by chunk"""
+        for chunk_ids, records in self.iter_chunk_records():
+            yield from records
+    
+    def process_chunk(self, employee_ids):
+        """Yield preview records for one chunk of employees"""
+        employees = list(
+            Employee.objects.filter(id__in=employee_ids)
+            .select_related('department', 'default_shift')
+        )
+        preprocessor = AttendancePreprocessor(
+            self.company, self.start_date, self.end_date, employee_ids=employee_ids
+        )
+        
+        days = []
+        batch = DayBatch()
+        current_date = self.start_date
+        while current_date <= self.end_date:
+            is_weekend = current_date.weekday() in self.weekend_days
+            is_holiday = preprocessor.is_holiday(current_date)
+            
+            for employee in employees:
+                # Skip if already exists and not regenerating
+                if not self.regenerate_existing:
+                    existing = preprocessor.existing_attendance.get((employee.id, current_date))
+                    if existing:
+                        continue
+                
+                days.append(self.add_day(
+                    batch, employee, current_date, is_weekend, is_holiday, preprocessor
+                ))
+            
+            current_date += timedelta(days=1)
+        
+        # One kernel pass computes every employee-day of the chunk
+        results = compute_day_batch(batch, self.kernel_rules)
+        
+        for i, (employee, current_date, check_in, check_out, shift) in enumerate(days):
+            record = self.build_record(
+                employee, current_date, check_in, check_out, shift,
+                working_hours=results['working_hours'][i],
+                overtime_hours=results['overtime_hours'][i],
+                status=results['status'][i],
+                is_late=results['is_late'][i],
+                is_early_out=results['is_early_out'][i],
+            )
+            update_summary(self.summary, record)
+            yield record
+    
+    def resolve_shift(self, employee, current_date, check_in, preprocessor):
+        """Roster shift, then default shift, then dynamic detection"""
+        rules = self.rules
+        
+        # 1. First check roster
+        shift = preprocessor.get_roster_shift(employee.id, current_date)
+        
+        # 2. If no roster, check default shift
+        if not shift:
+            shift = employee.default_shift
+        
+        # 3. If no default shift and dynamic detection enabled
+        if not shift and rules.enable_dynamic_shift_detection and check_in:
+            matching_shifts = self.shift_matcher.find_matching_shifts(self.company, check_in)
+            if matching_shifts:
+                shift = self.shift_matcher.select_best_shift(matching_shifts)
+            elif rules.dynamic_shift_fallback_to_default:
+                shift = employee.default_shift
+            elif rules.dynamic_shift_fallback_shift_id:
+                try:
+                    shift = Shift.objects.get(id=rules.dynamic_shift_fallback_shift_id)
+                except Shift.DoesNotExist:
+                    pass
+        
+        return shift
+    
+    def add_day(self, batch, employee, current_date, is_weekend, is_holiday, preprocessor):
+        """Resolve one employee-day and append its kernel inputs to the batch"""
+        rules = self.rules
+        
+        # First and last punch of the day
+        check_in, check_out = preprocessor.get_check_in_out(employee.id, current_date)
+        
+        shift = self.resolve_shift(employee, current_date, check_in, preprocessor)
+        
+        # Shift values take precedence over the configured defaults
+        if rules.use_shift_break_time and shift:
+            break_minutes = shift.break_time
+        else:
+            break_minutes = rules.default_break_minutes
+        
+        if rules.use_shift_grace_time and shift:
+            grace_minutes = shift.grace_time
+        elif rules.use_employee_specific_grace and employee.overtime_grace_minutes:
+            grace_minutes = employee.overtime_grace_minutes
+        else:
+            grace_minutes = rules.grace_minutes
+        
+        method = rules.overtime_calculation_method
+        if method == 'shift_based' and shift:
+            expected_hours = shift.duration_hours
+        elif method == 'employee_based' and employee.expected_working_hours is not None:
+            expected_hours = employee.expected_working_hours
+        else:  # fixed_hours
+            expected_hours = 8.0
+        
+        batch.append(
+            check_in=to_epoch_us(check_in),
+            check_out=to_epoch_us(check_out),
+            check_in_day=self.day_start_us(check_in),
+            check_out_day=self.day_start_us(check_out),
+            shift_start=time_to_seconds(shift.start_time) if shift else None,
+            shift_end=time_to_seconds(shift.end_time) if shift else None,
+            break_minutes=break_minutes,
+            grace_minutes=grace_minutes,
+            expected_hours=expected_hours,
+            is_weekend=is_weekend,
+            is_holiday=is_holiday,
+            has_leave=preprocessor.has_leave(employee.id, current_date),
+        )
+        return employee, current_date, check_in, check_out, shift
+    
+    def day_start_us(self, value):
+        """Epoch microseconds of the local midnight on the punch's own date"""
+        if value is None:
+            return None
+        day = value.date()
+        day_start = self._day_starts.get(day)
+        if day_start is None:
+            day_start = self._day_starts[day] = to_epoch_us(
+                timezone.make_aware(datetime.combine(day, time.min))
+            )
+        return day_start
+    
+    def build_record(self, employee, current_date, check_in, check_out, shift,
+                     working_hours, overtime_hours, status, is_late, is_early_out):
+        """Assemble the preview record for one calculated employee-day"""
+        # Calculate overtime amount
+        if self.rules.use_employee_specific_overtime:
+            ot_rate = employee.get_overtime_rate()
+        else:
+            ot_rate = float(employee.get_hourly_rate() * 1.5)
+        
+        overtime_amount = round(overtime_hours * ot_rate, 2)
+        
+        return {
+            'employee_id': employee.id,
+            'employee_name': employee.name,
+            'employee_code': employee.employee_id,
+            'department': employee.department.name if employee.department else 'General',
+            'date': current_date.isoformat(),
+            'check_in_time': check_in.strftime('%H:%M:%S') if check_in else None,
+            'check_out_time': check_out.strftime('%H:%M:%S') if check_out else None,
+            'working_hours': working_hours,
+            'overtime_hours': overtime_hours,
+            'overtime_amount': overtime_amount,
+            'status': status,
+            'shift_id': shift.id if shift else None,
+            'shift_name': shift.name if shift else 'No Shift',
+            'is_late': is_late,
+            'is_early_out': is_early_out,
+        }
+
+
+# ==================== BULK WRITER ====================
+
+# Number of attendance rows written per bulk statement
+ATTENDANCE_WRITE_BATCH_SIZE = getattr(settings, 'ATTENDANCE_WRITE_BATCH_SIZE', 1000)
+
+ATTENDANCE_WRITE_FIELDS = [
+    'check_in_time', 'check_out_time', 'status', 'overtime_hours', 'shift', 'updated_at'
+]
+
+
+class AttendanceBulkWriter:
+    """
+    Batched writer for generated attendance records.
+    
+    Shifts and employee default shifts are resolved with one query each.
+    Every batch is split into inserts and updates against the existing
+    (employee, date) rows; backends with native upsert write the whole batch
+    in one INSERT ... ON CONFLICT, others use bulk_create + bulk_update.
+    """
+    
+    def __init__(self, company, batch_size=None):
+        self.company = company
+        self.batch_size = batch_size or ATTENDANCE_WRITE_BATCH_SIZE
+        self.use_upsert = connection.features.supports_update_conflicts_with_target
+        
+        self.shift_ids = set()
+        self.shift_ids_by_name = {}
+        for shift_id, name in Shift.objects.filter(company=company).values_list('id', 'name'):
+            self.shift_ids.add(shift_id)
+            self.shift_ids_by_name.setdefault(name, shift_id)
+        
+        self.default_shift_ids = dict(
+            Employee.objects.filter(company=company).values_list('id', 'default_shift_id')
+        )
+        
+        self.created_count = 0
+        self.updated_count = 0
+        self.error_count = 0
+        self._pending = []
+    
+    def write(self, records):
+        """Write an iterable of preview records and flush the last batch"""
+        for record in records:
+            self.add(record)
+        self.flush()
+        return self
+    
+    def add(self, record):
+        """Queue one preview record, flushing when the batch is full"""
+        try:
+            self._pending.append(self._build_attendance(record))
+        except Exception as e:
+            self.error_count += 1
+            logger.error(f"Error processing record: {e}", exc_info=True)
+        
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+    
+    def add_attendance(self, attendance):
+        """Queue an already built Attendance, flushing when the batch is full"""
+        self._pending.append(attendance)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+    
+    def flush(self):
+        """Write all queued records"""
+        if not self._pending:
+            return
+        
+        batch = {(att.employee_id, att.date): att for att in self._pending}
+        self._pending = []
+        
+        dates = [key[1] for key in batch]
+        existing_ids = {
+            (employee_id, day): pk
+            for pk, employee_id, day in Attendance.objects.filter(
+                employee_id__in={key[0] for key in batch},
+                date__range=[min(dates), max(dates)]
+            ).values_list('id', 'employee_id', 'date')
+        }
+        
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        for key, attendance in batch.items():
+            attendance.updated_at = now
+            if key in existing_ids:
+                to_update.append(attendance)
+            else:
+                to_create.append(attendance)
+        
+        if self.use_upsert:
+            Attendance.objects.bulk_create(
+                to_create + to_update,
+                batch_size=self.batch_size,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=ATTENDANCE_WRITE_FIELDS,
+            )
+        else:
+            for attendance in to_update:
+                attendance.pk = existing_ids[(attendance.employee_id, attendance.date)]
+            Attendance.objects.bulk_create(to_create, batch_size=self.batch_size)
+            Attendance.objects.bulk_update(
+                to_update, ATTENDANCE_WRITE_FIELDS, batch_size=self.batch_size
+            )
+        
+        self.created_count += len(to_create)
+        self.updated_count += len(to_update)
+        invalidate_report_cache()
+    
+    def _build_attendance(self, record):
+        """Build an unsaved Attendance from a preview record"""
+        employee_id = record['employee_id']
+        if employee_id not in self.default_shift_ids:
+            raise Employee.DoesNotExist(f"Employee {employee_id} not found")
+        
+        date_obj = datetime.strptime(record['date'], '%Y-%m-%d').date()
+        
+        return Attendance(
+            employee_id=employee_id,
+            date=date_obj,
+            check_in_time=self._parse_time(date_obj, record.get('check_in_time')),
+            check_out_time=self._parse_time(date_obj, record.get('check_out_time')),
+            status=record['status'],
+            overtime_hours=Decimal(str(record.get('overtime_hours', 0))),
+            shift_id=self._resolve_shift_id(record),
+        )
+    
+    def _resolve_shift_id(self, record):
+        """Shift from the record, falling back to the employee's default shift"""
+        shift_id = record.get('shift_id')
+        if shift_id in self.shift_ids:
+            return shift_id
+        
+        shift_name = record.get('shift_name')
+        if shift_name and shift_name != 'No Shift' and shift_name in self.shift_ids_by_name:
+            return self.shift_ids_by_name[shift_name]
+        
+        return self.default_shift_ids.get(record['employee_id'])
+    
+    @staticmethod
+    def _parse_time(date_obj, value):
+        if not value:
+            return None
+        return timezone.make_aware(datetime.combine(date_obj, time.fromisoformat(value)))
+
+
+def streaming_csv_response(records):
+    """Stream preview records as a downloadable CSV file"""
+    lines = iter_csv_lines(CSV_HEADER, map(record_to_csv_row, records))
+    response = StreamingHttpResponse(lines, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="attendance_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
+    return response
+
+
 # ==================== MAIN VIEW FUNCTIONS ====================
 
 def get_company_from_request(request):
@@ -458,7 +875,12 @@ def simple_attendance_generation(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def simple_attendance_preview(request):
-    """Generate attendance preview with full configuration support"""
+    """
+    Queue an attendance preview with full configuration support.
+    
+    The preview is computed by the attendance job worker; the response
+    carries the job id and the URLs to poll for progress and records.
+    """
     try:
         data = json.loads(request.body.decode('utf-8'))
         company = get_company_from_request(request)
@@ -477,180 +899,28 @@ def simple_attendance_preview(request):
             return JsonResponse({'success': False, 'error': 'End date must be after start date'})
         
         # Get configuration
-        config = AttendanceProcessorConfiguration.get_active_config(company)
-        if not config:
+        rules = AttendanceProcessorConfiguration.get_rules(company)
+        if not rules:
             return JsonResponse({'success': False, 'error': 'No active configuration found'})
         
-        config_dict = config.get_config_dict()
-        weekend_days = config.weekend_days
-        
-        # Get employees with filters
-        employees_query = Employee.objects.filter(company=company, is_active=True)
-        
-        if data.get('employee_ids'):
-            employees_query = employees_query.filter(id__in=data['employee_ids'])
-        if data.get('department_ids'):
-            employees_query = employees_query.filter(department_id__in=data['department_ids'])
-        
-        employees = employees_query.select_related('department', 'default_shift')
-        
+        employees = AttendanceGenerationEngine.select_employees(
+            company, data.get('employee_ids'), data.get('department_ids')
+        )
         if not employees.exists():
             return JsonResponse({'success': False, 'error': 'No employees found'})
         
-        # Initialize helpers
-        preprocessor = AttendancePreprocessor(company, start_date, end_date)
-        shift_matcher = ShiftMatcher(config_dict)
-        calculator = AttendanceCalculator(config_dict)
-        
-        # Generate preview data
-        preview_data = []
-        summary = {
-            'total_records': 0,
-            'present_count': 0,
-            'absent_count': 0,
-            'leave_count': 0,
-            'weekend_count': 0,
-            'holiday_count': 0,
-            'half_day_count': 0,
-            'late_count': 0,
-            'early_out_count': 0,
-            'total_overtime_hours': 0,
-            'total_overtime_amount': 0,
-        }
+        job = submit_job(company, 'preview', data, request.user)
         
-        current_date = start_date
-        while current_date <= end_date:
-            is_weekend = current_date.weekday() in weekend_days
-            is_holiday = preprocessor.is_holiday(current_date)
-            
-            for employee in employees:
-                # Skip if already exists and not regenerating
-                if not data.get('regenerate_existing'):
-                    existing = preprocessor.existing_attendance.get((employee.id, current_date))
-                    if existing:
-                        continue
-                
-                # Get logs for the day
-                logs = preprocessor.get_logs_for_day(employee.id, current_date)
-                
-                check_in = logs[0].timestamp if logs else None
-                check_out = logs[-1].timestamp if len(logs) > 1 else None
-                
-                # Determine shift
-                shift = None
-                
-                # 1. First check roster
-                shift = preprocessor.get_roster_shift(employee.id, current_date)
-                
-                # 2. If no roster, check default shift
-                if not shift:
-                    shift = employee.default_shift
-                
-                # 3. If no default shift and dynamic detection enabled
-                if not shift and config_dict.get('enable_dynamic_shift_detection') and check_in:
-                    matching_shifts = shift_matcher.find_matching_shifts(company, check_in)
-                    if matching_shifts:
-                        shift = shift_matcher.select_best_shift(matching_shifts)
-                    elif config_dict.get('dynamic_shift_fallback_to_default'):
-                        shift = employee.default_shift
-                    elif config_dict.get('dynamic_shift_fallback_shift_id'):
-                        try:
-                            shift = Shift.objects.get(id=config_dict['dynamic_shift_fallback_shift_id'])
-                        except Shift.DoesNotExist:
-                            pass
-                
-                # Check leave
-                has_leave = preprocessor.has_leave(employee.id, current_date)
-                
-                # Calculate working hours
-                working_hours = calculator.calculate_working_hours(check_in, check_out, shift)
-                
-                # Calculate overtime
-                overtime_hours = calculator.calculate_overtime(
-                    working_hours, shift, employee, is_weekend, is_holiday
-                )
-                
-                # Determine status
-                status = calculator.determine_status(
-                    check_in, check_out, working_hours, shift,
-                    is_weekend, is_holiday, has_leave
-                )
-                
-                # Check late and early out
-                is_late = calculator.is_late(check_in, shift, employee)
-                is_early = calculator.is_early_out(check_out, shift)
-                
-                # Calculate overtime amount
-                if config_dict.get('use_employee_specific_overtime'):
-                    ot_rate = employee.get_overtime_rate()
-                else:
-                    ot_rate = float(employee.get_hourly_rate() * 1.5)
-                
-                overtime_amount = round(overtime_hours * ot_rate, 2)
-                
-                # Update summary
-                summary['total_records'] += 1
-                if status == 'P':
-                    summary['present_count'] += 1
-                elif status == 'A':
-                    summary['absent_count'] += 1
-                elif status == 'L':
-                    summary['leave_count'] += 1
-                elif status == 'W':
-                    summary['weekend_count'] += 1
-                elif status == 'H':
-                    summary['holiday_count'] += 1
-                elif status == 'HD':
-                    summary['half_day_count'] += 1
-                
-                if is_late:
-                    summary['late_count'] += 1
-                if is_early:
-                    summary['early_out_count'] += 1
-                
-                summary['total_overtime_hours'] += overtime_hours
-                summary['total_overtime_amount'] += overtime_amount
-                
-                # Create preview record
-                preview_record = {
-                    'employee_id': employee.id,
-                    'employee_name': employee.name,
-                    'employee_code': employee.employee_id,
-                    'department': employee.department.name if employee.department else 'General',
-                    'date': current_date.isoformat(),
-                    'check_in_time': check_in.strftime('%H:%M:%S') if check_in else None,
-                    'check_out_time': check_out.strftime('%H:%M:%S') if check_out else None,
-                    'working_hours': working_hours,
-                    'overtime_hours': overtime_hours,
-                    'overtime_amount': overtime_amount,
-                    'status': status,
-                    'shift_name': shift.name if shift else 'No Shift',
-                    'is_late': is_late,
-                    'is_early_out': is_early,
-                }
-                
-                preview_data.append(preview_record)
-            
-            current_date += timedelta(days=1)
-        
-        # Round summary values
-        summary['total_overtime_hours'] = round(summary['total_overtime_hours'], 2)
-        summary['total_overtime_amount'] = round(summary['total_overtime_amount'], 2)
-        
-        # Cache preview data
+        # Cache only the parameters and the job; generation re-runs the
+        # engine and export reads the job's stored records
         cache_key = f"simple_preview_{request.user.id}"
         cache.set(cache_key, {
-            'data': preview_data,
             'params': data,
+            'job_id': job.id,
             'timestamp': timezone.now().isoformat()
         }, 1800)
         
-        return JsonResponse({
-            'success': True,
-            'preview_data': preview_data,
-            'summary': summary,
-            'message': f'Successfully generated {len(preview_data)} preview records'
-        })
+        return JsonResponse(job_submitted_response(job, 'Preview queued'))
         
     except json.JSONDecodeError as e:
         return JsonResponse({'success': False, 'error': f'Invalid JSON: {str(e)}'})
@@ -663,100 +933,29 @@ def simple_attendance_preview(request):
 @csrf_exempt
 @require_http_methods(["POST"])
 def simple_generate_records(request):
-    """Generate attendance records from cached preview"""
+    """Queue attendance generation for the cached preview parameters"""
     try:
         company = get_company_from_request(request)
         if not company:
             return JsonResponse({'success': False, 'error': 'No company access found'})
         
-        # Get cached data
+        # Get cached preview parameters
         cache_key = f"simple_preview_{request.user.id}"
         cached_data = cache.get(cache_key)
         
-        if not cached_data:
+        if not cached_data or not cached_data.get('params'):
             return JsonResponse({'success': False, 'error': 'Preview data expired'})
         
-        preview_data = cached_data.get('data', [])
-        if not preview_data:
-            return JsonResponse({'success': False, 'error': 'No data available'})
-        
-        generated_count = 0
-        updated_count = 0
-        error_count = 0
+        rules = AttendanceProcessorConfiguration.get_rules(company)
+        if not rules:
+            return JsonResponse({'success': False, 'error': 'No active configuration found'})
         
-        with transaction.atomic():
-            for record in preview_data:
-                try:
-                    employee = Employee.objects.get(id=record['employee_id'])
-                    date_obj = datetime.strptime(record['date'], '%Y-%m-%d').date()
-                    
-                    # Parse times
-                    check_in_time = None
-                    check_out_time = None
-                    
-                    if record.get('check_in_time'):
-                        check_in_time = datetime.strptime(
-                            f"{record['date']} {record['check_in_time']}", 
-                            '%Y-%m-%d %H:%M:%S'
-                        )
-                        check_in_time = timezone.make_aware(check_in_time)
-                    
-                    if record.get('check_out_time'):
-                        check_out_time = datetime.strptime(
-                            f"{record['date']} {record['check_out_time']}", 
-                            '%Y-%m-%d %H:%M:%S'
-                        )
-                        check_out_time = timezone.make_aware(check_out_time)
-                    
-                    # Get shift
-                    shift = None
-                    if record.get('shift_name') and record['shift_name'] != 'No Shift':
-                        try:
-                            shift = Shift.objects.get(
-                                company=company,
-                                name=record['shift_name']
-                            )
-                        except Shift.DoesNotExist:
-                            shift = employee.default_shift
-                    else:
-                        shift = employee.default_shift
-                    
-                    # Create or update attendance
-                    attendance, created = Attendance.objects.update_or_create(
-                        employee=employee,
-                        date=date_obj,
-                        defaults={
-                            'check_in_time': check_in_time,
-                            'check_out_time': check_out_time,
-                            'status': record['status'],
-                            'overtime_hours': Decimal(str(record.get('overtime_hours', 0))),
-                            'shift': shift,
-                        }
-                    )
-                    
-                    if created:
-                        generated_count += 1
-                    else:
-                        updated_count += 1
-                        
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"Error processing record: {e}", exc_info=True)
+        job = submit_job(company, 'generate', cached_data['params'], request.user)
         
         # Clear cache
         cache.delete(cache_key)
         
-        message = f'Generated {generated_count}, Updated {updated_count}'
-        if error_count > 0:
-            message += f', Errors {error_count}'
-        
-        return JsonResponse({
-            'success': True,
-            'records_created': generated_count,
-            'records_updated': updated_count,
-            'error_count': error_count,
-            'message': message
-        })
+        return JsonResponse(job_submitted_response(job, 'Generation queued'))
         
     except Exception as e:
         logger.error(f"Generate records error: {str(e)}", exc_info=True)
@@ -766,7 +965,12 @@ def simple_generate_records(request):
 @login_required
 @require_http_methods(["GET"])
 def simple_export_csv(request):
-    """Export preview data to CSV"""
+    """
+    Stream the records of the cached preview job as CSV.
+    
+    The records are the ones the job worker stored for the preview, so the
+    request never runs the engine itself.
+    """
     try:
         company = get_company_from_request(request)
         if not company:
@@ -775,50 +979,100 @@ def simple_export_csv(request):
         cache_key = f"simple_preview_{request.user.id}"
         cached_data = cache.get(cache_key)
         
-        if not cached_data:
+        if not cached_data or not cached_data.get('params'):
+            return JsonResponse({'success': False, 'error': 'No preview data found'})
+        
+        job = get_job_for_request(request, cached_data.get('job_id'))
+        if not job:
             return JsonResponse({'success': False, 'error': 'No preview data found'})
+        if job.status != 'completed' or not job.result_file:
+            return JsonResponse({'success': False, 'error': 'Preview is not finished yet'})
         
-        preview_data = cached_data.get('data', [])
-        if not preview_data:
-            return JsonResponse({'success': False, 'error': 'No data to export'})
-        
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="attendance_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv"'
-        
-        writer = csv.writer(response)
-        
-        # Write header
-        writer.writerow([
-            'Employee Code', 'Employee Name', 'Department', 'Date',
-            'Check In', 'Check Out', 'Working Hours', 'Overtime Hours',
-            'Overtime Amount', 'Status', 'Shift', 'Late', 'Early Out'
-        ])
-        
-        # Write data
-        for record in preview_data:
-            writer.writerow([
-                record.get('employee_code', ''),
-                record.get('employee_name', ''),
-                record.get('department', ''),
-                record.get('date', ''),
-                record.get('check_in_time', ''),
-                record.get('check_out_time', ''),
-                record.get('working_hours', 0),
-                record.get('overtime_hours', 0),
-                record.get('overtime_amount', 0),
-                record.get('status', ''),
-                record.get('shift_name', ''),
-                'Yes' if record.get('is_late') else 'No',
-                'Yes' if record.get('is_early_out') else 'No'
-            ])
-        
-        return response
+        return streaming_csv_response(iter_job_records(job))
         
     except Exception as e:
         logger.error(f"Export error: {str(e)}", exc_info=True)
         return JsonResponse({'success': False, 'error': f'Export failed: {str(e)}'})
 
 
+# ==================== JOB STATUS ====================
+
+def job_submitted_response(job, message):
+    return {
+        'success': True,
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': reverse('zkteco:attendance_job_status', args=[job.id]),
+        'records_url': reverse('zkteco:attendance_job_records', args=[job.id]),
+        'message': message,
+    }
+
+
+def get_job_for_request(request, job_id):
+    jobs = AttendanceGenerationJob.objects.all()
+    if not request.user.is_staff:
+        jobs = jobs.filter(created_by=request.user)
+    return jobs.filter(id=job_id).first()
+
+
+@login_required
+@require_http_methods(["GET"])
+def attendance_job_status(request, job_id):
+    """Progress and outcome of an attendance generation job"""
+    job = get_job_for_request(request, job_id)
+    if not job:
+        return JsonResponse({'success': False, 'error': 'Job not found'})
+    
+    return JsonResponse({'success': True, 'job': job.to_status_dict()})
+
+
+@login_required
+@require_http_methods(["GET"])
+def attendance_job_records(request, job_id):
+    """
+    Stream the records of a finished preview job as NDJSON.
+    
+    Lines are a start line, up to ``limit`` record lines and the summary,
+    the same framing the preview page renders.
+    """
+    job = get_job_for_request(request, job_id)
+    if not job:
+        return JsonResponse({'success': False, 'error': 'Job not found'})
+    
+    if job.status != 'completed' or not job.result_file:
+        return JsonResponse({'success': False, 'error': 'Job has no records available'})
+    
+    try:
+        limit = int(request.GET.get('limit', 0))
+    except ValueError:
+        limit = 0
+    
+    def stream():
+        yield json.dumps({
+            'type': 'start',
+            'total_records': job.summary.get('total_records', 0),
+        }) + '\n'
+        try:
+            with open(job.result_file, encoding='utf-8') as result_file:
+                for count, line in enumerate(result_file, 1):
+                    # Records are stored pre-serialized; frame them without re-parsing
+                    yield '{"type": "record", "data": ' + line.rstrip('\n') + '}\n'
+                    if limit and count >= limit:
+                        break
+        except OSError as e:
+            logger.error(f"Job records error: {str(e)}", exc_info=True)
+            yield json.dumps({'type': 'error', 'error': 'Job records are no longer available'}) + '\n'
+            return
+        
+        yield json.dumps({
+            'type': 'summary',
+            'summary': job.summary,
+            'message': job.message,
+        }) + '\n'
+    
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
+
+
 # ==================== VALIDATION & ANALYSIS ====================
 
 @login_required
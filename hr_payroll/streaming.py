@@ -0,0 +1,24 @@
+"""
+Helpers for streaming CSV responses.
+
+csv.writer normally writes into a file; writing into Echo instead returns
+each formatted line, so rows can be yielded to a StreamingHttpResponse as
+they are produced rather than collected first.
+"""
+
+import csv
+
+
+class Echo:
+    """Pseudo-buffer for csv.writer that returns rows instead of storing them"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv_lines(header, rows):
+    """Yield the header and each row as a CSV line"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
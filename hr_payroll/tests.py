@@ -0,0 +1,1029 @@
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import socket
+import sqlite3
+import tempfile
+import threading
+import unittest
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.contrib.auth.models import User
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.models import Company
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+from .attendance_import import import_attendance_logs, parse_punch_timestamp
+from .attendance_incremental import IncrementalAttendanceProcessor
+from .attendance_jobs import claim_next_job, requeue_stale_jobs, run_job
+from .attendance_kernel import (
+    NUMPY_AVAILABLE, US_PER_DAY, US_PER_SECOND, DayBatch, compute_day_batch, to_epoch_us,
+)
+from .attendance_summary import AttendanceCalendar, rebuild_day_summaries
+from .models import (
+    Attendance, AttendanceDaySummary, AttendanceDirtyDay, AttendanceGenerationJob, AttendanceLog,
+    AttendanceProcessorConfiguration, Employee, Holiday, LeaveApplication, LeaveType, Shift, ZkDevice,
+)
+from .report_cache import get_cached_report
+from .simple_attendance_generation_views import (
+    CSV_HEADER, AttendanceBulkWriter, AttendanceGenerationEngine, ShiftIndex, ShiftMatcher,
+    finalize_summary, minute_of_day, simple_attendance_preview, simple_export_csv,
+)
+from .views.attendance_log_reports import (
+    DailyAttendanceLogReportView, ExportAttendanceReportView, MonthlyAttendanceLogReportView,
+)
+from .zkteco_device_manager import ZK_AVAILABLE, ZKTecoDeviceManager
+from .zkteco_simulator import DeviceSimulator, SimulatedDevice, generate_punches
+from .zkteco_sync import DeviceAttendanceSync, claim_due_devices, lock_devices
+
+# Monday; Friday 2025-01-10 is a weekend day under the default configuration
+START_DATE = date(2025, 1, 6)
+END_DATE = date(2025, 1, 12)
+
+
+def local_datetime(day, hour, minute=0):
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+def create_attendance_data(test):
+    """A company with a shift, a device, a holiday, a leave and punches for a week"""
+    test.company = Company.objects.create(company_code='C1', name='Company One')
+    test.config = AttendanceProcessorConfiguration.objects.create(
+        company=test.company, name='Default', is_active=True
+    )
+    test.day_shift = Shift.objects.create(
+        company=test.company, name='Day', start_time=time(9), end_time=time(17), break_time=60
+    )
+    test.device = ZkDevice.objects.create(company=test.company, name='Gate', ip_address='10.0.0.1')
+
+    test.employee = Employee.objects.create(
+        company=test.company, employee_id='E001', zkteco_id='1', name='Employee 1',
+        default_shift=test.day_shift, base_salary=Decimal('22000.00'),
+    )
+    test.others = [
+        Employee.objects.create(
+            company=test.company, employee_id=f'E{i:03d}', zkteco_id=str(i), name=f'Employee {i}',
+            default_shift=test.day_shift if i % 2 else None, base_salary=Decimal('30000.00'),
+        )
+        for i in range(2, 6)
+    ]
+
+    Holiday.objects.create(company=test.company, name='Holiday', date=date(2025, 1, 8))
+    leave_type = LeaveType.objects.create(company=test.company, name='Casual', code='CL')
+    LeaveApplication.objects.create(
+        employee=test.employee, leave_type=leave_type,
+        start_date=date(2025, 1, 9), end_date=date(2025, 1, 9), status='A',
+    )
+
+    punches = [
+        (date(2025, 1, 6), (8, 55), (18, 30)),
+        (date(2025, 1, 7), (9, 40), (16, 0)),
+        (date(2025, 1, 8), (9, 0), (20, 0)),
+        (date(2025, 1, 11), (8, 0), (20, 15)),
+    ]
+    logs = []
+    for day, check_in, check_out in punches:
+        logs.append(AttendanceLog(device=test.device, employee=test.employee,
+                                  timestamp=local_datetime(day, *check_in)))
+        logs.append(AttendanceLog(device=test.device, employee=test.employee,
+                                  timestamp=local_datetime(day, *check_out)))
+    for offset, employee in enumerate(test.others):
+        for day in range(7):
+            check_in = local_datetime(START_DATE + timedelta(days=day), 8 + offset % 3, 5 * day)
+            logs.append(AttendanceLog(device=test.device, employee=employee, timestamp=check_in))
+            if (day + offset) % 4:
+                logs.append(AttendanceLog(
+                    device=test.device, employee=employee,
+                    timestamp=check_in + timedelta(hours=7 + day % 4, minutes=17 * offset),
+                ))
+    AttendanceLog.objects.bulk_create(logs)
+
+
+def attendance_rows(company):
+    return list(
+        Attendance.objects.filter(employee__company=company)
+        .order_by('employee_id', 'date')
+        .values_list('employee_id', 'date', 'check_in_time', 'check_out_time',
+                     'status', 'overtime_hours', 'shift_id')
+    )
+
+
+def random_day_batch(rng, size):
+    """Kernel inputs with punches on whole multiples of 18 seconds (0.005 hours)"""
+    first_day = to_epoch_us(datetime(2025, 1, 1, tzinfo=dt_timezone.utc))
+    batch = DayBatch()
+    for _ in range(size):
+        day = first_day + rng.randrange(60) * US_PER_DAY
+        check_in = check_out = None
+        if rng.random() < 0.9:
+            check_in = day + rng.randrange(0, 86400, 18) * US_PER_SECOND
+            if rng.random() < 0.85:
+                check_out = check_in + rng.randrange(0, 18 * 3600, 18) * US_PER_SECOND
+        has_shift = rng.random() < 0.8
+        batch.append(
+            check_in=check_in,
+            check_out=check_out,
+            check_in_day=day if check_in is not None else None,
+            check_out_day=day if check_out is not None else None,
+            shift_start=rng.randrange(0, 86400, 900) if has_shift else None,
+            shift_end=rng.randrange(0, 86400, 900) if has_shift else None,
+            break_minutes=rng.choice([0, 30, 45, 60]),
+            grace_minutes=rng.choice([0, 10, 15]),
+            expected_hours=rng.choice([6.0, 8.0, 8.5, 9.0]),
+            is_weekend=rng.random() < 0.15,
+            is_holiday=rng.random() < 0.05,
+            has_leave=rng.random() < 0.05,
+        )
+    return batch
+
+
+class AttendanceKernelTests(SimpleTestCase):
+    RULE_VARIANTS = [
+        {},
+        {'break_deduction_method': 'proportional', 'separate_ot_break_time': 30},
+        {'holiday_overtime_full_day': False, 'weekend_overtime_full_day': False,
+         'minimum_overtime_minutes': 0, 'overtime_start_after_minutes': 0},
+        {'require_both_in_and_out': True, 'enable_minimum_working_hours_rule': True,
+         'enable_working_hours_half_day_rule': True, 'half_day_minimum_hours': 3.5},
+    ]
+
+    def config(self, **overrides):
+        config = AttendanceProcessorConfiguration.get_default_config()
+        config.update(overrides)
+        return config
+
+    def test_python_path_values(self):
+        day = to_epoch_us(datetime(2025, 1, 6, tzinfo=dt_timezone.utc))
+        hour = 3600 * US_PER_SECOND
+        batch = DayBatch()
+        defaults = dict(check_in_day=day, check_out_day=day, shift_start=9 * 3600,
+                        shift_end=17 * 3600, break_minutes=60, grace_minutes=15,
+                        expected_hours=8.0, is_weekend=False, is_holiday=False, has_leave=False)
+        # On time, 9.5 hours at work
+        batch.append(**dict(defaults, check_in=day + 9 * hour, check_out=day + 18 * hour + hour // 2))
+        # Late and leaving early
+        batch.append(**dict(defaults, check_in=day + 9 * hour + hour // 2, check_out=day + 16 * hour))
+        # Overnight shift left before its end on the next day
+        batch.append(**dict(defaults, check_in=day + 22 * hour, check_out=day + 29 * hour,
+                            check_out_day=day + US_PER_DAY, shift_start=22 * 3600, shift_end=6 * 3600,
+                            break_minutes=30))
+        # Weekend work is overtime in full, and still checked against the shift
+        batch.append(**dict(defaults, check_in=day + 9 * hour, check_out=day + 13 * hour, is_weekend=True))
+        # A single punch
+        batch.append(**dict(defaults, check_in=day + 9 * hour, check_out=None, check_out_day=None))
+        # No punches
+        batch.append(**dict(defaults, check_in=None, check_out=None, check_in_day=None, check_out_day=None))
+
+        results = compute_day_batch(batch, self.config(), use_numpy=False)
+
+        self.assertEqual(results['working_hours'], [8.5, 5.5, 6.5, 3.0, 0.0, 0.0])
+        self.assertEqual(results['overtime_hours'], [0.0, 0.0, 0.0, 3.0, 0.0, 0.0])
+        self.assertEqual(results['status'], ['P', 'P', 'P', 'W', 'P', 'A'])
+        self.assertEqual(results['is_late'], [False, True, False, False, False, False])
+        self.assertEqual(results['is_early_out'], [False, True, True, True, False, False])
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, 'NumPy is not installed')
+    def test_numpy_matches_python(self):
+        rng = random.Random(5)
+        for variant in self.RULE_VARIANTS:
+            with self.subTest(variant=variant):
+                batch = random_day_batch(rng, 3000)
+                config = self.config(**variant)
+                self.assertEqual(
+                    compute_day_batch(batch, config, use_numpy=True),
+                    compute_day_batch(batch, config, use_numpy=False),
+                )
+
+    @unittest.skipUnless(NUMPY_AVAILABLE, 'NumPy is not installed')
+    def test_numpy_reports_the_same_excessive_hours(self):
+        batch = random_day_batch(random.Random(7), 500)
+        config = self.config(enable_maximum_working_hours_rule=True, maximum_allowable_working_hours=12)
+        with self.assertLogs('hr_payroll.attendance_kernel', 'WARNING') as python_logs:
+            compute_day_batch(batch, config, use_numpy=False)
+        with self.assertLogs('hr_payroll.attendance_kernel', 'WARNING') as numpy_logs:
+            compute_day_batch(batch, config, use_numpy=True)
+        self.assertEqual(sorted(numpy_logs.output), sorted(python_logs.output))
+
+
+class ShiftIndexTests(SimpleTestCase):
+    def setUp(self):
+        starts = [(23, 50), (0, 10), (6, 0), (9, 0), (9, 15), (9, 0), (14, 0), (22, 0)]
+        self.shifts = [
+            Shift(pk=i + 1, name=f'Shift {chr(ord("H") - i)}', start_time=time(*start),
+                  end_time=time((start[0] + 8) % 24, start[1]), break_time=30 + 15 * (i % 3))
+            for i, start in enumerate(starts)
+        ]
+        self.index = ShiftIndex(self.shifts)
+
+    def scan(self, minute, tolerance):
+        """Every shift starting within the tolerance, on the punch's day or a neighbouring one"""
+        matches = []
+        for shift in self.shifts:
+            start = minute_of_day(shift.start_time)
+            diff = min(abs((minute - offset) - start) for offset in (-1440, 0, 1440))
+            if diff <= tolerance:
+                matches.append({'shift': shift, 'score': tolerance - diff, 'diff_minutes': diff})
+        return matches
+
+    def test_find_matches_linear_scan(self):
+        for tolerance in (0, 15, 30, 90):
+            for step in range(0, 24 * 60 * 4, 7):
+                minute = step / 4
+                with self.subTest(tolerance=tolerance, minute=minute):
+                    self.assertEqual(self.index.find(minute, tolerance), self.scan(minute, tolerance))
+
+    def test_best_shift_matches_linear_scan(self):
+        for priority in ('least_break', 'shortest_duration', 'highest_score', 'alphabetical'):
+            matcher = ShiftMatcher({'multiple_shift_priority': priority,
+                                    'dynamic_shift_tolerance_minutes': 45})
+            for step in range(0, 24 * 60 * 4, 11):
+                minute = step / 4
+                with self.subTest(priority=priority, minute=minute):
+                    self.assertIs(
+                        matcher.select_best_shift(self.index.find(minute, 45)),
+                        matcher.select_best_shift(self.scan(minute, 45)),
+                    )
+
+
+class AttendanceGenerationEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+
+    def engine(self, **kwargs):
+        rules = AttendanceProcessorConfiguration.get_rules(self.company)
+        kwargs.setdefault('regenerate_existing', True)
+        return AttendanceGenerationEngine(self.company, rules, START_DATE, END_DATE, **kwargs)
+
+    def test_records(self):
+        records = {
+            record['date']: record
+            for record in self.engine(employee_ids=[self.employee.pk]).iter_records()
+        }
+        expected = {
+            '2025-01-06': ('P', 8.58, 0.0, 0.0, False, False),
+            '2025-01-07': ('P', 5.33, 0.0, 0.0, True, True),
+            '2025-01-08': ('H', 10.0, 10.0, 1875.0, False, False),
+            '2025-01-09': ('L', 0.0, 0.0, 0.0, False, False),
+            '2025-01-10': ('W', 0.0, 0.0, 0.0, False, False),
+            '2025-01-11': ('P', 11.25, 3.0, 562.5, False, False),
+            '2025-01-12': ('A', 0.0, 0.0, 0.0, False, False),
+        }
+        self.assertEqual(
+            {
+                day: (record['status'], record['working_hours'], record['overtime_hours'],
+                      record['overtime_amount'], record['is_late'], record['is_early_out'])
+                for day, record in records.items()
+            },
+            expected,
+        )
+        self.assertEqual(records['2025-01-06']['shift_name'], 'Day')
+
+    def test_chunking_does_not_change_records(self):
+        def key(record):
+            return record['employee_id'], record['date']
+
+        whole = self.engine()
+        chunked = self.engine(chunk_size=1)
+        self.assertEqual(sorted(chunked.iter_records(), key=key), sorted(whole.iter_records(), key=key))
+        self.assertEqual(finalize_summary(chunked.summary), finalize_summary(whole.summary))
+
+    def test_existing_attendance_is_skipped(self):
+        Attendance.objects.create(employee=self.employee, date=date(2025, 1, 7), status='P')
+        dates = {
+            record['date']
+            for record in self.engine(employee_ids=[self.employee.pk],
+                                      regenerate_existing=False).iter_records()
+        }
+        self.assertNotIn('2025-01-07', dates)
+        self.assertEqual(len(dates), 6)
+
+
+class PreviewJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+        cls.user = User.objects.create_user('preview')
+
+    def setUp(self):
+        cache.clear()
+
+    def call(self, view, method='get', **kwargs):
+        request = getattr(RequestFactory(), method)('/', **kwargs)
+        request.user = self.user
+        return view(request)
+
+    def test_export_streams_the_preview_job_records(self):
+        params = {'start_date': '2025-01-06', 'end_date': '2025-01-12', 'employee_ids': [self.employee.pk]}
+        response = self.call(simple_attendance_preview, 'post',
+                             data=json.dumps(params), content_type='application/json')
+        self.assertTrue(json.loads(response.content)['success'])
+
+        response = self.call(simple_export_csv)
+        self.assertEqual(json.loads(response.content)['error'], 'Preview is not finished yet')
+
+        job = run_job(claim_next_job('worker-1'))
+        self.addCleanup(os.remove, job.result_file)
+        response = self.call(simple_export_csv)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], CSV_HEADER)
+        self.assertEqual(
+            [row[0] for row in rows[1:]], [self.employee.employee_id] * 7
+        )
+
+    def test_preview_without_employees_queues_nothing(self):
+        params = {'start_date': '2025-01-06', 'end_date': '2025-01-12', 'department_ids': [0]}
+        response = self.call(simple_attendance_preview, 'post',
+                             data=json.dumps(params), content_type='application/json')
+        self.assertEqual(json.loads(response.content)['error'], 'No employees found')
+        self.assertFalse(AttendanceGenerationJob.objects.exists())
+
+
+class ParallelGenerationTests(TransactionTestCase):
+    def setUp(self):
+        # Checked here: the test database only exists once the run has started
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.use_file_database()
+        create_attendance_data(self)
+
+    def use_file_database(self):
+        """Run on a file copy of the in-memory test database, which workers cannot open"""
+        handle, name = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, name)
+
+        in_memory = connections[DEFAULT_DB_ALIAS]
+        in_memory.ensure_connection()
+        target = sqlite3.connect(name)
+        in_memory.connection.backup(target)
+        target.close()
+
+        file_backed = in_memory.__class__(dict(in_memory.settings_dict, NAME=name), DEFAULT_DB_ALIAS)
+        connections[DEFAULT_DB_ALIAS] = file_backed
+
+        def restore():
+            file_backed.close()
+            connections[DEFAULT_DB_ALIAS] = in_memory
+        self.addCleanup(restore)
+
+    def test_parallel_matches_serial(self):
+        rules = AttendanceProcessorConfiguration.get_rules(self.company)
+        serial = AttendanceGenerationEngine(
+            self.company, rules, START_DATE, END_DATE, regenerate_existing=True, chunk_size=2
+        )
+        parallel = AttendanceGenerationEngine(
+            self.company, rules, START_DATE, END_DATE, regenerate_existing=True, chunk_size=2,
+            workers=2,
+        )
+        self.assertEqual(list(parallel.iter_records()), list(serial.iter_records()))
+        self.assertEqual(finalize_summary(parallel.summary), finalize_summary(serial.summary))
+
+
+class IncrementalAttendanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+
+    def regenerate_all(self):
+        rules = AttendanceProcessorConfiguration.get_rules(self.company)
+        engine = AttendanceGenerationEngine(
+            self.company, rules, START_DATE, END_DATE, regenerate_existing=True
+        )
+        AttendanceBulkWriter(self.company).write(engine.iter_records())
+
+    def test_matches_full_regeneration(self):
+        self.regenerate_all()
+        AttendanceDirtyDay.objects.all().delete()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AttendanceLog.objects.create(
+                device=self.device, employee=self.employee,
+                timestamp=local_datetime(date(2025, 1, 7), 19, 45),
+            )
+            AttendanceLog.objects.create(
+                device=self.device, employee=self.others[0],
+                timestamp=local_datetime(date(2025, 1, 12), 21, 0),
+            )
+            AttendanceLog.objects.filter(
+                employee=self.others[1], timestamp__date=date(2025, 1, 9)
+            ).delete()
+
+        self.assertTrue(AttendanceDirtyDay.objects.exists())
+        IncrementalAttendanceProcessor(self.company).run()
+        self.assertFalse(AttendanceDirtyDay.objects.exists())
+        incremental = attendance_rows(self.company)
+
+        self.regenerate_all()
+        self.assertEqual(incremental, attendance_rows(self.company))
+
+
+class AttendanceCalendarTests(TestCase):
+    FILTERS = {'department_id': '', 'employee_id': '', 'source_type': ''}
+
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+        leave_type = LeaveType.objects.get(company=cls.company)
+        # Leave running into the range from before it and out of it after it
+        for start_date, end_date in [(date(2025, 1, 1), date(2025, 1, 7)),
+                                     (date(2025, 1, 11), date(2025, 1, 20))]:
+            LeaveApplication.objects.create(
+                employee=cls.others[0], leave_type=leave_type,
+                start_date=start_date, end_date=end_date, status='A',
+            )
+        rebuild_day_summaries(cls.company)
+        cls.rules = AttendanceProcessorConfiguration.get_rules(cls.company)
+
+    def test_leave_is_clipped_to_the_range(self):
+        calendar = AttendanceCalendar(self.company, START_DATE, END_DATE)
+        self.assertEqual(
+            calendar.leave_dates[self.others[0].pk],
+            {date(2025, 1, 6), date(2025, 1, 7), date(2025, 1, 11), date(2025, 1, 12)},
+        )
+        self.assertEqual(calendar.leave_type(self.others[0].pk, START_DATE), 'Casual')
+        self.assertTrue(calendar.is_on_leave(self.employee.pk, date(2025, 1, 9)))
+        self.assertFalse(calendar.is_on_leave(self.others[0].pk, date(2025, 1, 8)))
+        self.assertEqual(calendar.holiday_name(date(2025, 1, 8)), 'Holiday')
+
+    def test_lookups_run_no_queries(self):
+        employee_ids = [employee.pk for employee in [self.employee, *self.others]]
+        with self.assertNumQueries(2):
+            calendar = AttendanceCalendar(self.company, START_DATE, END_DATE, employee_ids)
+            for employee_id in employee_ids:
+                for offset in range((END_DATE - START_DATE).days + 1):
+                    day = START_DATE + timedelta(days=offset)
+                    calendar.is_holiday(day)
+                    calendar.holiday_name(day)
+                    calendar.is_on_leave(employee_id, day)
+                    calendar.leave_type(employee_id, day)
+
+    def test_covers(self):
+        calendar = AttendanceCalendar(self.company, START_DATE, END_DATE, [self.employee])
+        day_before, day_after = START_DATE - timedelta(days=1), END_DATE + timedelta(days=1)
+        self.assertTrue(calendar.covers(self.company, START_DATE, END_DATE, [self.employee]))
+        self.assertTrue(calendar.covers(self.company.pk, END_DATE, END_DATE, [self.employee.pk]))
+        self.assertFalse(calendar.covers(self.company, day_before, END_DATE, [self.employee]))
+        self.assertFalse(calendar.covers(self.company, START_DATE, day_after, [self.employee]))
+        self.assertFalse(calendar.covers(self.company, START_DATE, END_DATE, self.others))
+        self.assertFalse(calendar.covers(self.company, START_DATE, END_DATE))
+        self.assertFalse(calendar.covers(None, START_DATE, END_DATE, [self.employee]))
+
+    def calendar_queries(self, start_date, end_date):
+        """Holiday and leave queries of a monthly report over the range"""
+        with CaptureQueriesContext(connection) as queries:
+            MonthlyAttendanceLogReportView().build_report(
+                self.company, self.rules, start_date, end_date, self.FILTERS
+            )
+        return [
+            query['sql'] for query in queries.captured_queries
+            if '"hr_payroll_holiday"' in query['sql'] or '"hr_payroll_leaveapplication"' in query['sql']
+        ]
+
+    def test_report_loads_the_calendar_once(self):
+        self.assertEqual(len(self.calendar_queries(START_DATE, START_DATE)), 2)
+        self.assertEqual(len(self.calendar_queries(START_DATE, END_DATE)), 2)
+
+        for i in range(20):
+            Employee.objects.create(
+                company=self.company, employee_id=f'X{i:03d}', zkteco_id=str(100 + i),
+                name=f'Extra {i}', base_salary=Decimal('10000.00'),
+            )
+        self.assertEqual(len(self.calendar_queries(date(2025, 1, 1), date(2025, 1, 31))), 2)
+
+
+class AttendanceDaySummaryTests(TestCase):
+    FILTERS = {'department_id': '', 'employee_id': '', 'source_type': ''}
+    SUMMARY_DAY = date(2025, 1, 13)
+
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+        # 1:01:30 with a 60 minute break is 0.025 hours: 0.02, but 0.03 from whole seconds
+        AttendanceLog.objects.bulk_create([
+            AttendanceLog(device=cls.device, employee=cls.employee,
+                          timestamp=local_datetime(cls.SUMMARY_DAY, 9)),
+            AttendanceLog(device=cls.device, employee=cls.employee,
+                          timestamp=local_datetime(cls.SUMMARY_DAY, 10, 1) + timedelta(seconds=30)),
+        ])
+        rebuild_day_summaries(cls.company)
+        cls.rules = AttendanceProcessorConfiguration.get_rules(cls.company)
+
+    def test_daily_hours_use_the_exact_punch_span(self):
+        report = DailyAttendanceLogReportView().build_report(
+            self.company, self.rules, self.SUMMARY_DAY, self.FILTERS
+        )
+        row = next(row for row in report['report_data'] if row['employee_id'] == 'E001')
+        self.assertEqual(row['work_hours'], 0.02)
+
+    def test_monthly_totals_match_the_raw_punches(self):
+        view = MonthlyAttendanceLogReportView()
+        report = view.build_report(self.company, self.rules, START_DATE, self.SUMMARY_DAY, self.FILTERS)
+        rows = {row['employee_id']: row for row in report['report_data']}
+
+        punches = view.get_day_punches(AttendanceLog.objects.all(), START_DATE, self.SUMMARY_DAY)
+        calendar = AttendanceCalendar(self.company, START_DATE, self.SUMMARY_DAY)
+        for employee in Employee.objects.filter(company=self.company):
+            work_total = overtime_total = 0.0
+            day = START_DATE
+            while day <= self.SUMMARY_DAY:
+                day_punches = punches.get((employee.id, day))
+                if day_punches:
+                    status_code, _ = view.determine_day_status(
+                        day, day_punches, self.rules,
+                        holiday_name=calendar.holiday_name(day),
+                        leave_type=calendar.leave_type(employee.id, day),
+                    )
+                    work_hours, overtime_hours = view.day_hours(
+                        day_punches[0], day_punches[-1], employee.expected_working_hours or 8.0,
+                        self.rules, view.is_weekend(day, self.rules), calendar.is_holiday(day),
+                    )
+                    if status_code in ('P', 'HD'):
+                        work_total += work_hours
+                    if status_code in ('P', 'W', 'H'):
+                        overtime_total += overtime_hours
+                day += timedelta(days=1)
+
+            row = rows[employee.employee_id]
+            self.assertEqual(row['total_work_hours'], round(work_total, 2))
+            self.assertEqual(row['total_overtime_hours'], round(overtime_total, 2))
+
+    def rebuild_jobs(self):
+        return list(
+            AttendanceGenerationJob.objects.filter(kind='rebuild_summaries', status='queued')
+            .values_list('params', flat=True)
+        )
+
+    def test_shift_change_rebuilds_its_employees(self):
+        summary = AttendanceDaySummary.objects.get(employee=self.employee, date=date(2025, 1, 7))
+        self.assertTrue(summary.is_late)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.day_shift.start_time = time(10)
+            self.day_shift.save()
+        employee_ids = sorted(
+            Employee.objects.filter(default_shift=self.day_shift).values_list('id', flat=True)
+        )
+        self.assertEqual(self.rebuild_jobs(), [{'employee_ids': employee_ids}])
+
+        # Renaming does not change any summary
+        with self.captureOnCommitCallbacks(execute=True):
+            self.day_shift.name = 'Morning'
+            self.day_shift.save()
+        self.assertEqual(len(self.rebuild_jobs()), 1)
+
+        run_job(claim_next_job('worker-1'))
+        summary = AttendanceDaySummary.objects.get(employee=self.employee, date=date(2025, 1, 7))
+        self.assertFalse(summary.is_late)
+
+    def test_default_shift_change_rebuilds_the_employee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.default_shift = None
+            self.employee.save()
+        self.assertEqual(self.rebuild_jobs(), [{'employee_ids': [self.employee.pk]}])
+
+        run_job(claim_next_job('worker-1'))
+        self.assertFalse(
+            AttendanceDaySummary.objects.filter(employee=self.employee, is_late=True).exists()
+        )
+
+    def test_configuration_change_rebuilds_the_company(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+            self.employee.default_shift = None
+            self.employee.save()
+            self.config.save()
+        self.assertEqual(self.rebuild_jobs(), [{'employee_ids': None}])
+
+    def test_rebuild_job_heartbeats_per_month(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+        job = run_job(claim_next_job('worker-1'))
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.total_units, job.processed_units), (1, 1))
+
+    def test_requeued_job_keeps_the_outcome_of_its_new_run(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+        stalled = claim_next_job('worker-1')
+
+        # The first worker looked dead, so another one took the job over
+        requeue_stale_jobs(timedelta(seconds=-1))
+        claim_next_job('worker-2')
+
+        with self.assertLogs('hr_payroll.attendance_jobs', 'WARNING'):
+            job = run_job(stalled)
+        self.assertEqual((job.status, job.worker), ('running', 'worker-2'))
+        self.assertEqual(AttendanceGenerationJob.objects.get(pk=job.pk).message, '')
+
+
+def other_process_cache():
+    """A cache the default one cannot see, like a second worker's local memory"""
+    return LocMemCache('other-process', {})
+
+
+class AttendanceRulesCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_configuration_saved_elsewhere_is_recompiled(self):
+        rules = AttendanceProcessorConfiguration.get_rules(self.company)
+        self.assertEqual(rules.grace_minutes, self.config.grace_minutes)
+
+        # Saved by another process: only its own cache entry is dropped
+        self.config.grace_minutes += 7
+        with mock.patch('hr_payroll.models.cache', other_process_cache()), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+
+        rules = AttendanceProcessorConfiguration.get_rules(self.company)
+        self.assertEqual(rules.grace_minutes, self.config.grace_minutes)
+
+    def test_cached_rules_skip_compiling(self):
+        AttendanceProcessorConfiguration.get_rules(self.company)
+        with mock.patch.object(AttendanceProcessorConfiguration, 'compile_rules') as compile_rules, \
+                self.assertNumQueries(1):
+            rules = AttendanceProcessorConfiguration.get_rules(self.company)
+        compile_rules.assert_not_called()
+        self.assertEqual(rules.config_id, self.config.pk)
+
+
+class ReportCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return self.builds
+
+    def test_changes_in_any_company_invalidate_reports(self):
+        self.assertEqual(get_cached_report('test', self.company, self.build), 1)
+        self.assertEqual(get_cached_report('test', self.company, self.build), 1)
+
+        other = Company.objects.create(company_code='C2', name='Company Two')
+        with self.captureOnCommitCallbacks(execute=True):
+            Employee.objects.create(
+                company=other, employee_id='F001', zkteco_id='101', name='Other 1',
+                base_salary=Decimal('10000.00'),
+            )
+        self.assertEqual(get_cached_report('test', self.company, self.build), 2)
+
+    def test_changes_in_another_process_invalidate_reports(self):
+        self.assertEqual(get_cached_report('test', self.company, self.build), 1)
+
+        # The sync daemon or jobs worker saves with its own cache
+        with mock.patch('hr_payroll.report_cache.cache', other_process_cache()), \
+                self.captureOnCommitCallbacks(execute=True):
+            Holiday.objects.create(company=self.company, name='Other', date=date(2025, 1, 20))
+        self.assertEqual(get_cached_report('test', self.company, self.build), 2)
+
+    def test_summary_rebuild_invalidates_reports(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.config.save()
+        self.assertEqual(get_cached_report('test', self.company, self.build), 1)
+
+        # Reports cached before the rebuild job ran were built from stale summaries
+        with self.captureOnCommitCallbacks(execute=True):
+            run_job(claim_next_job('worker-1'))
+        self.assertEqual(get_cached_report('test', self.company, self.build), 2)
+
+
+class ReportExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+        rebuild_day_summaries(cls.company)
+        cls.user = User.objects.create_user('reports')
+
+    def export(self, **params):
+        request = RequestFactory().get('/', dict(params, type='daily', date='2025-01-06'))
+        request.user = self.user
+        response = ExportAttendanceReportView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_csv_is_streamed(self):
+        response = self.export()
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+
+    def test_only_the_company_employees_are_exported(self):
+        other = Company.objects.create(company_code='C2', name='Company Two')
+        Employee.objects.create(
+            company=other, employee_id='F001', zkteco_id='101', name='Other 1',
+            base_salary=Decimal('10000.00'),
+        )
+        content = b''.join(self.export().streaming_content).decode()
+        exported = [row[0] for row in csv.reader(io.StringIO(content))][1:]
+        self.assertEqual(
+            sorted(exported),
+            sorted(Employee.objects.filter(company=self.company).values_list('employee_id', flat=True)),
+        )
+
+    @unittest.skipUnless(openpyxl, 'openpyxl is not installed')
+    def test_xlsx_has_the_csv_rows(self):
+        def cell(value):
+            # Numbers come back from the workbook typed, 0.0 as 0
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return '' if value is None else value
+
+        content = b''.join(self.export(format='csv').streaming_content).decode()
+        csv_rows = [list(map(cell, row)) for row in csv.reader(io.StringIO(content))]
+        content = b''.join(self.export(format='xlsx').streaming_content)
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+        xlsx_rows = [list(map(cell, row)) for row in sheet.iter_rows(values_only=True)]
+
+        self.assertEqual(len(csv_rows), 1 + Employee.objects.filter(is_active=True).count())
+        self.assertEqual(xlsx_rows, csv_rows)
+
+
+class DeviceLeaseTests(TestCase):
+    def setUp(self):
+        company = Company.objects.create(company_code='C1', name='Company One')
+        self.devices = [
+            ZkDevice.objects.create(company=company, name=f'Gate {i}', ip_address=f'10.0.0.{i}')
+            for i in range(5)
+        ]
+        # Synced longest ago after the never synced ones; the last is not due
+        now = timezone.now()
+        ZkDevice.objects.filter(pk=self.devices[0].pk).update(last_synced=now - timedelta(hours=2))
+        ZkDevice.objects.filter(pk=self.devices[1].pk).update(last_synced=now - timedelta(hours=1))
+        ZkDevice.objects.filter(pk=self.devices[4].pk).update(last_synced=now)
+
+    def names(self, devices):
+        return [device.name for device in devices]
+
+    def test_claims_are_limited_and_disjoint(self):
+        first = claim_due_devices('w1', 600, 60, limit=2)
+        self.assertEqual(self.names(first), ['Gate 2', 'Gate 3'])
+        second = claim_due_devices('w2', 600, 60, limit=2)
+        self.assertEqual(self.names(second), ['Gate 0', 'Gate 1'])
+        self.assertEqual(claim_due_devices('w3', 600, 60, limit=2), [])
+
+    def test_unlimited_claim_takes_every_due_device(self):
+        self.assertEqual(
+            self.names(claim_due_devices('w1', 600, 60)), ['Gate 0', 'Gate 1', 'Gate 2', 'Gate 3']
+        )
+
+
+def punch_record(zkteco_id, day, hour, minute=0, device_ip='10.0.0.1'):
+    return {
+        'zkteco_id': zkteco_id,
+        'timestamp': local_datetime(day, hour, minute).isoformat(),
+        'device_ip': device_ip,
+        'punch_type': 0,
+        'verify_type': 1,
+    }
+
+
+class AttendanceImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+        cls.devices = {cls.device.ip_address: cls.device}
+
+    def setUp(self):
+        day = date(2025, 2, 3)
+        self.records = [
+            punch_record('1', day, 9),
+            punch_record('1', day, 18),
+            punch_record('2', day, 8, 30),
+            punch_record('1', day, 9),  # repeated in the input
+            punch_record('99', day, 9),  # unknown device user
+            punch_record('1', day, 9, device_ip='10.9.9.9'),  # unknown device
+            {'zkteco_id': '1', 'timestamp': 'not a time', 'device_ip': '10.0.0.1'},
+        ]
+
+    def test_counts(self):
+        logs_before = AttendanceLog.objects.count()
+        with self.assertLogs('hr_payroll.attendance_import', 'WARNING'):
+            result = import_attendance_logs(self.records, self.devices)
+
+        self.assertEqual(result['imported'], 3)
+        self.assertEqual(result['duplicates'], 1)
+        self.assertEqual(result['missing_employee'], 1)
+        self.assertEqual(result['missing_device'], 1)
+        self.assertEqual(result['errors'], 1)
+        self.assertEqual(result['missing_employee_ids'], {'99'})
+        self.assertEqual(AttendanceLog.objects.count(), logs_before + 3)
+
+    def test_rerun_reports_duplicates(self):
+        with self.assertLogs('hr_payroll.attendance_import', 'WARNING'):
+            import_attendance_logs(self.records, self.devices)
+            logs_before = AttendanceLog.objects.count()
+            result = import_attendance_logs(self.records, self.devices)
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual(result['duplicates'], 4)
+        self.assertEqual(AttendanceLog.objects.count(), logs_before)
+
+    def test_punches_of_a_racing_import_are_not_counted(self):
+        def race(device_ids):
+            # Another import of the device held the lock and stored the first punch
+            AttendanceLog.objects.create(
+                employee=self.employee, device=self.device,
+                timestamp=parse_punch_timestamp(self.records[0]['timestamp']),
+            )
+            lock_devices(device_ids)
+
+        with mock.patch('hr_payroll.attendance_import.lock_devices', side_effect=race), \
+                self.assertLogs('hr_payroll.attendance_import', 'WARNING'):
+            result = import_attendance_logs(self.records, self.devices)
+        self.assertEqual((result['imported'], result['duplicates']), (2, 2))
+
+    def test_days_are_marked_once_the_import_commits(self):
+        marked = AttendanceDirtyDay.objects.filter(work_date=date(2025, 2, 3))
+        with self.captureOnCommitCallbacks(execute=True), \
+                self.assertLogs('hr_payroll.attendance_import', 'WARNING'):
+            import_attendance_logs(self.records, self.devices)
+            self.assertFalse(marked.exists())
+        self.assertEqual(marked.count(), 2)
+        self.assertEqual(
+            AttendanceDaySummary.objects.filter(date=date(2025, 2, 3)).count(), 2
+        )
+
+    def test_punch_is_unique(self):
+        log = AttendanceLog.objects.filter(employee=self.employee).first()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            AttendanceLog.objects.create(
+                employee=self.employee, device=self.device, timestamp=log.timestamp
+            )
+
+
+class PunchDeduplicationMigrationTests(TransactionTestCase):
+    migrate_from = [('hr_payroll', '0005_zkdevice_sync_daemon')]
+    migrate_to = [('hr_payroll', '0006_attendancelog_unique_punch')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_punches_are_removed(self):
+        apps = self.migrate(self.migrate_from)
+        company = apps.get_model('core', 'Company').objects.create(company_code='C1', name='Company One')
+        employee = apps.get_model('hr_payroll', 'Employee').objects.create(
+            company=company, employee_id='E001', zkteco_id='1', name='Employee 1',
+            base_salary=Decimal('22000.00'),
+        )
+        device = apps.get_model('hr_payroll', 'ZkDevice').objects.create(
+            company=company, name='Gate', ip_address='10.0.0.1'
+        )
+        AttendanceLog = apps.get_model('hr_payroll', 'AttendanceLog')
+        check_in = local_datetime(START_DATE, 9)
+        check_out = local_datetime(START_DATE, 18)
+        first = AttendanceLog.objects.create(employee=employee, device=device, timestamp=check_in)
+        for timestamp in (check_in, check_in, check_out):
+            AttendanceLog.objects.create(employee=employee, device=device, timestamp=timestamp)
+
+        apps = self.migrate(self.migrate_to)
+        AttendanceLog = apps.get_model('hr_payroll', 'AttendanceLog')
+        self.assertEqual(
+            sorted(AttendanceLog.objects.values_list('timestamp', flat=True)), [check_in, check_out]
+        )
+        self.assertTrue(AttendanceLog.objects.filter(pk=first.pk).exists())
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipUnless(ZK_AVAILABLE, 'pyzk is not installed')
+class SimulatedDeviceTests(TestCase):
+    """Fetch, import and sync against a simulated terminal"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_attendance_data(cls)
+
+    def setUp(self):
+        self.simulated = SimulatedDevice(
+            '127.0.0.1', free_port(),
+            users=[('1', 'Employee 1'), ('2', 'Employee 2'), ('77', 'Visitor')],
+            attendances=generate_punches(['1', '2', '77'], 5, end_date=date(2025, 2, 7), seed=1),
+        )
+        ZkDevice.objects.filter(pk=self.device.pk).update(
+            ip_address=self.simulated.host, port=self.simulated.port
+        )
+        self.device.refresh_from_db()
+
+        self.loop = asyncio.new_event_loop()
+        simulator = DeviceSimulator([self.simulated])
+        started = threading.Event()
+
+        async def serve():
+            self.stop = asyncio.Event()
+            await simulator.start()
+            started.set()
+            await self.stop.wait()
+            await simulator.stop()
+
+        self.thread = threading.Thread(target=self.loop.run_until_complete, args=(serve(),))
+        self.thread.start()
+        started.wait(5)
+        self.manager = ZKTecoDeviceManager()
+
+    def tearDown(self):
+        self.manager.disconnect_all()
+        self.loop.call_soon_threadsafe(self.stop.set)
+        self.thread.join(5)
+        self.loop.close()
+
+    def fetch(self):
+        success, records = self.manager.get_attendance_data(
+            self.device.ip_address, device_port=self.device.port
+        )
+        self.assertTrue(success, records)
+        return records
+
+    def test_fetch_and_import(self):
+        records = self.fetch()
+        self.assertEqual(len(records), len(self.simulated.attendances))
+
+        devices = {self.device.ip_address: self.device}
+        visitor_punches = sum(1 for punch in self.simulated.attendances if punch[0] == '77')
+        result = import_attendance_logs(records, devices)
+        self.assertEqual(result['imported'], len(records) - visitor_punches)
+        self.assertEqual(result['missing_employee'], visitor_punches)
+
+        result = import_attendance_logs(self.fetch(), devices)
+        self.assertEqual(result['imported'], 0)
+        self.assertEqual(result['duplicates'], len(records) - visitor_punches)
+
+    def test_incremental_sync(self):
+        result = DeviceAttendanceSync(self.device, self.manager).run()
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual(result['fetched'], len(self.simulated.attendances))
+        self.assertGreater(result['imported'], 0)
+
+        self.simulated.add_punch('1', datetime(2025, 2, 8, 9, 5))
+        self.device.refresh_from_db()
+        result = DeviceAttendanceSync(self.device, self.manager).run()
+        self.assertTrue(result['success'], result['error'])
+        self.assertEqual((result['fetched'], result['imported']), (1, 1))
+
+    def sync(self):
+        self.device.refresh_from_db()
+        result = DeviceAttendanceSync(self.device, self.manager).run()
+        self.assertTrue(result['success'], result['error'])
+        return result
+
+    def refill(self, count):
+        """Clear the buffer on the device and record count later punches"""
+        success, message = self.manager.clear_attendance_data(
+            self.device.ip_address, device_port=self.device.port
+        )
+        self.assertTrue(success, message)
+        for minute in range(count):
+            self.simulated.add_punch(str(1 + minute % 2), datetime(2025, 2, 10, 9, minute))
+
+    def test_sync_after_the_buffer_is_refilled_past_the_index(self):
+        synced = len(self.simulated.attendances)
+        self.sync()
+
+        self.refill(synced + 5)
+        result = self.sync()
+        self.assertEqual((result['fetched'], result['imported']), (synced + 5, synced + 5))
+
+    def test_sync_after_the_buffer_is_refilled_to_the_index(self):
+        synced = len(self.simulated.attendances)
+        self.sync()
+
+        self.refill(synced)
+        self.assertEqual(self.sync()['fetched'], 0)
+
+        # The next punch moves the count past the index, and the anchor check fails
+        self.simulated.add_punch('1', datetime(2025, 2, 11, 9))
+        result = self.sync()
+        self.assertEqual((result['fetched'], result['imported']), (synced + 1, synced + 1))
@@ -69,6 +69,8 @@ urlpatterns = [
     path('simple-attendance/preview/', simple_attendance_generation_views.simple_attendance_preview, name='simple_attendance_preview'),
     path('simple-attendance/generate/', simple_attendance_generation_views.simple_generate_records, name='simple_generate_records'),
     path('simple-attendance/export/', simple_attendance_generation_views.simple_export_csv, name='simple_export_csv'),
+    path('api/attendance-jobs/<int:job_id>/', simple_attendance_generation_views.attendance_job_status, name='attendance_job_status'),
+    path('api/attendance-jobs/<int:job_id>/records/', simple_attendance_generation_views.attendance_job_records, name='attendance_job_records'),
 
     # ==================== ATTENDANCE REPORTS VIEWS ====================
     path('reports/', attendance_reports.reports_dashboard, name='attendance_reports_main'),
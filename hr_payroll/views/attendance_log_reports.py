@@ -5,28 +5,44 @@ Based on active AttendanceProcessorConfiguration settings
 """
 
 from django.shortcuts import render
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, FileResponse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
+from django.views.decorators.gzip import gzip_page
+from django.utils.decorators import method_decorator
+from django.conf import settings
 from django.db.models import Count, Q, Avg, Sum, F, Min, Max, Case, When
 from django.utils import timezone
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 import json
-import csv
 import logging
 import calendar
+import tempfile
+from itertools import islice
 
 from ..models import (
     AttendanceLog, Employee, Department, Shift, 
     Company, AttendanceProcessorConfiguration, Location, Holiday,
-    LeaveApplication
+    LeaveApplication, AttendanceDaySummary
 )
+from ..attendance_summary import AttendanceCalendar, AttendanceLogRules
+from ..report_cache import get_cached_report
+from ..streaming import iter_csv_lines
+
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Employees whose rows are computed per batch of summary queries in exports
+EXPORT_CHUNK_SIZE = getattr(settings, 'ATTENDANCE_EXPORT_CHUNK_SIZE', 500)
+
 
-class BaseAttendanceLogReportView(LoginRequiredMixin, View):
+class BaseAttendanceLogReportView(LoginRequiredMixin, AttendanceLogRules, View):
     """Base view for all attendance log reports"""
     
     def get_company(self, request):
@@ -38,10 +54,10 @@ class BaseAttendanceLogReportView(LoginRequiredMixin, View):
             return None
     
     def get_active_config(self, company):
-        """Get active attendance processor configuration"""
+        """Get compiled rules of the active attendance configuration"""
         if not company:
             return None
-        return AttendanceProcessorConfiguration.get_active_config(company)
+        return AttendanceProcessorConfiguration.get_rules(company)
     
     def get_date_range(self, request):
         """Parse and validate date range from request"""
@@ -71,176 +87,90 @@ class BaseAttendanceLogReportView(LoginRequiredMixin, View):
             'source_type': request.GET.get('source_type', ''),
         }
     
-    def is_weekend(self, date_obj, config):
-        """Check if date is weekend based on config"""
-        if not config:
-            return date_obj.weekday() == 4  # Default Friday
-        
-        weekday = date_obj.weekday()
-        return weekday in config.weekend_days
-    
-    def is_holiday(self, date_obj, company):
-        """Check if date is a holiday"""
-        return Holiday.objects.filter(company=company, date=date_obj).exists()
-    
-    def get_holiday_name(self, date_obj, company):
-        """Get holiday name if exists"""
-        try:
-            holiday = Holiday.objects.get(company=company, date=date_obj)
-            return holiday.name
-        except Holiday.DoesNotExist:
-            return None
+    def get_calendar(self, company, start_date, end_date, employees=None):
+        """
+        Holiday and leave calendar of the request, loaded once for the report
+        range and reused by every lookup it covers
+        """
+        calendar = getattr(self, '_calendar', None)
+        if calendar is None or not calendar.covers(company, start_date, end_date, employees):
+            calendar = AttendanceCalendar(company, start_date, end_date, employees)
+            self._calendar = calendar
+        return calendar
     
-    def is_on_leave(self, date_obj, employee):
-        """Check if employee is on leave"""
-        return LeaveApplication.objects.filter(
-            employee=employee,
-            start_date__lte=date_obj,
-            end_date__gte=date_obj,
-            status='A'  # Approved
-        ).exists()
+    def get_day_summaries(self, summaries):
+        """Day summaries by (employee ID, date)"""
+        return {(summary.employee_id, summary.date): summary for summary in summaries}
     
-    def get_leave_type(self, date_obj, employee):
-        """Get leave type if employee is on leave"""
-        try:
-            leave = LeaveApplication.objects.get(
-                employee=employee,
-                start_date__lte=date_obj,
-                end_date__gte=date_obj,
-                status='A'
-            )
-            return leave.leave_type.name
-        except LeaveApplication.DoesNotExist:
-            return None
-    
-    def calculate_work_hours(self, first_punch, last_punch, config):
-        """Calculate work hours with break deduction"""
-        if not first_punch or not last_punch or first_punch == last_punch:
-            return 0.0
-        
-        duration = last_punch - first_punch
-        work_hours = duration.total_seconds() / 3600
-        
-        # Deduct break time
-        if config:
-            break_minutes = config.default_break_minutes
-            work_hours -= (break_minutes / 60)
+    def get_summary_totals(self, employees, start_date, end_date, config, company):
+        """
+        Day counts and hour totals of each employee over a period, read from
+        the day summaries; days without punches take their status from the
+        holiday and leave calendar. Hours are computed per summary row and
+        summed here in date order, as from the raw punches, not aggregated
+        in the database.
+        """
+        calendar = self.get_calendar(company, start_date, end_date, employees)
         
-        return max(work_hours, 0.0)
-    
-    def calculate_overtime(self, work_hours, expected_hours, config, is_weekend=False, is_holiday=False):
-        """Calculate overtime hours based on config"""
-        if not config:
-            if work_hours <= expected_hours:
-                return 0.0
-            return work_hours - expected_hours
-        
-        # Weekend/Holiday full day overtime
-        if is_weekend and config.weekend_overtime_full_day:
-            return work_hours
-        
-        if is_holiday and config.holiday_overtime_full_day:
-            return work_hours
-        
-        # Regular overtime calculation
-        if work_hours <= expected_hours:
-            return 0.0
-        
-        overtime = work_hours - expected_hours
-        
-        # Apply minimum overtime rule
-        if overtime * 60 < config.minimum_overtime_minutes:
-            return 0.0
+        total_days = (end_date - start_date).days + 1
+        dates = [start_date + timedelta(days=offset) for offset in range(total_days)]
+        weekend_dates = {d for d in dates if self.is_weekend(d, config)}
+        holiday_dates = {d for d in dates if calendar.is_holiday(d) and d not in weekend_dates}
+        
+        expected_hours = {employee.id: employee.expected_working_hours or 8.0 for employee in employees}
+        rows = {}
+        for employee_id, date_obj, status_code, first_punch, last_punch, is_late, is_early in (
+            AttendanceDaySummary.objects.filter(
+                employee__in=list(expected_hours), date__range=[start_date, end_date]
+            ).order_by('employee_id', 'date').values_list(
+                'employee_id', 'date', 'status_code', 'first_punch', 'last_punch', 'is_late', 'is_early'
+            )
+        ):
+            row = rows.setdefault(employee_id, {
+                'present': 0, 'half': 0, 'work_hours': 0.0, 'overtime_hours': 0.0, 'late': 0, 'early': 0,
+            })
+            if status_code not in ('P', 'HD', 'W', 'H'):
+                continue
+            work_hours, overtime_hours = self.day_hours(
+                first_punch, last_punch, expected_hours[employee_id], config,
+                date_obj in weekend_dates, calendar.is_holiday(date_obj)
+            )
+            if status_code == 'P':
+                row['present'] += 1
+                row['work_hours'] += work_hours
+                row['overtime_hours'] += overtime_hours
+                row['late'] += is_late
+                row['early'] += is_early
+            elif status_code == 'HD':
+                row['half'] += 1
+                row['work_hours'] += work_hours
+            else:
+                row['overtime_hours'] += overtime_hours
         
-        return overtime
-    
-    def determine_status(self, date_obj, employee, day_logs, config, company):
-        """Determine attendance status based on logs and config"""
-        # Check leave first
-        if self.is_on_leave(date_obj, employee):
-            leave_type = self.get_leave_type(date_obj, employee)
-            return 'L', f'Leave ({leave_type})'
-        
-        # Check weekend
-        if self.is_weekend(date_obj, config):
-            if day_logs.exists():
-                return 'W', 'Weekly Off (Worked)'
-            return 'W', 'Weekly Off'
-        
-        # Check holiday
-        if self.is_holiday(date_obj, company):
-            holiday_name = self.get_holiday_name(date_obj, company)
-            if day_logs.exists():
-                return 'H', f'Holiday (Worked) - {holiday_name}'
-            return 'H', f'Holiday - {holiday_name}'
-        
-        # No logs - Absent
-        if not day_logs.exists():
-            return 'A', 'Absent'
-        
-        first_punch = day_logs.first().timestamp
-        last_punch = day_logs.last().timestamp
-        
-        # Calculate work hours
-        work_hours = self.calculate_work_hours(first_punch, last_punch, config)
-        
-        # Apply config rules
-        if config:
-            # Rule: Require both in and out
-            if config.require_both_in_and_out and day_logs.count() == 1:
-                return 'A', 'Absent (Missing Punch)'
-            
-            # Rule: Minimum working hours
-            if config.enable_minimum_working_hours_rule:
-                if work_hours < config.minimum_working_hours_for_present:
-                    return 'A', f'Absent (Insufficient Hours: {work_hours:.2f}h)'
+        totals = {}
+        for employee in employees:
+            row = rows.get(employee.id, {})
+            on_leave = calendar.leave_dates.get(employee.id, set())
+            leave_count = len(on_leave)
+            weekly_off_count = len(weekend_dates - on_leave)
+            holiday_count = len(holiday_dates - on_leave)
+            present = row.get('present', 0)
+            half = row.get('half', 0)
             
-            # Rule: Half day
-            if config.enable_working_hours_half_day_rule:
-                if config.half_day_minimum_hours <= work_hours <= config.half_day_maximum_hours:
-                    return 'HD', 'Half Day'
-        
-        # Default: Present
-        return 'P', 'Present'
-    
-    def check_late_arrival(self, check_in_time, shift, date_obj, config):
-        """Check if employee arrived late"""
-        if not shift or not check_in_time:
-            return False, 0
-        
-        shift_start = timezone.datetime.combine(date_obj, shift.start_time)
-        shift_start = timezone.make_aware(shift_start)
-        
-        grace_minutes = config.grace_minutes if config else 15
-        grace_time = shift_start + timedelta(minutes=grace_minutes)
-        
-        if check_in_time > grace_time:
-            late_minutes = int((check_in_time - shift_start).total_seconds() / 60)
-            return True, late_minutes
-        
-        return False, 0
+            totals[employee.id] = {
+                'present_days': present + half * 0.5,
+                'absent_days': total_days - leave_count - weekly_off_count - holiday_count - present - half,
+                'leave_days': leave_count,
+                'weekly_off_days': weekly_off_count,
+                'holiday_days': holiday_count,
+                'half_days': half,
+                'total_work_hours': row.get('work_hours', 0.0),
+                'total_overtime_hours': row.get('overtime_hours', 0.0),
+                'late_arrivals': row.get('late', 0),
+                'early_departures': row.get('early', 0),
+            }
+        return totals
     
-    def check_early_departure(self, check_out_time, shift, date_obj, config):
-        """Check if employee left early"""
-        if not shift or not check_out_time:
-            return False, 0
-        
-        shift_end = timezone.datetime.combine(date_obj, shift.end_time)
-        shift_end = timezone.make_aware(shift_end)
-        
-        # Handle overnight shifts
-        if shift.end_time < shift.start_time:
-            shift_end += timedelta(days=1)
-        
-        threshold_minutes = config.early_out_threshold_minutes if config else 30
-        early_threshold = shift_end - timedelta(minutes=threshold_minutes)
-        
-        if check_out_time < early_threshold:
-            early_minutes = int((shift_end - check_out_time).total_seconds() / 60)
-            return True, early_minutes
-        
-        return False, 0
-
 
 
 class DailyAttendanceLogReportView(BaseAttendanceLogReportView):
@@ -264,17 +194,43 @@ class DailyAttendanceLogReportView(BaseAttendanceLogReportView):
         except ValueError:
             report_date = timezone.now().date()
         
-        # Get all attendance logs for the date
-        logs = AttendanceLog.objects.filter(
-            timestamp__date=report_date
-        ).select_related('employee', 'employee__department', 'employee__designation')
+        report = get_cached_report(
+            'log_daily', company,
+            lambda: self.build_report(company, active_config, report_date, filters),
+            date=report_date, filters=filters,
+        )
+        report_data = report['report_data']
+        summary = report['summary']
+        
+        # Get filter options
+        departments = Department.objects.filter(company=company).order_by('name')
+        employees_list = Employee.objects.filter(is_active=True).order_by('name')
+        
+        context = {
+            'company': company,
+            'active_config': active_config,
+            'report_data': report_data,
+            'summary': summary,
+            'selected_date': report_date,
+            'departments': departments,
+            'employees': employees_list,
+            'filters': filters,
+            'report_title': f'Daily Attendance Report - {report_date.strftime("%B %d, %Y")}'
+        }
+        
+        return render(request, 'zkteco/attendance_logs/daily_report.html', context)
+    
+    def build_report(self, company, active_config, report_date, filters):
+        """Rows and totals of the daily report"""
+        # Get the day summaries of the date
+        summaries = AttendanceDaySummary.objects.filter(date=report_date)
         
         # Apply filters
         if filters['department_id']:
-            logs = logs.filter(employee__department_id=filters['department_id'])
+            summaries = summaries.filter(employee__department_id=filters['department_id'])
         
         if filters['employee_id']:
-            logs = logs.filter(employee_id=filters['employee_id'])
+            summaries = summaries.filter(employee_id=filters['employee_id'])
         
         # Get employees to process
         if filters['employee_id']:
@@ -286,10 +242,16 @@ class DailyAttendanceLogReportView(BaseAttendanceLogReportView):
             )
         else:
             # Get all employees who have logs OR all active employees
-            employee_ids = logs.values_list('employee_id', flat=True).distinct()
+            employee_ids = summaries.values_list('employee_id', flat=True)
             employees = Employee.objects.filter(
                 Q(id__in=employee_ids) | Q(is_active=True)
             ).distinct()
+        employees = list(employees.select_related('department', 'designation', 'default_shift'))
+        
+        day_summaries = self.get_day_summaries(summaries)
+        
+        # Holiday and approved leave of the date, for employees without punches
+        calendar = self.get_calendar(company, report_date, report_date, employees)
         
         # Process attendance data
         report_data = []
@@ -302,40 +264,29 @@ class DailyAttendanceLogReportView(BaseAttendanceLogReportView):
         total_overtime_hours = 0.0
         
         for employee in employees:
-            employee_logs = logs.filter(employee=employee).order_by('timestamp')
-            
-            # Determine status
-            status_code, status_display = self.determine_status(
-                report_date, employee, employee_logs, active_config, company
-            )
+            day_summary = day_summaries.get((employee.id, report_date))
             
             # Get first and last punch
-            if employee_logs.exists():
-                first_punch = employee_logs.first().timestamp
-                last_punch = employee_logs.last().timestamp
-                check_in = first_punch.strftime('%I:%M %p')
-                check_out = last_punch.strftime('%I:%M %p')
-                total_punches = employee_logs.count()
-                
-                # Calculate work hours
-                work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                
-                # Check late/early
-                is_late, late_minutes = self.check_late_arrival(
-                    first_punch, employee.default_shift, report_date, active_config
-                )
-                is_early, early_minutes = self.check_early_departure(
-                    last_punch, employee.default_shift, report_date, active_config
-                )
-                
-                # Calculate overtime
-                expected_hours = employee.expected_working_hours or 8.0
-                is_weekend = self.is_weekend(report_date, active_config)
-                is_holiday = self.is_holiday(report_date, company)
-                overtime_hours = self.calculate_overtime(
-                    work_hours, expected_hours, active_config, is_weekend, is_holiday
+            if day_summary:
+                status_code = day_summary.status_code
+                status_display = day_summary.status_display
+                check_in = day_summary.first_punch.strftime('%I:%M %p')
+                check_out = day_summary.last_punch.strftime('%I:%M %p')
+                total_punches = day_summary.punch_count
+                work_hours, overtime_hours = self.day_hours(
+                    day_summary.first_punch, day_summary.last_punch,
+                    employee.expected_working_hours or 8.0, active_config,
+                    self.is_weekend(report_date, active_config), calendar.is_holiday(report_date)
                 )
+                is_late, late_minutes = day_summary.is_late, day_summary.late_minutes
+                is_early, early_minutes = day_summary.is_early, day_summary.early_minutes
             else:
+                # No punches: status from the holiday and leave calendar
+                status_code, status_display = self.determine_day_status(
+                    report_date, [], active_config,
+                    holiday_name=calendar.holiday_name(report_date),
+                    leave_type=calendar.leave_type(employee.id, report_date),
+                )
                 check_in = '-'
                 check_out = '-'
                 total_punches = 0
@@ -355,11 +306,11 @@ class DailyAttendanceLogReportView(BaseAttendanceLogReportView):
                 absent_count += 1
             elif status_code == 'W':
                 weekly_off_count += 1
-                if employee_logs.exists():
+                if day_summary:
                     total_overtime_hours += work_hours
             elif status_code == 'H':
                 holiday_count += 1
-                if employee_logs.exists():
+                if day_summary:
                     total_overtime_hours += work_hours
             elif status_code == 'L':
                 leave_count += 1
@@ -398,23 +349,7 @@ class DailyAttendanceLogReportView(BaseAttendanceLogReportView):
             'total_overtime_hours': round(total_overtime_hours, 2),
         }
         
-        # Get filter options
-        departments = Department.objects.filter(company=company).order_by('name')
-        employees_list = Employee.objects.filter(is_active=True).order_by('name')
-        
-        context = {
-            'company': company,
-            'active_config': active_config,
-            'report_data': report_data,
-            'summary': summary,
-            'selected_date': report_date,
-            'departments': departments,
-            'employees': employees_list,
-            'filters': filters,
-            'report_title': f'Daily Attendance Report - {report_date.strftime("%B %d, %Y")}'
-        }
-        
-        return render(request, 'zkteco/attendance_logs/daily_report.html', context)
+        return {'report_data': report_data, 'summary': summary}
 
 
 class MonthlyAttendanceLogReportView(BaseAttendanceLogReportView):
@@ -432,17 +367,44 @@ class MonthlyAttendanceLogReportView(BaseAttendanceLogReportView):
         start_date, end_date = self.get_date_range(request)
         filters = self.get_filters(request)
         
-        # Get all logs for the period
-        logs = AttendanceLog.objects.filter(
-            timestamp__date__range=[start_date, end_date]
-        ).select_related('employee', 'employee__department')
+        report = get_cached_report(
+            'log_monthly', company,
+            lambda: self.build_report(company, active_config, start_date, end_date, filters),
+            start_date=start_date, end_date=end_date, filters=filters,
+        )
+        report_data = report['report_data']
+        summary = report['summary']
+        
+        # Get filter options
+        departments = Department.objects.filter(company=company).order_by('name')
+        employees_list = Employee.objects.filter(is_active=True).order_by('name')
+        
+        context = {
+            'company': company,
+            'active_config': active_config,
+            'report_data': report_data,
+            'summary': summary,
+            'start_date': start_date,
+            'end_date': end_date,
+            'departments': departments,
+            'employees': employees_list,
+            'filters': filters,
+            'report_title': f'Monthly Attendance Report - {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}'
+        }
+        
+        return render(request, 'zkteco/attendance_logs/monthly_report.html', context)
+    
+    def build_report(self, company, active_config, start_date, end_date, filters):
+        """Rows and totals of the monthly report"""
+        # Day summaries of the period
+        summaries = AttendanceDaySummary.objects.filter(date__range=[start_date, end_date])
         
         # Apply filters
         if filters['department_id']:
-            logs = logs.filter(employee__department_id=filters['department_id'])
+            summaries = summaries.filter(employee__department_id=filters['department_id'])
         
         if filters['employee_id']:
-            logs = logs.filter(employee_id=filters['employee_id'])
+            summaries = summaries.filter(employee_id=filters['employee_id'])
         
         # Get employees
         if filters['employee_id']:
@@ -453,112 +415,31 @@ class MonthlyAttendanceLogReportView(BaseAttendanceLogReportView):
                 is_active=True
             )
         else:
-            employee_ids = logs.values_list('employee_id', flat=True).distinct()
+            employee_ids = summaries.values_list('employee_id', flat=True)
             employees = Employee.objects.filter(
                 Q(id__in=employee_ids) | Q(is_active=True)
             ).distinct()
+        employees = list(employees.select_related('department'))
+        
+        # Day counts and hours of every employee, aggregated in the database
+        totals = self.get_summary_totals(employees, start_date, end_date, active_config, company)
         
         # Process monthly data
         report_data = []
         total_days = (end_date - start_date).days + 1
         
         for employee in employees:
-            employee_logs = logs.filter(employee=employee)
-            
-            # Initialize counters
-            present_days = 0
-            absent_days = 0
-            weekly_off_days = 0
-            holiday_days = 0
-            leave_days = 0
-            half_days = 0
-            total_work_hours = 0.0
-            total_overtime_hours = 0.0
-            late_arrivals = 0
-            early_departures = 0
-            
-            # Process each day
-            current_date = start_date
-            while current_date <= end_date:
-                day_logs = employee_logs.filter(
-                    timestamp__date=current_date
-                ).order_by('timestamp')
-                
-                # Determine status
-                status_code, status_display = self.determine_status(
-                    current_date, employee, day_logs, active_config, company
-                )
-                
-                # Count statuses
-                if status_code == 'P':
-                    present_days += 1
-                    
-                    # Calculate work hours
-                    if day_logs.exists():
-                        first_punch = day_logs.first().timestamp
-                        last_punch = day_logs.last().timestamp
-                        work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                        total_work_hours += work_hours
-                        
-                        # Calculate overtime
-                        expected_hours = employee.expected_working_hours or 8.0
-                        overtime = self.calculate_overtime(
-                            work_hours, expected_hours, active_config, False, False
-                        )
-                        total_overtime_hours += overtime
-                        
-                        # Check late/early
-                        is_late, _ = self.check_late_arrival(
-                            first_punch, employee.default_shift, current_date, active_config
-                        )
-                        is_early, _ = self.check_early_departure(
-                            last_punch, employee.default_shift, current_date, active_config
-                        )
-                        
-                        if is_late:
-                            late_arrivals += 1
-                        if is_early:
-                            early_departures += 1
-                        
-                elif status_code == 'A':
-                    absent_days += 1
-                elif status_code == 'W':
-                    weekly_off_days += 1
-                    # If worked on weekend, count as overtime
-                    if day_logs.exists():
-                        first_punch = day_logs.first().timestamp
-                        last_punch = day_logs.last().timestamp
-                        work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                        overtime = self.calculate_overtime(
-                            work_hours, employee.expected_working_hours or 8.0, 
-                            active_config, True, False
-                        )
-                        total_overtime_hours += overtime
-                elif status_code == 'H':
-                    holiday_days += 1
-                    # If worked on holiday, count as overtime
-                    if day_logs.exists():
-                        first_punch = day_logs.first().timestamp
-                        last_punch = day_logs.last().timestamp
-                        work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                        overtime = self.calculate_overtime(
-                            work_hours, employee.expected_working_hours or 8.0, 
-                            active_config, False, True
-                        )
-                        total_overtime_hours += overtime
-                elif status_code == 'L':
-                    leave_days += 1
-                elif status_code == 'HD':
-                    half_days += 1
-                    present_days += 0.5
-                    
-                    if day_logs.exists():
-                        first_punch = day_logs.first().timestamp
-                        last_punch = day_logs.last().timestamp
-                        work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                        total_work_hours += work_hours
-                
-                current_date += timedelta(days=1)
+            employee_totals = totals[employee.id]
+            present_days = employee_totals['present_days']
+            absent_days = employee_totals['absent_days']
+            weekly_off_days = employee_totals['weekly_off_days']
+            holiday_days = employee_totals['holiday_days']
+            leave_days = employee_totals['leave_days']
+            half_days = employee_totals['half_days']
+            total_work_hours = employee_totals['total_work_hours']
+            total_overtime_hours = employee_totals['total_overtime_hours']
+            late_arrivals = employee_totals['late_arrivals']
+            early_departures = employee_totals['early_departures']
             
             # Calculate attendance percentage
             working_days = total_days - weekly_off_days - holiday_days
@@ -598,24 +479,7 @@ class MonthlyAttendanceLogReportView(BaseAttendanceLogReportView):
             ),
         }
         
-        # Get filter options
-        departments = Department.objects.filter(company=company).order_by('name')
-        employees_list = Employee.objects.filter(is_active=True).order_by('name')
-        
-        context = {
-            'company': company,
-            'active_config': active_config,
-            'report_data': report_data,
-            'summary': summary,
-            'start_date': start_date,
-            'end_date': end_date,
-            'departments': departments,
-            'employees': employees_list,
-            'filters': filters,
-            'report_title': f'Monthly Attendance Report - {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}'
-        }
-        
-        return render(request, 'zkteco/attendance_logs/monthly_report.html', context)
+        return {'report_data': report_data, 'summary': summary}
 
 
 class EmployeeMonthlyDetailReportView(BaseAttendanceLogReportView):
@@ -667,11 +531,45 @@ class EmployeeMonthlyDetailReportView(BaseAttendanceLogReportView):
         last_day = calendar.monthrange(start_date.year, start_date.month)[1]
         end_date = date(start_date.year, start_date.month, last_day)
         
-        # Get all logs for the employee in this month
-        logs = AttendanceLog.objects.filter(
-            employee=employee,
-            timestamp__date__range=[start_date, end_date]
-        ).order_by('timestamp')
+        report = get_cached_report(
+            'log_employee_detail', company,
+            lambda: self.build_report(company, active_config, employee, start_date, end_date),
+            employee_id=employee.id, start_date=start_date, end_date=end_date,
+        )
+        daily_records = report['daily_records']
+        summary = report['summary']
+        
+        # Employee details
+        employees = Employee.objects.filter(is_active=True).order_by('name')
+        
+        context = {
+            'company': company,
+            'active_config': active_config,
+            'employee': employee,
+            'employees': employees,
+            'daily_records': daily_records,
+            'summary': summary,
+            'selected_month': start_date.strftime('%Y-%m'),
+            'month_name': start_date.strftime('%B %Y'),
+            'report_title': f'Employee Monthly Detail Report - {employee.name} - {start_date.strftime("%B %Y")}'
+        }
+        
+        return render(request, 'zkteco/attendance_logs/employee_detail_report.html', context)
+    
+    def build_report(self, company, active_config, employee, start_date, end_date):
+        """Daily records and totals of the employee detail report"""
+        # Day summaries of the month, plus the punch times listed per day
+        day_summaries = self.get_day_summaries(
+            AttendanceDaySummary.objects.filter(
+                employee=employee, date__range=[start_date, end_date]
+            )
+        )
+        day_punches = self.get_day_punches(
+            AttendanceLog.objects.filter(employee=employee), start_date, end_date
+        )
+        
+        # Holidays and approved leave of the month, for days without punches
+        calendar = self.get_calendar(company, start_date, end_date, [employee])
         
         # Process daily attendance
         daily_records = []
@@ -690,42 +588,29 @@ class EmployeeMonthlyDetailReportView(BaseAttendanceLogReportView):
         
         current_date = start_date
         while current_date <= end_date:
-            day_logs = logs.filter(timestamp__date=current_date).order_by('timestamp')
-            
-            # Determine status
-            status_code, status_display = self.determine_status(
-                current_date, employee, day_logs, active_config, company
-            )
+            day_summary = day_summaries.get((employee.id, current_date))
             
             # Get punch details
-            if day_logs.exists():
-                first_punch = day_logs.first().timestamp
-                last_punch = day_logs.last().timestamp
-                check_in = first_punch.strftime('%I:%M %p')
-                check_out = last_punch.strftime('%I:%M %p')
-                punch_count = day_logs.count()
+            if day_summary:
+                status_code = day_summary.status_code
+                status_display = day_summary.status_display
+                check_in = day_summary.first_punch.strftime('%I:%M %p')
+                check_out = day_summary.last_punch.strftime('%I:%M %p')
+                punch_count = day_summary.punch_count
                 
                 # Get all punch times
-                punch_times = [log.timestamp.strftime('%I:%M %p') for log in day_logs]
-                
-                # Calculate work hours
-                work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                
-                # Check late/early
-                is_late, late_minutes = self.check_late_arrival(
-                    first_punch, employee.default_shift, current_date, active_config
-                )
-                is_early, early_minutes = self.check_early_departure(
-                    last_punch, employee.default_shift, current_date, active_config
-                )
+                punch_times = [
+                    timestamp.strftime('%I:%M %p')
+                    for timestamp in day_punches.get((employee.id, current_date), [])
+                ]
                 
-                # Calculate overtime
-                expected_hours = employee.expected_working_hours or 8.0
-                is_weekend = self.is_weekend(current_date, active_config)
-                is_holiday = self.is_holiday(current_date, company)
-                overtime_hours = self.calculate_overtime(
-                    work_hours, expected_hours, active_config, is_weekend, is_holiday
+                work_hours, overtime_hours = self.day_hours(
+                    day_summary.first_punch, day_summary.last_punch,
+                    employee.expected_working_hours or 8.0, active_config,
+                    self.is_weekend(current_date, active_config), calendar.is_holiday(current_date)
                 )
+                is_late, late_minutes = day_summary.is_late, day_summary.late_minutes
+                is_early, early_minutes = day_summary.is_early, day_summary.early_minutes
                 
                 if is_late:
                     total_late += 1
@@ -735,6 +620,12 @@ class EmployeeMonthlyDetailReportView(BaseAttendanceLogReportView):
                     total_early += 1
                     early_minutes_sum += early_minutes
             else:
+                # No punches: status from the holiday and leave calendar
+                status_code, status_display = self.determine_day_status(
+                    current_date, [], active_config,
+                    holiday_name=calendar.holiday_name(current_date),
+                    leave_type=calendar.leave_type(employee.id, current_date),
+                )
                 check_in = '-'
                 check_out = '-'
                 punch_count = 0
@@ -757,11 +648,11 @@ class EmployeeMonthlyDetailReportView(BaseAttendanceLogReportView):
                 total_leave += 1
             elif status_code == 'W':
                 total_weekend += 1
-                if day_logs.exists():
+                if day_summary:
                     total_overtime_hours += overtime_hours
             elif status_code == 'H':
                 total_holiday += 1
-                if day_logs.exists():
+                if day_summary:
                     total_overtime_hours += overtime_hours
             elif status_code == 'HD':
                 total_half_day += 1
@@ -815,22 +706,7 @@ class EmployeeMonthlyDetailReportView(BaseAttendanceLogReportView):
             'avg_early_minutes': round(early_minutes_sum / max(total_early, 1), 1),
         }
         
-        # Employee details
-        employees = Employee.objects.filter(is_active=True).order_by('name')
-        
-        context = {
-            'company': company,
-            'active_config': active_config,
-            'employee': employee,
-            'employees': employees,
-            'daily_records': daily_records,
-            'summary': summary,
-            'selected_month': start_date.strftime('%Y-%m'),
-            'month_name': start_date.strftime('%B %Y'),
-            'report_title': f'Employee Monthly Detail Report - {employee.name} - {start_date.strftime("%B %Y")}'
-        }
-        
-        return render(request, 'zkteco/attendance_logs/employee_detail_report.html', context)
+        return {'daily_records': daily_records, 'summary': summary}
 
 
 class EmployeePayrollSummaryReportView(BaseAttendanceLogReportView):
@@ -848,17 +724,45 @@ class EmployeePayrollSummaryReportView(BaseAttendanceLogReportView):
         start_date, end_date = self.get_date_range(request)
         filters = self.get_filters(request)
         
-        # Get all logs for the period
-        logs = AttendanceLog.objects.filter(
-            timestamp__date__range=[start_date, end_date]
-        ).select_related('employee', 'employee__department')
+        report = get_cached_report(
+            'log_payroll', company,
+            lambda: self.build_report(company, active_config, start_date, end_date, filters),
+            start_date=start_date, end_date=end_date, filters=filters,
+        )
+        payroll_data = report['payroll_data']
+        summary = report['summary']
+        
+        # Get filter options
+        departments = Department.objects.filter(company=company).order_by('name')
+        employees_list = Employee.objects.filter(is_active=True).order_by('name')
+        
+        context = {
+            'company': company,
+            'active_config': active_config,
+            'payroll_data': payroll_data,
+            'summary': summary,
+            'start_date': start_date,
+            'end_date': end_date,
+            'departments': departments,
+            'employees': employees_list,
+            'filters': filters,
+            'report_title': f'Payroll Summary Report - {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}'
+        }
+        
+        return render(request, 'zkteco/attendance_logs/payroll_summary.html', context)
+
+    
+    def build_report(self, company, active_config, start_date, end_date, filters):
+        """Rows and totals of the payroll summary report"""
+        # Day summaries of the period
+        summaries = AttendanceDaySummary.objects.filter(date__range=[start_date, end_date])
         
         # Apply filters
         if filters['department_id']:
-            logs = logs.filter(employee__department_id=filters['department_id'])
+            summaries = summaries.filter(employee__department_id=filters['department_id'])
         
         if filters['employee_id']:
-            logs = logs.filter(employee_id=filters['employee_id'])
+            summaries = summaries.filter(employee_id=filters['employee_id'])
         
         # Get employees
         if filters['employee_id']:
@@ -869,10 +773,14 @@ class EmployeePayrollSummaryReportView(BaseAttendanceLogReportView):
                 is_active=True
             )
         else:
-            employee_ids = logs.values_list('employee_id', flat=True).distinct()
+            employee_ids = summaries.values_list('employee_id', flat=True)
             employees = Employee.objects.filter(
                 Q(id__in=employee_ids) | Q(is_active=True)
             ).distinct()
+        employees = list(employees.select_related('department', 'designation'))
+        
+        # Day counts and hours of every employee, aggregated in the database
+        totals = self.get_summary_totals(employees, start_date, end_date, active_config, company)
         
         # Process payroll data
         payroll_data = []
@@ -886,63 +794,22 @@ class EmployeePayrollSummaryReportView(BaseAttendanceLogReportView):
         
         total_days = (end_date - start_date).days + 1
         
+        # Working days of the period, the same for every employee
+        calendar = self.get_calendar(company, start_date, end_date, employees)
+        working_days = total_days - sum([
+            1 for d in range(total_days)
+            if self.is_weekend(start_date + timedelta(days=d), active_config) or
+               calendar.is_holiday(start_date + timedelta(days=d))
+        ])
+        
         for employee in employees:
-            employee_logs = logs.filter(employee=employee)
-            
-            # Initialize counters
-            present_days = 0
-            absent_days = 0
-            leave_days = 0
-            half_days = 0
-            total_work_hours = 0.0
-            total_overtime_hours = 0.0
-            
-            # Process each day
-            current_date = start_date
-            while current_date <= end_date:
-                day_logs = employee_logs.filter(
-                    timestamp__date=current_date
-                ).order_by('timestamp')
-                
-                # Determine status
-                status_code, status_display = self.determine_status(
-                    current_date, employee, day_logs, active_config, company
-                )
-                
-                # Calculate hours
-                if day_logs.exists():
-                    first_punch = day_logs.first().timestamp
-                    last_punch = day_logs.last().timestamp
-                    work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                    
-                    expected_hours = employee.expected_working_hours or 8.0
-                    is_weekend = self.is_weekend(current_date, active_config)
-                    is_holiday = self.is_holiday(current_date, company)
-                    overtime = self.calculate_overtime(
-                        work_hours, expected_hours, active_config, is_weekend, is_holiday
-                    )
-                    
-                    if status_code == 'P':
-                        total_work_hours += work_hours
-                        total_overtime_hours += overtime
-                    elif status_code in ['W', 'H']:
-                        # Weekend/Holiday work counts as overtime
-                        total_overtime_hours += overtime
-                    elif status_code == 'HD':
-                        total_work_hours += work_hours
-                
-                # Count status
-                if status_code == 'P':
-                    present_days += 1
-                elif status_code == 'A':
-                    absent_days += 1
-                elif status_code == 'L':
-                    leave_days += 1
-                elif status_code == 'HD':
-                    half_days += 1
-                    present_days += 0.5
-                
-                current_date += timedelta(days=1)
+            employee_totals = totals[employee.id]
+            present_days = employee_totals['present_days']
+            absent_days = employee_totals['absent_days']
+            leave_days = employee_totals['leave_days']
+            half_days = employee_totals['half_days']
+            total_work_hours = employee_totals['total_work_hours']
+            total_overtime_hours = employee_totals['total_overtime_hours']
             
             # Calculate salary components
             basic_salary = employee.basic_salary or Decimal('0.00')
@@ -979,12 +846,6 @@ class EmployeePayrollSummaryReportView(BaseAttendanceLogReportView):
             net_pay = gross_pay - total_deduction
             
             # Absence deduction (if applicable)
-            working_days = total_days - sum([
-                1 for d in range(total_days) 
-                if self.is_weekend(start_date + timedelta(days=d), active_config) or 
-                   self.is_holiday(start_date + timedelta(days=d), company)
-            ])
-            
             if working_days > 0:
                 per_day_salary = basic_salary / Decimal(str(working_days))
                 absence_deduction = per_day_salary * Decimal(str(absent_days))
@@ -1048,218 +909,257 @@ class EmployeePayrollSummaryReportView(BaseAttendanceLogReportView):
             'total_net_pay': float(total_net_pay),
         }
         
-        # Get filter options
-        departments = Department.objects.filter(company=company).order_by('name')
-        employees_list = Employee.objects.filter(is_active=True).order_by('name')
-        
-        context = {
-            'company': company,
-            'active_config': active_config,
-            'payroll_data': payroll_data,
-            'summary': summary,
-            'start_date': start_date,
-            'end_date': end_date,
-            'departments': departments,
-            'employees': employees_list,
-            'filters': filters,
-            'report_title': f'Payroll Summary Report - {start_date.strftime("%B %d, %Y")} to {end_date.strftime("%B %d, %Y")}'
-        }
-        
-        return render(request, 'zkteco/attendance_logs/payroll_summary.html', context)
+        return {'payroll_data': payroll_data, 'summary': summary}
 
 
+@method_decorator(gzip_page, name='dispatch')
 class ExportAttendanceReportView(BaseAttendanceLogReportView):
-    """Export attendance reports to CSV"""
+    """
+    Export attendance reports to CSV, or to XLSX with format=xlsx.
+    
+    Exports list the active employees of the request's company. Rows are
+    generated from the day summaries a chunk of employees at a time. CSV is
+    streamed as the rows are produced; clients that accept gzip get the
+    stream compressed. XLSX is not streamed: the workbook is a zip archive
+    that openpyxl can only save once every row is in, so the rows go
+    through a write-only workbook (memory stays flat) into a temporary
+    file, which is then sent from disk.
+    """
     
     def get(self, request):
         report_type = request.GET.get('type', 'daily')
+        export_format = request.GET.get('format', 'csv')
         
-        if report_type == 'daily':
-            return self.export_daily_report(request)
-        elif report_type == 'monthly':
-            return self.export_monthly_report(request)
-        elif report_type == 'employee_detail':
-            return self.export_employee_detail_report(request)
-        elif report_type == 'payroll':
-            return self.export_payroll_report(request)
-        else:
+        exporters = {
+            'daily': self.export_daily_report,
+            'monthly': self.export_monthly_report,
+            'employee_detail': self.export_employee_detail_report,
+            'payroll': self.export_payroll_report,
+        }
+        if report_type not in exporters:
             return HttpResponse("Invalid report type", status=400)
+        
+        if export_format not in ('csv', 'xlsx'):
+            return HttpResponse("Invalid export format. Use csv or xlsx", status=400)
+        if export_format == 'xlsx' and not OPENPYXL_AVAILABLE:
+            return HttpResponse("XLSX export requires openpyxl", status=400)
+        
+        export = exporters[report_type](request)
+        if isinstance(export, HttpResponse):
+            return export
+        
+        filename, header, rows = export
+        if export_format == 'xlsx':
+            return self.xlsx_response(f'{filename}.xlsx', header, rows)
+        return self.csv_response(f'{filename}.csv', header, rows)
+    
+    def csv_response(self, filename, header, rows):
+        """Stream the header and rows as CSV lines"""
+        response = StreamingHttpResponse(iter_csv_lines(header, rows), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    def xlsx_response(self, filename, header, rows):
+        """Write the rows to a write-only workbook in a temporary file and stream the file"""
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for row in rows:
+            sheet.append(row)
+        
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    
+    def iter_employee_chunks(self, employees):
+        """Employees in lists of EXPORT_CHUNK_SIZE, read with a database iterator"""
+        employees = employees.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(employees, EXPORT_CHUNK_SIZE))
+            if not chunk:
+                return
+            yield chunk
     
     def export_daily_report(self, request):
-        """Export daily attendance report to CSV"""
+        """Daily attendance report rows"""
         company = self.get_company(request)
         active_config = self.get_active_config(company)
         
         report_date_str = request.GET.get('date', timezone.now().date().strftime('%Y-%m-%d'))
         report_date = datetime.strptime(report_date_str, '%Y-%m-%d').date()
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="daily_attendance_{report_date}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Employee ID', 'Employee Name', 'Department', 'Designation', 
             'Shift', 'Check In', 'Check Out', 'Total Punches', 
             'Work Hours', 'Overtime Hours', 'Status', 'Late', 'Early Departure'
-        ])
+        ]
         
-        # Get data
-        logs = AttendanceLog.objects.filter(
-            timestamp__date=report_date
-        ).select_related('employee', 'employee__department', 'employee__designation')
-        
-        employees = Employee.objects.filter(is_active=True)
-        
-        for employee in employees:
-            employee_logs = logs.filter(employee=employee).order_by('timestamp')
-            status_code, status_display = self.determine_status(
-                report_date, employee, employee_logs, active_config, company
+        def rows():
+            employees = Employee.objects.filter(company=company, is_active=True).select_related(
+                'department', 'designation', 'default_shift'
             )
+            # Holidays and approved leave of all employees, loaded once for every chunk
+            calendar = self.get_calendar(company, report_date, report_date)
             
-            if employee_logs.exists():
-                first_punch = employee_logs.first().timestamp
-                last_punch = employee_logs.last().timestamp
-                check_in = first_punch.strftime('%I:%M %p')
-                check_out = last_punch.strftime('%I:%M %p')
-                work_hours = self.calculate_work_hours(first_punch, last_punch, active_config)
-                
-                is_late, late_min = self.check_late_arrival(
-                    first_punch, employee.default_shift, report_date, active_config
-                )
-                is_early, early_min = self.check_early_departure(
-                    last_punch, employee.default_shift, report_date, active_config
+            for chunk in self.iter_employee_chunks(employees):
+                day_summaries = self.get_day_summaries(
+                    AttendanceDaySummary.objects.filter(employee__in=chunk, date=report_date)
                 )
                 
-                expected_hours = employee.expected_working_hours or 8.0
-                overtime = self.calculate_overtime(work_hours, expected_hours, active_config)
-            else:
-                check_in = '-'
-                check_out = '-'
-                work_hours = 0
-                overtime = 0
-                is_late = False
-                is_early = False
-                late_min = 0
-                early_min = 0
-            
-            writer.writerow([
-                employee.employee_id,
-                employee.name,
-                employee.department.name if employee.department else 'N/A',
-                employee.designation.name if employee.designation else 'N/A',
-                employee.default_shift.name if employee.default_shift else 'N/A',
-                check_in,
-                check_out,
-                employee_logs.count(),
-                round(work_hours, 2),
-                round(overtime, 2),
-                status_display,
-                f'Yes ({late_min} min)' if is_late else 'No',
-                f'Yes ({early_min} min)' if is_early else 'No',
-            ])
-        
-        return response
+                for employee in chunk:
+                    day_summary = day_summaries.get((employee.id, report_date))
+                    
+                    if day_summary:
+                        status_display = day_summary.status_display
+                        check_in = day_summary.first_punch.strftime('%I:%M %p')
+                        check_out = day_summary.last_punch.strftime('%I:%M %p')
+                        punch_count = day_summary.punch_count
+                        work_hours = self.calculate_work_hours(
+                            day_summary.first_punch, day_summary.last_punch, active_config
+                        )
+                        is_late, late_min = day_summary.is_late, day_summary.late_minutes
+                        is_early, early_min = day_summary.is_early, day_summary.early_minutes
+                        
+                        expected_hours = employee.expected_working_hours or 8.0
+                        overtime = self.calculate_overtime(work_hours, expected_hours, active_config)
+                    else:
+                        _, status_display = self.determine_day_status(
+                            report_date, [], active_config,
+                            holiday_name=calendar.holiday_name(report_date),
+                            leave_type=calendar.leave_type(employee.id, report_date),
+                        )
+                        check_in = '-'
+                        check_out = '-'
+                        punch_count = 0
+                        work_hours = 0
+                        overtime = 0
+                        is_late = False
+                        is_early = False
+                        late_min = 0
+                        early_min = 0
+                    
+                    yield [
+                        employee.employee_id,
+                        employee.name,
+                        employee.department.name if employee.department else 'N/A',
+                        employee.designation.name if employee.designation else 'N/A',
+                        employee.default_shift.name if employee.default_shift else 'N/A',
+                        check_in,
+                        check_out,
+                        punch_count,
+                        round(work_hours, 2),
+                        round(overtime, 2),
+                        status_display,
+                        f'Yes ({late_min} min)' if is_late else 'No',
+                        f'Yes ({early_min} min)' if is_early else 'No',
+                    ]
+        
+        return f'daily_attendance_{report_date}', header, rows()
     
     def export_monthly_report(self, request):
-        """Export monthly attendance report to CSV"""
+        """Monthly attendance report rows"""
         company = self.get_company(request)
         start_date, end_date = self.get_date_range(request)
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="monthly_attendance_{start_date}_{end_date}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Employee ID', 'Employee Name', 'Department', 'Total Days', 
             'Working Days', 'Present Days', 'Absent Days', 'Leave Days',
             'Weekend Days', 'Holiday Days', 'Half Days', 'Late Arrivals',
             'Early Departures', 'Total Work Hours', 'Total Overtime Hours',
             'Avg Daily Hours', 'Attendance %'
-        ])
+        ]
         
-        # Get data
-        logs = AttendanceLog.objects.filter(
-            timestamp__date__range=[start_date, end_date]
-        ).select_related('employee', 'employee__department')
-        
-        employees = Employee.objects.filter(is_active=True)
-        
-        for employee in employees:
-            employee_logs = logs.filter(employee=employee)
-            
-            # Initialize counters
-            present_days = 0
-            absent_days = 0
-            weekly_off_days = 0
-            holiday_days = 0
-            leave_days = 0
-            half_days = 0
-            total_work_hours = 0.0
-            total_overtime_hours = 0.0
-            late_arrivals = 0
-            early_departures = 0
+        def rows():
+            employees = Employee.objects.filter(company=company, is_active=True).select_related('department')
+            # Holidays and approved leave of all employees, loaded once for every chunk
+            calendar = self.get_calendar(company, start_date, end_date)
+            total_days_count = (end_date - start_date).days + 1
             
-            # Process each day
-            current_date = start_date
-            while current_date <= end_date:
-                day_logs = employee_logs.filter(
-                    timestamp__date=current_date
-                ).order_by('timestamp')
-                
-                status_code, _ = self.determine_status(
-                    current_date, employee, day_logs, None, company
+            for chunk in self.iter_employee_chunks(employees):
+                day_summaries = self.get_day_summaries(
+                    AttendanceDaySummary.objects.filter(
+                        employee__in=chunk, date__range=[start_date, end_date]
+                    ).only('employee_id', 'date', 'first_punch', 'last_punch')
                 )
                 
-                if status_code == 'P':
-                    present_days += 1
-                    if day_logs.exists():
-                        first_punch = day_logs.first().timestamp
-                        last_punch = day_logs.last().timestamp
-                        work_hours = self.calculate_work_hours(first_punch, last_punch, None)
-                        total_work_hours += work_hours
-                elif status_code == 'A':
-                    absent_days += 1
-                elif status_code == 'W':
-                    weekly_off_days += 1
-                elif status_code == 'H':
-                    holiday_days += 1
-                elif status_code == 'L':
-                    leave_days += 1
-                elif status_code == 'HD':
-                    half_days += 1
-                    present_days += 0.5
-                
-                current_date += timedelta(days=1)
-            
-            # Calculate attendance percentage
-            total_days_count = (end_date - start_date).days + 1
-            working_days = total_days_count - weekly_off_days - holiday_days
-            attendance_percentage = (present_days / max(working_days, 1)) * 100 if working_days > 0 else 0
-            
-            writer.writerow([
-                employee.employee_id,
-                employee.name,
-                employee.department.name if employee.department else 'N/A',
-                total_days_count,
-                working_days,
-                round(present_days, 1),
-                absent_days,
-                leave_days,
-                weekly_off_days,
-                holiday_days,
-                half_days,
-                late_arrivals,
-                early_departures,
-                round(total_work_hours, 2),
-                round(total_overtime_hours, 2),
-                round(total_work_hours / max(present_days, 1), 2),
-                round(attendance_percentage, 1),
-            ])
-        
-        return response
+                for employee in chunk:
+                    # Initialize counters
+                    present_days = 0
+                    absent_days = 0
+                    weekly_off_days = 0
+                    holiday_days = 0
+                    leave_days = 0
+                    half_days = 0
+                    total_work_hours = 0.0
+                    total_overtime_hours = 0.0
+                    late_arrivals = 0
+                    early_departures = 0
+                    
+                    # Process each day; without a configuration only the
+                    # first and last punch of a day matter
+                    current_date = start_date
+                    while current_date <= end_date:
+                        day_summary = day_summaries.get((employee.id, current_date))
+                        punches = [day_summary.first_punch, day_summary.last_punch] if day_summary else []
+                        
+                        status_code, _ = self.determine_day_status(
+                            current_date, punches, None,
+                            holiday_name=calendar.holiday_name(current_date),
+                            leave_type=calendar.leave_type(employee.id, current_date),
+                        )
+                        
+                        if status_code == 'P':
+                            present_days += 1
+                            if punches:
+                                total_work_hours += self.calculate_work_hours(punches[0], punches[-1], None)
+                        elif status_code == 'A':
+                            absent_days += 1
+                        elif status_code == 'W':
+                            weekly_off_days += 1
+                        elif status_code == 'H':
+                            holiday_days += 1
+                        elif status_code == 'L':
+                            leave_days += 1
+                        elif status_code == 'HD':
+                            half_days += 1
+                            present_days += 0.5
+                        
+                        current_date += timedelta(days=1)
+                    
+                    # Calculate attendance percentage
+                    working_days = total_days_count - weekly_off_days - holiday_days
+                    attendance_percentage = (present_days / max(working_days, 1)) * 100 if working_days > 0 else 0
+                    
+                    yield [
+                        employee.employee_id,
+                        employee.name,
+                        employee.department.name if employee.department else 'N/A',
+                        total_days_count,
+                        working_days,
+                        round(present_days, 1),
+                        absent_days,
+                        leave_days,
+                        weekly_off_days,
+                        holiday_days,
+                        half_days,
+                        late_arrivals,
+                        early_departures,
+                        round(total_work_hours, 2),
+                        round(total_overtime_hours, 2),
+                        round(total_work_hours / max(present_days, 1), 2),
+                        round(attendance_percentage, 1),
+                    ]
+        
+        return f'monthly_attendance_{start_date}_{end_date}', header, rows()
     
     def export_employee_detail_report(self, request):
-        """Export employee detail report to CSV"""
+        """Employee detail report rows"""
         employee_id = request.GET.get('employee')
         month_str = request.GET.get('month')
         
@@ -1267,7 +1167,7 @@ class ExportAttendanceReportView(BaseAttendanceLogReportView):
             return HttpResponse("Employee ID and Month are required", status=400)
         
         try:
-            employee = Employee.objects.get(id=employee_id)
+            employee = Employee.objects.select_related('default_shift').get(id=employee_id)
         except Employee.DoesNotExist:
             return HttpResponse("Employee not found", status=404)
         
@@ -1279,187 +1179,193 @@ class ExportAttendanceReportView(BaseAttendanceLogReportView):
         except ValueError:
             return HttpResponse("Invalid month format. Use YYYY-MM", status=400)
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="employee_detail_{employee_id}_{month_str}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Date', 'Day', 'Check In', 'Check Out', 'Punch Count',
             'Work Hours', 'Overtime Hours', 'Status', 'Late', 'Early Departure'
-        ])
-        
-        # Get data
-        logs = AttendanceLog.objects.filter(
-            employee=employee,
-            timestamp__date__range=[start_date, end_date]
-        ).order_by('timestamp')
+        ]
         
-        current_date = start_date
-        while current_date <= end_date:
-            day_logs = logs.filter(timestamp__date=current_date).order_by('timestamp')
+        def rows():
+            day_summaries = self.get_day_summaries(
+                AttendanceDaySummary.objects.filter(
+                    employee=employee, date__range=[start_date, end_date]
+                )
+            )
+            # Without a company, holidays are not considered
+            calendar = self.get_calendar(None, start_date, end_date, [employee])
             
-            if day_logs.exists():
-                first_punch = day_logs.first().timestamp
-                last_punch = day_logs.last().timestamp
-                check_in = first_punch.strftime('%I:%M %p')
-                check_out = last_punch.strftime('%I:%M %p')
-                work_hours = self.calculate_work_hours(first_punch, last_punch, None)
+            current_date = start_date
+            while current_date <= end_date:
+                day_summary = day_summaries.get((employee.id, current_date))
                 
-                is_late, late_min = self.check_late_arrival(
-                    first_punch, employee.default_shift, current_date, None
-                )
-                is_early, early_min = self.check_early_departure(
-                    last_punch, employee.default_shift, current_date, None
+                if day_summary:
+                    first_punch = day_summary.first_punch
+                    last_punch = day_summary.last_punch
+                    punches = [first_punch, last_punch]
+                    check_in = first_punch.strftime('%I:%M %p')
+                    check_out = last_punch.strftime('%I:%M %p')
+                    punch_count = day_summary.punch_count
+                    work_hours = self.calculate_work_hours(first_punch, last_punch, None)
+                    
+                    is_late, late_min = self.check_late_arrival(
+                        first_punch, employee.default_shift, current_date, None
+                    )
+                    is_early, early_min = self.check_early_departure(
+                        last_punch, employee.default_shift, current_date, None
+                    )
+                    
+                    expected_hours = employee.expected_working_hours or 8.0
+                    overtime = self.calculate_overtime(work_hours, expected_hours, None)
+                else:
+                    punches = []
+                    check_in = '-'
+                    check_out = '-'
+                    punch_count = 0
+                    work_hours = 0
+                    overtime = 0
+                    is_late = False
+                    is_early = False
+                    late_min = 0
+                    early_min = 0
+                
+                status_code, status_display = self.determine_day_status(
+                    current_date, punches, None,
+                    holiday_name=calendar.holiday_name(current_date),
+                    leave_type=calendar.leave_type(employee.id, current_date),
                 )
                 
-                expected_hours = employee.expected_working_hours or 8.0
-                overtime = self.calculate_overtime(work_hours, expected_hours, None)
-            else:
-                check_in = '-'
-                check_out = '-'
-                work_hours = 0
-                overtime = 0
-                is_late = False
-                is_early = False
-                late_min = 0
-                early_min = 0
-            
-            status_code, status_display = self.determine_status(
-                current_date, employee, day_logs, None, None
-            )
-            
-            writer.writerow([
-                current_date.strftime('%Y-%m-%d'),
-                current_date.strftime('%A'),
-                check_in,
-                check_out,
-                day_logs.count(),
-                round(work_hours, 2),
-                round(overtime, 2),
-                status_display,
-                f'Yes ({late_min} min)' if is_late else 'No',
-                f'Yes ({early_min} min)' if is_early else 'No',
-            ])
-            
-            current_date += timedelta(days=1)
+                yield [
+                    current_date.strftime('%Y-%m-%d'),
+                    current_date.strftime('%A'),
+                    check_in,
+                    check_out,
+                    punch_count,
+                    round(work_hours, 2),
+                    round(overtime, 2),
+                    status_display,
+                    f'Yes ({late_min} min)' if is_late else 'No',
+                    f'Yes ({early_min} min)' if is_early else 'No',
+                ]
+                
+                current_date += timedelta(days=1)
         
-        return response
+        return f'employee_detail_{employee_id}_{month_str}', header, rows()
     
     def export_payroll_report(self, request):
-        """Export payroll summary report to CSV"""
+        """Payroll summary report rows"""
         company = self.get_company(request)
         start_date, end_date = self.get_date_range(request)
         
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="payroll_summary_{start_date}_{end_date}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
+        header = [
             'Employee ID', 'Employee Name', 'Department', 'Designation',
             'Present Days', 'Absent Days', 'Leave Days', 'Work Hours', 'Overtime Hours',
             'Basic Salary', 'Allowances', 'Overtime Pay', 'Hourly Wage',
             'Gross Pay', 'Deductions', 'Net Pay'
-        ])
+        ]
         
-        # Get data
-        logs = AttendanceLog.objects.filter(
-            timestamp__date__range=[start_date, end_date]
-        ).select_related('employee', 'employee__department')
-        
-        employees = Employee.objects.filter(is_active=True)
-        
-        for employee in employees:
-            employee_logs = logs.filter(employee=employee)
-            
-            # Initialize counters
-            present_days = 0
-            absent_days = 0
-            leave_days = 0
-            total_work_hours = 0.0
-            total_overtime_hours = 0.0
+        def rows():
+            employees = Employee.objects.filter(company=company, is_active=True).select_related(
+                'department', 'designation'
+            )
+            # Holidays and approved leave of all employees, loaded once for every chunk
+            calendar = self.get_calendar(company, start_date, end_date)
             
-            # Process each day
-            current_date = start_date
-            while current_date <= end_date:
-                day_logs = employee_logs.filter(
-                    timestamp__date=current_date
-                ).order_by('timestamp')
-                
-                status_code, _ = self.determine_status(
-                    current_date, employee, day_logs, None, company
+            for chunk in self.iter_employee_chunks(employees):
+                day_summaries = self.get_day_summaries(
+                    AttendanceDaySummary.objects.filter(
+                        employee__in=chunk, date__range=[start_date, end_date]
+                    ).only('employee_id', 'date', 'first_punch', 'last_punch')
                 )
                 
-                if day_logs.exists():
-                    first_punch = day_logs.first().timestamp
-                    last_punch = day_logs.last().timestamp
-                    work_hours = self.calculate_work_hours(first_punch, last_punch, None)
+                for employee in chunk:
+                    # Initialize counters
+                    present_days = 0
+                    absent_days = 0
+                    leave_days = 0
+                    total_work_hours = 0.0
+                    total_overtime_hours = 0.0
                     
-                    if status_code == 'P':
-                        total_work_hours += work_hours
-                
-                if status_code == 'P':
-                    present_days += 1
-                elif status_code == 'A':
-                    absent_days += 1
-                elif status_code == 'L':
-                    leave_days += 1
-                elif status_code == 'HD':
-                    present_days += 0.5
-                    total_work_hours += work_hours
-                
-                current_date += timedelta(days=1)
-            
-            # Calculate salary components
-            basic_salary = employee.basic_salary or Decimal('0.00')
-            
-            # Allowances
-            house_rent = employee.house_rent_allowance or Decimal('0.00')
-            medical = employee.medical_allowance or Decimal('0.00')
-            conveyance = employee.conveyance_allowance or Decimal('0.00')
-            food = employee.food_allowance or Decimal('0.00')
-            attendance_bonus = employee.attendance_bonus or Decimal('0.00')
-            festival_bonus = employee.festival_bonus or Decimal('0.00')
-            
-            total_allowance = house_rent + medical + conveyance + food + attendance_bonus + festival_bonus
-            
-            # Deductions
-            provident_fund = employee.provident_fund or Decimal('0.00')
-            tax = employee.tax_deduction or Decimal('0.00')
-            loan = employee.loan_deduction or Decimal('0.00')
-            
-            total_deduction = provident_fund + tax + loan
-            
-            # Calculate overtime pay
-            overtime_rate = employee.get_overtime_rate()
-            overtime_pay = Decimal(str(total_overtime_hours)) * Decimal(str(overtime_rate))
-            
-            # Calculate hourly wage
-            per_hour_rate = employee.get_per_hour_rate()
-            hourly_wage = Decimal(str(total_work_hours)) * Decimal(str(per_hour_rate))
-            
-            # Gross pay = Basic + Allowances + Overtime Pay
-            gross_pay = basic_salary + total_allowance + overtime_pay
-            
-            # Net pay = Gross - Deductions
-            net_pay = gross_pay - total_deduction
-            
-            writer.writerow([
-                employee.employee_id,
-                employee.name,
-                employee.department.name if employee.department else 'N/A',
-                employee.designation.name if employee.designation else 'N/A',
-                round(present_days, 1),
-                absent_days,
-                leave_days,
-                round(total_work_hours, 2),
-                round(total_overtime_hours, 2),
-                float(basic_salary),
-                float(total_allowance),
-                float(overtime_pay),
-                float(hourly_wage),
-                float(gross_pay),
-                float(total_deduction),
-                float(net_pay),
-            ])
-        
-        return response
\ No newline at end of file
+                    # Process each day; without a configuration only the
+                    # first and last punch of a day matter
+                    current_date = start_date
+                    while current_date <= end_date:
+                        day_summary = day_summaries.get((employee.id, current_date))
+                        punches = [day_summary.first_punch, day_summary.last_punch] if day_summary else []
+                        
+                        status_code, _ = self.determine_day_status(
+                            current_date, punches, None,
+                            holiday_name=calendar.holiday_name(current_date),
+                            leave_type=calendar.leave_type(employee.id, current_date),
+                        )
+                        
+                        if punches:
+                            work_hours = self.calculate_work_hours(punches[0], punches[-1], None)
+                            
+                            if status_code == 'P':
+                                total_work_hours += work_hours
+                        
+                        if status_code == 'P':
+                            present_days += 1
+                        elif status_code == 'A':
+                            absent_days += 1
+                        elif status_code == 'L':
+                            leave_days += 1
+                        elif status_code == 'HD':
+                            present_days += 0.5
+                            total_work_hours += work_hours
+                        
+                        current_date += timedelta(days=1)
+                    
+                    # Calculate salary components
+                    basic_salary = employee.basic_salary or Decimal('0.00')
+                    
+                    # Allowances
+                    house_rent = employee.house_rent_allowance or Decimal('0.00')
+                    medical = employee.medical_allowance or Decimal('0.00')
+                    conveyance = employee.conveyance_allowance or Decimal('0.00')
+                    food = employee.food_allowance or Decimal('0.00')
+                    attendance_bonus = employee.attendance_bonus or Decimal('0.00')
+                    festival_bonus = employee.festival_bonus or Decimal('0.00')
+                    
+                    total_allowance = house_rent + medical + conveyance + food + attendance_bonus + festival_bonus
+                    
+                    # Deductions
+                    provident_fund = employee.provident_fund or Decimal('0.00')
+                    tax = employee.tax_deduction or Decimal('0.00')
+                    loan = employee.loan_deduction or Decimal('0.00')
+                    
+                    total_deduction = provident_fund + tax + loan
+                    
+                    # Calculate overtime pay
+                    overtime_rate = employee.get_overtime_rate()
+                    overtime_pay = Decimal(str(total_overtime_hours)) * Decimal(str(overtime_rate))
+                    
+                    # Calculate hourly wage
+                    per_hour_rate = employee.get_per_hour_rate()
+                    hourly_wage = Decimal(str(total_work_hours)) * Decimal(str(per_hour_rate))
+                    
+                    # Gross pay = Basic + Allowances + Overtime Pay
+                    gross_pay = basic_salary + total_allowance + overtime_pay
+                    
+                    # Net pay = Gross - Deductions
+                    net_pay = gross_pay - total_deduction
+                    
+                    yield [
+                        employee.employee_id,
+                        employee.name,
+                        employee.department.name if employee.department else 'N/A',
+                        employee.designation.name if employee.designation else 'N/A',
+                        round(present_days, 1),
+                        absent_days,
+                        leave_days,
+                        round(total_work_hours, 2),
+                        round(total_overtime_hours, 2),
+                        float(basic_salary),
+                        float(total_allowance),
+                        float(overtime_pay),
+                        float(hourly_wage),
+                        float(gross_pay),
+                        float(total_deduction),
+                        float(net_pay),
+                    ]
+        
+        return f'payroll_summary_{start_date}_{end_date}', header, rows()
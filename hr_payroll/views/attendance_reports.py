@@ -14,6 +14,7 @@ from ..models import (
     Attendance, Employee, Department, LeaveApplication, 
     Shift, Holiday, AttendanceLog, Company
 )
+from ..report_cache import get_cached_report
 
 logger = logging.getLogger(__name__)
 
@@ -27,27 +28,8 @@ def get_company_from_request(request):
         return None
 
 # ==================== Report 1: Daily Attendance Report ====================
-@login_required
-def daily_attendance_report(request):
-    """
-    Simplified Daily Attendance Report without company filter
-    Allows selecting date, department, or employee
-    """
-    # Get company
-    company = get_company_from_request(request)
-    
-    # Get parameters from request
-    report_date_str = request.GET.get('date', timezone.now().date().strftime('%Y-%m-%d'))
-    department_id = request.GET.get('department', '')
-    employee_id = request.GET.get('employee', '')
-    selected_status = request.GET.get('status', '')
-
-    # Parse date
-    try:
-        report_date = datetime.strptime(report_date_str, '%Y-%m-%d').date()
-    except ValueError:
-        report_date = timezone.now().date()
-
+def _build_daily_attendance_report(report_date, department_id, employee_id, selected_status):
+    """Rows and totals of the daily attendance report"""
     # Base queryset for employees
     employees_filter = Q(is_active=True)
     if department_id:
@@ -137,7 +119,39 @@ def daily_attendance_report(request):
         'total_work_hours': round(total_work_hours, 2),
         'total_overtime_hours': round(total_overtime_hours, 2),
     }
+    
+    return {'report_data': report_data, 'summary': summary}
 
+
+@login_required
+def daily_attendance_report(request):
+    """
+    Simplified Daily Attendance Report without company filter
+    Allows selecting date, department, or employee
+    """
+    # Get company
+    company = get_company_from_request(request)
+    
+    # Get parameters from request
+    report_date_str = request.GET.get('date', timezone.now().date().strftime('%Y-%m-%d'))
+    department_id = request.GET.get('department', '')
+    employee_id = request.GET.get('employee', '')
+    selected_status = request.GET.get('status', '')
+
+    # Parse date
+    try:
+        report_date = datetime.strptime(report_date_str, '%Y-%m-%d').date()
+    except ValueError:
+        report_date = timezone.now().date()
+
+    report = get_cached_report(
+        'daily_attendance', company,
+        lambda: _build_daily_attendance_report(report_date, department_id, employee_id, selected_status),
+        date=report_date, department_id=department_id, employee_id=employee_id, status=selected_status,
+    )
+    report_data = report['report_data']
+    summary = report['summary']
+    
     # Get departments and employees for filtering
     departments = Department.objects.all().order_by('name')
     employees = Employee.objects.filter(is_active=True).order_by('name')
@@ -157,38 +171,8 @@ def daily_attendance_report(request):
 
     return render(request, 'zkteco/reports/daily_attendance.html', context)
 
-@login_required
-def monthly_attendance_summary(request):
-    """
-    Monthly Attendance Summary Report
-    মাসিক অ্যাটেনডেন্স পার্সেন্টেজ, প্রেজেন্ট/অ্যাবসেন্ট/লিভ ডেজ, টোটাল ওয়ার্ক আওয়ারস
-    সব ডেটা Attendance রেকর্ড থেকে সরাসরি আসবে
-    """
-    company = get_company_from_request(request)
-    if not company:
-        return render(request, 'zkteco/reports/monthly_summary.html', {
-            'error_message': 'No company access found'
-        })
-    
-    # Get parameters
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    department_id = request.GET.get('department', '')
-    
-    # Default to current month if not provided
-    if not start_date or not end_date:
-        today = timezone.now().date()
-        start_date = today.replace(day=1)
-        end_date = today
-    else:
-        try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-        except (ValueError, TypeError):
-            today = timezone.now().date()
-            start_date = today.replace(day=1)
-            end_date = today
-    
+def _build_monthly_attendance_summary(company, start_date, end_date, department_id):
+    """Rows and totals of the monthly attendance summary"""
     # Base queryset for employees
     employees_filter = Q(company=company, is_active=True)
     if department_id:
@@ -298,6 +282,49 @@ def monthly_attendance_summary(request):
         'avg_attendance_percentage': round(sum([emp['attendance_percentage'] for emp in report_data]) / max(len(report_data), 1), 1),
     }
     
+    return {'report_data': report_data, 'summary': summary}
+
+
+@login_required
+def monthly_attendance_summary(request):
+    """
+    Monthly Attendance Summary Report
+    মাসিক অ্যাটেনডেন্স পার্সেন্টেজ, প্রেজেন্ট/অ্যাবসেন্ট/লিভ ডেজ, টোটাল ওয়ার্ক আওয়ারস
+    সব ডেটা Attendance রেকর্ড থেকে সরাসরি আসবে
+    """
+    company = get_company_from_request(request)
+    if not company:
+        return render(request, 'zkteco/reports/monthly_summary.html', {
+            'error_message': 'No company access found'
+        })
+    
+    # Get parameters
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+    department_id = request.GET.get('department', '')
+    
+    # Default to current month if not provided
+    if not start_date or not end_date:
+        today = timezone.now().date()
+        start_date = today.replace(day=1)
+        end_date = today
+    else:
+        try:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+        except (ValueError, TypeError):
+            today = timezone.now().date()
+            start_date = today.replace(day=1)
+            end_date = today
+    
+    report = get_cached_report(
+        'monthly_attendance_summary', company,
+        lambda: _build_monthly_attendance_summary(company, start_date, end_date, department_id),
+        start_date=start_date, end_date=end_date, department_id=department_id,
+    )
+    report_data = report['report_data']
+    summary = report['summary']
+    
     # Get departments for filtering
     departments = Department.objects.filter(company=company).order_by('name')
     
@@ -320,6 +347,129 @@ def reports_dashboard(request):
     """Main reports dashboard - only report grid"""
     return render(request, 'zkteco/reports/dashboard.html')
 
+def _build_employee_monthly_attendance(employee, year_int, month_int):
+    """Daily rows and totals of an employee's monthly attendance"""
+    # Get first and last day of month
+    first_day = datetime(year_int, month_int, 1).date()
+    last_day_num = calendar.monthrange(year_int, month_int)[1]
+    last_day = datetime(year_int, month_int, last_day_num).date()
+    
+    # Get attendance records for the month
+    attendance_records = Attendance.objects.filter(
+        employee=employee,
+        date__range=[first_day, last_day]
+    ).select_related('shift').order_by('date')
+    
+    # Create attendance lookup dictionary
+    attendance_dict = {record.date: record for record in attendance_records}
+    
+    # Generate daily report data
+    report_data = []
+    total_present = 0
+    total_absent = 0
+    total_leave = 0
+    total_holiday = 0
+    total_weekly_off = 0
+    total_work_hours = Decimal('0.00')
+    total_overtime_hours = Decimal('0.00')
+    
+    current_date = first_day
+    while current_date <= last_day:
+        attendance = attendance_dict.get(current_date)
+        
+        if attendance:
+            status = attendance.get_status_display()
+            status_code = attendance.status
+            check_in = attendance.check_in_time.strftime('%I:%M %p') if attendance.check_in_time else '-'
+            check_out = attendance.check_out_time.strftime('%I:%M %p') if attendance.check_out_time else '-'
+            work_hours = Decimal(str(attendance.work_hours))
+            overtime_hours = attendance.overtime_hours or Decimal('0.00')
+            shift_name = attendance.shift.name if attendance.shift else (employee.default_shift.name if employee.default_shift else '-')
+            
+            # Count statuses
+            if status_code == 'P':
+                total_present += 1
+                total_work_hours += work_hours
+                total_overtime_hours += overtime_hours
+            elif status_code == 'A':
+                total_absent += 1
+            elif status_code == 'L':
+                total_leave += 1
+            elif status_code == 'H':
+                total_holiday += 1
+            elif status_code == 'W':
+                total_weekly_off += 1
+        else:
+            # No record - mark as absent
+            status = 'Absent'
+            status_code = 'A'
+            check_in = '-'
+            check_out = '-'
+            work_hours = Decimal('0.00')
+            overtime_hours = Decimal('0.00')
+            shift_name = employee.default_shift.name if employee.default_shift else '-'
+            total_absent += 1
+        
+        # Day name in Bangla
+        day_names = ['সোমবার', 'মঙ্গলবার', 'বুধবার', 'বৃহস্পতিবার', 'শুক্রবার', 'শনিবার', 'রবিবার']
+        day_name = day_names[current_date.weekday()]
+        
+        report_data.append({
+            'date': current_date,
+            'day_name': day_name,
+            'shift': shift_name,
+            'check_in': check_in,
+            'check_out': check_out,
+            'status': status,
+            'status_code': status_code,
+            'work_hours': work_hours,
+            'overtime_hours': overtime_hours,
+        })
+        
+        current_date += timedelta(days=1)
+    
+    # Calculate summary
+    total_days = len(report_data)
+    working_days = total_days - total_holiday - total_weekly_off
+    attendance_percentage = (total_present / working_days * 100) if working_days > 0 else 0
+    
+    # Calculate per hour rate
+    per_hour_rate = employee.per_hour_rate or Decimal('0.00')
+    if not per_hour_rate and employee.expected_working_hours and employee.basic_salary:
+        per_hour_rate = employee.basic_salary / (Decimal('22') * Decimal(str(employee.expected_working_hours)))
+    
+    # Calculate hourly pay
+    hourly_pay = total_work_hours * per_hour_rate
+    
+    # Calculate overtime rate
+    overtime_rate = employee.overtime_rate or Decimal('0.00')
+    if not overtime_rate and per_hour_rate:
+        overtime_rate = per_hour_rate * Decimal('1.5')
+    
+    # Calculate overtime pay
+    overtime_pay = total_overtime_hours * overtime_rate
+    
+    summary = {
+        'total_days': total_days,
+        'working_days': working_days,
+        'present_days': total_present,
+        'absent_days': total_absent,
+        'leave_days': total_leave,
+        'holiday_days': total_holiday,
+        'weekly_off_days': total_weekly_off,
+        'attendance_percentage': round(attendance_percentage, 1),
+        'total_work_hours': total_work_hours,
+        'total_overtime_hours': total_overtime_hours,
+        'per_hour_rate': per_hour_rate,
+        'hourly_pay': hourly_pay,
+        'overtime_rate': overtime_rate,
+        'overtime_pay': overtime_pay,
+        'total_earnings': hourly_pay + overtime_pay,
+    }
+    
+    return {'report_data': report_data, 'summary': summary}
+
+
 @login_required
 def employee_monthly_attendance(request):
     """
@@ -379,123 +529,13 @@ def employee_monthly_attendance(request):
             month_int = int(month)
             year_int = int(year)
             
-            # Get first and last day of month
-            first_day = datetime(year_int, month_int, 1).date()
-            last_day_num = calendar.monthrange(year_int, month_int)[1]
-            last_day = datetime(year_int, month_int, last_day_num).date()
-            
-            # Get attendance records for the month
-            attendance_records = Attendance.objects.filter(
-                employee=employee,
-                date__range=[first_day, last_day]
-            ).select_related('shift').order_by('date')
-            
-            # Create attendance lookup dictionary
-            attendance_dict = {record.date: record for record in attendance_records}
-            
-            # Generate daily report data
-            report_data = []
-            total_present = 0
-            total_absent = 0
-            total_leave = 0
-            total_holiday = 0
-            total_weekly_off = 0
-            total_work_hours = Decimal('0.00')
-            total_overtime_hours = Decimal('0.00')
-            
-            current_date = first_day
-            while current_date <= last_day:
-                attendance = attendance_dict.get(current_date)
-                
-                if attendance:
-                    status = attendance.get_status_display()
-                    status_code = attendance.status
-                    check_in = attendance.check_in_time.strftime('%I:%M %p') if attendance.check_in_time else '-'
-                    check_out = attendance.check_out_time.strftime('%I:%M %p') if attendance.check_out_time else '-'
-                    work_hours = Decimal(str(attendance.work_hours))
-                    overtime_hours = attendance.overtime_hours or Decimal('0.00')
-                    shift_name = attendance.shift.name if attendance.shift else (employee.default_shift.name if employee.default_shift else '-')
-                    
-                    # Count statuses
-                    if status_code == 'P':
-                        total_present += 1
-                        total_work_hours += work_hours
-                        total_overtime_hours += overtime_hours
-                    elif status_code == 'A':
-                        total_absent += 1
-                    elif status_code == 'L':
-                        total_leave += 1
-                    elif status_code == 'H':
-                        total_holiday += 1
-                    elif status_code == 'W':
-                        total_weekly_off += 1
-                else:
-                    # No record - mark as absent
-                    status = 'Absent'
-                    status_code = 'A'
-                    check_in = '-'
-                    check_out = '-'
-                    work_hours = Decimal('0.00')
-                    overtime_hours = Decimal('0.00')
-                    shift_name = employee.default_shift.name if employee.default_shift else '-'
-                    total_absent += 1
-                
-                # Day name in Bangla
-                day_names = ['সোমবার', 'মঙ্গলবার', 'বুধবার', 'বৃহস্পতিবার', 'শুক্রবার', 'শনিবার', 'রবিবার']
-                day_name = day_names[current_date.weekday()]
-                
-                report_data.append({
-                    'date': current_date,
-                    'day_name': day_name,
-                    'shift': shift_name,
-                    'check_in': check_in,
-                    'check_out': check_out,
-                    'status': status,
-                    'status_code': status_code,
-                    'work_hours': work_hours,
-                    'overtime_hours': overtime_hours,
-                })
-                
-                current_date += timedelta(days=1)
-            
-            # Calculate summary
-            total_days = len(report_data)
-            working_days = total_days - total_holiday - total_weekly_off
-            attendance_percentage = (total_present / working_days * 100) if working_days > 0 else 0
-            
-            # Calculate per hour rate
-            per_hour_rate = employee.per_hour_rate or Decimal('0.00')
-            if not per_hour_rate and employee.expected_working_hours and employee.basic_salary:
-                per_hour_rate = employee.basic_salary / (Decimal('22') * Decimal(str(employee.expected_working_hours)))
-            
-            # Calculate hourly pay
-            hourly_pay = total_work_hours * per_hour_rate
-            
-            # Calculate overtime rate
-            overtime_rate = employee.overtime_rate or Decimal('0.00')
-            if not overtime_rate and per_hour_rate:
-                overtime_rate = per_hour_rate * Decimal('1.5')
-            
-            # Calculate overtime pay
-            overtime_pay = total_overtime_hours * overtime_rate
-            
-            summary = {
-                'total_days': total_days,
-                'working_days': working_days,
-                'present_days': total_present,
-                'absent_days': total_absent,
-                'leave_days': total_leave,
-                'holiday_days': total_holiday,
-                'weekly_off_days': total_weekly_off,
-                'attendance_percentage': round(attendance_percentage, 1),
-                'total_work_hours': total_work_hours,
-                'total_overtime_hours': total_overtime_hours,
-                'per_hour_rate': per_hour_rate,
-                'hourly_pay': hourly_pay,
-                'overtime_rate': overtime_rate,
-                'overtime_pay': overtime_pay,
-                'total_earnings': hourly_pay + overtime_pay,
-            }
+            report = get_cached_report(
+                'employee_monthly_attendance', company,
+                lambda: _build_employee_monthly_attendance(employee, year_int, month_int),
+                employee_id=employee.id, year=year_int, month=month_int,
+            )
+            report_data = report['report_data']
+            summary = report['summary']
             
             context['employee_info'] = employee
             context['report_data'] = report_data
@@ -508,46 +548,8 @@ def employee_monthly_attendance(request):
     return render(request, 'zkteco/reports/employee_monthly_attendance.html', context)
 
 
-@login_required
-def payroll_summary_report(request):
-    """
-    Payroll Summary Report generated from Attendance, Employee, Holiday, Leave models
-    """
-    company = get_company_from_request(request)
-    
-    # Get parameters from request
-    month = request.GET.get('month', '')
-    year = request.GET.get('year', '')
-    department_id = request.GET.get('department', '')
-    
-    # Default to current month/year if not provided
-    today = datetime.now().date()
-    if not month:
-        month = str(today.month)
-    if not year:
-        year = str(today.year)
-    
-    # Calculate date range for the month
-    try:
-        month_int = int(month)
-        year_int = int(year)
-        
-        # Get first and last day of month
-        first_day = datetime(year_int, month_int, 1).date()
-        last_day_num = calendar.monthrange(year_int, month_int)[1]
-        last_day = datetime(year_int, month_int, last_day_num).date()
-        
-        total_days_in_month = (last_day - first_day).days + 1
-        
-    except (ValueError, TypeError):
-        # Fallback to current month
-        today = timezone.now().date()
-        first_day = today.replace(day=1)
-        last_day = today
-        month_int = today.month
-        year_int = today.year
-        total_days_in_month = calendar.monthrange(year_int, month_int)[1]
-    
+def _build_payroll_summary_report(first_day, last_day, department_id, total_days_in_month):
+    """Rows and totals of the payroll summary report"""
     # Base queryset for employees
     employees_filter = Q(is_active=True)
     if department_id:
@@ -688,6 +690,57 @@ def payroll_summary_report(request):
         'total_days_in_month': total_days_in_month,
     }
     
+    return {'payroll_data': payroll_data, 'summary': summary}
+
+
+@login_required
+def payroll_summary_report(request):
+    """
+    Payroll Summary Report generated from Attendance, Employee, Holiday, Leave models
+    """
+    company = get_company_from_request(request)
+    
+    # Get parameters from request
+    month = request.GET.get('month', '')
+    year = request.GET.get('year', '')
+    department_id = request.GET.get('department', '')
+    
+    # Default to current month/year if not provided
+    today = datetime.now().date()
+    if not month:
+        month = str(today.month)
+    if not year:
+        year = str(today.year)
+    
+    # Calculate date range for the month
+    try:
+        month_int = int(month)
+        year_int = int(year)
+        
+        # Get first and last day of month
+        first_day = datetime(year_int, month_int, 1).date()
+        last_day_num = calendar.monthrange(year_int, month_int)[1]
+        last_day = datetime(year_int, month_int, last_day_num).date()
+        
+        total_days_in_month = (last_day - first_day).days + 1
+        
+    except (ValueError, TypeError):
+        # Fallback to current month
+        today = timezone.now().date()
+        first_day = today.replace(day=1)
+        last_day = today
+        month_int = today.month
+        year_int = today.year
+        total_days_in_month = calendar.monthrange(year_int, month_int)[1]
+    
+    report = get_cached_report(
+        'payroll_summary', company,
+        lambda: _build_payroll_summary_report(first_day, last_day, department_id, total_days_in_month),
+        start_date=first_day, end_date=last_day, department_id=department_id,
+    )
+    payroll_data = report['payroll_data']
+    summary = report['summary']
+    
     # Get departments for filtering
     departments = Department.objects.all().order_by('name')
     
@@ -28,13 +28,19 @@ from decimal import Decimal
 
 from ..models import ZkDevice, AttendanceLog, Employee, Attendance, Shift, Department, Designation, Holiday, LeaveApplication,LeaveBalance
 from ..zkteco_device_manager import ZKTecoDeviceManager
+from ..zkteco_pool import device_pool
+from ..zkteco_sync import map_device_users
+from ..employee_import import import_device_users
+from ..device_fetch_staging import (
+    discard_fetch, get_fetch, iter_staged_chunks, remember_fetch, stage_records,
+)
 from core.models import Company
 from ..forms import ZkDeviceForm
 
 logger = logging.getLogger(__name__)
 
 # Initialize device manager
-device_manager = ZKTecoDeviceManager()
+device_manager = ZKTecoDeviceManager(pool=device_pool)
 
 class CompanyAccessMixin:
     """Mixin to provide company access in class-based views"""
@@ -444,12 +450,10 @@ class FetchUsersDataView(LoginRequiredMixin, PermissionRequiredMixin, CompanyAcc
             all_users, results = device_manager.get_multiple_users_data(device_list)
             
             # Format users data for response and check duplicates
+            existing_employees = map_device_users(self.company, (user['user_id'] for user in all_users))
             formatted_users = []
             for user in all_users:
-                existing_employee = Employee.objects.filter(
-                    Q(zkteco_id=user['user_id']) | Q(employee_id=user['user_id']),
-                    company=self.company
-                ).first()
+                existing_employee = existing_employees.get(user['user_id'])
                 
                 formatted_users.append({
                     'user_id': user['user_id'],
@@ -457,26 +461,33 @@ class FetchUsersDataView(LoginRequiredMixin, PermissionRequiredMixin, CompanyAcc
                     'privilege': user.get('privilege', 0),
                     'device_ip': user['device_ip'],
                     'device_name': user['device_name'],
-                    'existing_employee': existing_employee.name if existing_employee else None,
-                    'existing_employee_id': existing_employee.employee_id if existing_employee else None,
+                    'existing_employee': existing_employee['name'] if existing_employee else None,
+                    'existing_employee_id': existing_employee['employee_id'] if existing_employee else None,
                     'is_existing': bool(existing_employee),
                     'can_import': not bool(existing_employee)
                 })
             
-            # Store in session for import
-            request.session['fetched_users_data'] = [
-                {
-                    'user_id': user['user_id'],
-                    'name': user['name'],
-                    'privilege': user.get('privilege', 0),
-                    'device_ip': user['device_ip'],
-                    'device_name': user['device_name']
-                }
-                for user in formatted_users if user['can_import']
-            ]
+            # Stage the importable users server-side; the session keeps only the token
+            fetch = stage_records(
+                'users',
+                [
+                    {
+                        'user_id': user['user_id'],
+                        'name': user['name'],
+                        'privilege': user.get('privilege', 0),
+                        'device_ip': user['device_ip'],
+                        'device_name': user['device_name']
+                    }
+                    for user in formatted_users if user['can_import']
+                ],
+                company=self.company,
+                user=request.user,
+            )
+            remember_fetch(request.session, 'fetched_users_token', fetch)
             
             return JsonResponse({
                 'success': True,
+                'fetch_token': str(fetch.token),
                 'users_data': formatted_users,
                 'results': results,
                 'total_users': len(all_users),
@@ -504,9 +515,10 @@ class ImportUsersDataView(LoginRequiredMixin, PermissionRequiredMixin, CompanyAc
             selected_indices = data.get('selected_indices', [])
             import_all = data.get('import_all', False)
             
-            fetched_data = request.session.get('fetched_users_data', [])
+            token = data.get('fetch_token') or request.session.get('fetched_users_token')
+            fetch = get_fetch(token, 'users', company=self.company, user=request.user)
             
-            if not fetched_data:
+            if not fetch or not fetch.record_count:
                 return JsonResponse({'success': False, 'error': 'No data to import. Please fetch data first.'})
             
             # Get default department and designation
@@ -519,58 +531,31 @@ class ImportUsersDataView(LoginRequiredMixin, PermissionRequiredMixin, CompanyAc
             if not default_designation:
                 return JsonResponse({'success': False, 'error': 'No designation found. Please create at least one designation first.'})
             
-            if import_all:
-                users_to_import = fetched_data
-            else:
-                if not selected_indices:
-                    return JsonResponse({'success': False, 'error': 'No users selected for import'})
-                users_to_import = [fetched_data[i] for i in selected_indices if i < len(fetched_data)]
-            
-            imported_count = 0
-            duplicate_count = 0
-            error_count = 0
-            
-            with transaction.atomic():
-                for user in users_to_import:
-                    try:
-                        # Check for duplicates again
-                        existing = Employee.objects.filter(
-                            Q(zkteco_id=user['user_id']) | Q(employee_id=user['user_id']),
-                            company=self.company
-                        ).exists()
-                        
-                        if existing:
-                            duplicate_count += 1
-                            continue
-                        
-                        # Create employee
-                        Employee.objects.create(
-                            company=self.company,
-                            department=default_dept,
-                            designation=default_designation,
-                            employee_id=user['user_id'],
-                            zkteco_id=user['user_id'],
-                            name=user['name'] or f"User_{user['user_id']}",
-                            expected_working_hours=8.00,
-                            overtime_grace_minutes=15,
-                            is_active=True
-                        )
-                        
-                        imported_count += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Error importing user {user}: {str(e)}")
-                        error_count += 1
+            if not import_all and not selected_indices:
+                return JsonResponse({'success': False, 'error': 'No users selected for import'})
+            
+            users_to_import = (
+                user
+                for chunk in iter_staged_chunks(fetch, None if import_all else selected_indices)
+                for user in chunk
+            )
+            result = import_device_users(
+                self.company, users_to_import, department=default_dept, designation=default_designation
+            )
+            imported_count = result['imported']
+            duplicate_count = result['duplicates']
+            error_count = result['errors']
             
-            # Clear session data after successful import
-            if 'fetched_users_data' in request.session:
-                del request.session['fetched_users_data']
+            # Drop the staged data after a successful import
+            discard_fetch(fetch)
+            request.session.pop('fetched_users_token', None)
             
             return JsonResponse({
                 'success': True,
                 'imported_count': imported_count,
                 'duplicate_count': duplicate_count,
                 'error_count': error_count,
+                'errors': result['row_errors'][:100],
                 'message': f'Import completed: {imported_count} imported, {duplicate_count} duplicates skipped, {error_count} errors.'
             })
             
@@ -600,7 +585,9 @@ class ClearDeviceDataView(LoginRequiredMixin, PermissionRequiredMixin, CompanyAc
             
             for device in devices:
                 try:
-                    success, message = device_manager.clear_attendance_data(device.ip_address)
+                    success, message = device_manager.clear_attendance_data(
+                        device.ip_address, device.port, device.password or 0
+                    )
                     results.append({
                         'device_name': device.name,
                         'success': success,
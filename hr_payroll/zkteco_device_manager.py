@@ -2,9 +2,12 @@
 import logging
 from datetime import datetime, date, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
 import threading
 import time
 
+from django.conf import settings
+
 logger = logging.getLogger(__name__)
 
 try:
@@ -15,31 +18,103 @@ except ImportError:
     ZK_AVAILABLE = False
     logger.warning("ZK library not available. Please install it with 'pip install pyzk'")
 
+# TCP/UDP and ping combinations tried when connecting, in default order
+CONNECTION_METHODS = [
+    {'force_udp': False, 'ommit_ping': False},
+    {'force_udp': True, 'ommit_ping': False},
+    {'force_udp': False, 'ommit_ping': True},
+    {'force_udp': True, 'ommit_ping': True},
+]
+
+# Probe tiers, cheapest first: ping only checks the device answers, status
+# reads the user/record counters from its memory info, full downloads every
+# user and punch to report counts and the latest attendance
+PROBE_PING = 'ping'
+PROBE_STATUS = 'status'
+PROBE_FULL = 'full'
+PROBE_TIERS = (PROBE_PING, PROBE_STATUS, PROBE_FULL)
+
+# Connect timeout (seconds) for connection tests; a live device answers in well under this
+ZKTECO_PROBE_TIMEOUT = getattr(settings, 'ZKTECO_PROBE_TIMEOUT', 5)
+
+# Devices probed at once by test_multiple_connections
+ZKTECO_PROBE_WORKERS = getattr(settings, 'ZKTECO_PROBE_WORKERS', 20)
+
+
+def ordered_methods(preferred_method=None):
+    """Connection methods with the one known to work for a device first"""
+    if preferred_method not in CONNECTION_METHODS:
+        return list(CONNECTION_METHODS)
+    return [preferred_method] + [m for m in CONNECTION_METHODS if m != preferred_method]
+
+
+def open_connection(device_ip, device_port=4370, password=0, timeout=30, preferred_method=None):
+    """Connect with the first working method and return (connection, method)"""
+    last_error = None
+    for method in ordered_methods(preferred_method):
+        try:
+            conn = ZK(
+                device_ip,
+                port=device_port,
+                timeout=timeout,
+                password=password,
+                force_udp=method['force_udp'],
+                ommit_ping=method['ommit_ping']
+            ).connect()
+            if conn:
+                return conn, method
+        except Exception as e:
+            last_error = str(e)
+    raise ConnectionError(last_error or f"Could not connect to {device_ip}")
+
+
 class ZKTecoDeviceManager:
     """
     ZKTeco device manager for handling multiple devices
     with connection testing, data fetching, and attendance management
     NO USER DEPENDENCY - only handles device connections and data
+    
+    With a DeviceConnectionPool, connections are borrowed from the pool and
+    shared with other managers instead of being owned by this instance.
     """
     
-    def __init__(self):
+    def __init__(self, pool=None):
         self.connections = {}
         self.connection_status = {}
         self.connection_lock = threading.Lock()
+        self.pool = pool
         
-    def connect_device(self, device_ip, device_port=4370, password=0, timeout=30):
-        """Connect to a single ZKTeco device with enhanced error handling"""
+    def preferred_method(self, device_ip, device_port=4370):
+        """Connection method that last worked for the device, if known"""
+        if self.pool:
+            return self.pool.preferred_method(device_ip, device_port)
+        return self.connection_status.get(device_ip, {}).get('connection_method')
+    
+    @contextmanager
+    def device_connection(self, device_ip, device_port=4370, password=0):
+        """Live connection to a device, from the pool when there is one"""
+        if self.pool:
+            with self.pool.connection(device_ip, device_port, password) as conn:
+                yield conn
+        else:
+            yield self._ensure_connection(device_ip, device_port, password)
+    
+    def device_lock(self, device_ip, device_port=4370, password=0):
+        """Exclusive use of a pooled device across several operations"""
+        if self.pool:
+            return self.pool.lock(device_ip, device_port, password)
+        return nullcontext()
+        
+    def connect_device(self, device_ip, device_port=4370, password=0, timeout=30, tier=PROBE_PING):
+        """Connect to a single ZKTeco device and probe it at the given tier"""
         try:
             if not ZK_AVAILABLE:
                 return False, "ZK library not available. Please install pyzk."
+            if tier not in PROBE_TIERS:
+                return False, f"Unknown probe tier: {tier}"
             
-            # Try multiple connection methods
-            connection_methods = [
-                {'force_udp': False, 'ommit_ping': False},
-                {'force_udp': True, 'ommit_ping': False},
-                {'force_udp': False, 'ommit_ping': True},
-                {'force_udp': True, 'ommit_ping': True},
-            ]
+            # Try multiple connection methods, the last working one first
+            connection_methods = ordered_methods(self.preferred_method(device_ip, device_port))
             
             last_error = None
             
@@ -57,12 +132,16 @@ class ZKTecoDeviceManager:
                     conn = zk.connect()
                     
                     if conn:
-                        # Test connection by getting basic info
+                        # Test connection by probing the device
                         try:
-                            device_info = self._get_device_info(conn)
+                            device_info = self.probe_connection(conn, tier)
+                            
+                            if self.pool:
+                                self.pool.adopt(device_ip, device_port, password, conn, method)
                             
                             with self.connection_lock:
-                                self.connections[device_ip] = conn
+                                if not self.pool:
+                                    self.connections[device_ip] = conn
                                 self.connection_status[device_ip] = {
                                     'status': 'connected',
                                     'info': device_info,
@@ -98,6 +177,65 @@ class ZKTecoDeviceManager:
             logger.error(error_msg)
             return False, error_msg
     
+    def probe_connection(self, conn, tier=PROBE_PING):
+        """Device information from an open connection, as much as the tier asks for"""
+        if tier == PROBE_FULL:
+            return self._get_device_info(conn)
+        
+        # A device that does not answer get_time is not usable, so let this raise
+        device_info = {'time': conn.get_time()}
+        if tier == PROBE_PING:
+            return device_info
+        
+        conn.read_sizes()
+        device_info.update({
+            'user_count': conn.users,
+            'attendance_count': conn.records,
+            'fingerprint_count': getattr(conn, 'fingers', 0),
+            'user_capacity': getattr(conn, 'users_cap', 0),
+            'attendance_capacity': getattr(conn, 'rec_cap', 0),
+        })
+        try:
+            device_info['firmware_version'] = conn.get_firmware_version()
+        except Exception:
+            device_info['firmware_version'] = 'Unknown'
+        return device_info
+    
+    def probe_device(self, device_ip, device_port=4370, password=0, tier=PROBE_STATUS,
+                     timeout=ZKTECO_PROBE_TIMEOUT):
+        """
+        Probe a device, reusing a pooled connection when one is open.
+        
+        Returns (success, info) like connect_device.
+        """
+        if not ZK_AVAILABLE:
+            return False, "ZK library not available. Please install pyzk."
+        if tier not in PROBE_TIERS:
+            return False, f"Unknown probe tier: {tier}"
+        
+        if self.pool and self.pool.is_connected(device_ip, device_port, password):
+            try:
+                with self.device_connection(device_ip, device_port, password) as conn:
+                    device_info = self.probe_connection(conn, tier)
+                with self.connection_lock:
+                    self.connection_status[device_ip] = {
+                        'status': 'connected',
+                        'info': device_info,
+                        'last_connected': datetime.now(),
+                        'connection_method': self.preferred_method(device_ip, device_port)
+                    }
+                return True, device_info
+            except Exception as e:
+                # The pool dropped the connection; fall back to a fresh connect
+                logger.info(f"Probe over pooled connection to {device_ip} failed: {str(e)}")
+        
+        return self.connect_device(device_ip, device_port, password, timeout=timeout, tier=tier)
+    
+    def test_connection(self, device_ip, device_port=4370, password=0, tier=PROBE_PING,
+                        timeout=ZKTECO_PROBE_TIMEOUT):
+        """Check that a device answers; returns (success, info or error message)"""
+        return self.probe_device(device_ip, device_port, password, tier=tier, timeout=timeout)
+    
     def _get_device_info(self, conn):
         """Get comprehensive device information"""
         try:
@@ -161,7 +299,8 @@ class ZKTecoDeviceManager:
             logger.error(f"Error getting device info: {str(e)}")
             return {'error': str(e)}
     
-    def test_multiple_connections(self, device_list, max_workers=5):
+    def test_multiple_connections(self, device_list, max_workers=ZKTECO_PROBE_WORKERS, tier=PROBE_STATUS,
+                                  timeout=ZKTECO_PROBE_TIMEOUT):
         """Test connections to multiple devices concurrently"""
         if not ZK_AVAILABLE:
             return {device['ip']: {'success': False, 'error': 'ZK library not available'} for device in device_list}
@@ -173,10 +312,13 @@ class ZKTecoDeviceManager:
             device_port = device_data.get('port', 4370)
             password = device_data.get('password', 0)
             
-            success, info = self.connect_device(device_ip, device_port, password)
+            success, info = self.probe_device(device_ip, device_port, password, tier=tier, timeout=timeout)
             return device_ip, success, info
         
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if not device_list:
+            return results
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(device_list))) as executor:
             future_to_device = {
                 executor.submit(test_single_device, device): device 
                 for device in device_list
@@ -200,30 +342,14 @@ class ZKTecoDeviceManager:
         
         return results
     
-    def get_users_data(self, device_ip):
+    def get_users_data(self, device_ip, device_port=4370, password=0):
         """Fetch user data from a specific device"""
         try:
             if not ZK_AVAILABLE:
                 return False, "ZK library not available"
             
-            if device_ip not in self.connections:
-                success, error = self.connect_device(device_ip)
-                if not success:
-                    return False, f"Device not connected: {error}"
-            
-            conn = self.connections[device_ip]
-            
-            # Verify connection is still active
-            try:
-                conn.get_time()  # Simple test to verify connection
-            except:
-                # Reconnect if connection is lost
-                success, error = self.connect_device(device_ip)
-                if not success:
-                    return False, f"Failed to reconnect: {error}"
-                conn = self.connections[device_ip]
-            
-            users = conn.get_users()
+            with self.device_connection(device_ip, device_port, password) as conn:
+                users = conn.get_users()
             
             users_data = []
             for user in users:
@@ -260,13 +386,7 @@ class ZKTecoDeviceManager:
             device_port = device_data.get('port', 4370)
             password = device_data.get('password', 0)
             
-            # Ensure connection
-            if device_ip not in self.connections:
-                success, _ = self.connect_device(device_ip, device_port, password)
-                if not success:
-                    return device_ip, device_name, False, "Failed to connect"
-            
-            success, data = self.get_users_data(device_ip)
+            success, data = self.get_users_data(device_ip, device_port, password)
             
             if success:
                 # Add device name to each user record
@@ -306,32 +426,16 @@ class ZKTecoDeviceManager:
         
         return all_users_data, results
     
-    def get_attendance_data(self, device_ip, start_date=None, end_date=None, limit=None):
+    def get_attendance_data(self, device_ip, start_date=None, end_date=None, limit=None,
+                            device_port=4370, password=0):
         """Fetch attendance data from a specific device with enhanced filtering"""
         try:
             if not ZK_AVAILABLE:
                 return False, "ZK library not available"
             
-            if device_ip not in self.connections:
-                # Try to connect if not already connected
-                success, error = self.connect_device(device_ip)
-                if not success:
-                    return False, f"Failed to connect to device {device_ip}: {error}"
-            
-            conn = self.connections[device_ip]
-            
-            # Verify connection is still active
-            try:
-                conn.get_time()  # Simple test to verify connection
-            except:
-                # Reconnect if connection is lost
-                success, error = self.connect_device(device_ip)
-                if not success:
-                    return False, f"Failed to reconnect: {error}"
-                conn = self.connections[device_ip]
-            
             # Get all attendance records
-            attendances = conn.get_attendance()
+            with self.device_connection(device_ip, device_port, password) as conn:
+                attendances = conn.get_attendance()
             
             attendance_data = []
             for attendance in attendances:
@@ -368,6 +472,129 @@ class ZKTecoDeviceManager:
             logger.error(error_msg)
             return False, error_msg
     
+    def _ensure_connection(self, device_ip, device_port=4370, password=0):
+        """Return a live connection to the device, connecting or reconnecting as needed"""
+        if device_ip not in self.connections:
+            success, error = self.connect_device(device_ip, device_port, password)
+            if not success:
+                raise ConnectionError(f"Failed to connect to device {device_ip}: {error}")
+        
+        conn = self.connections[device_ip]
+        try:
+            conn.get_time()  # Simple test to verify connection
+        except Exception:
+            success, error = self.connect_device(device_ip, device_port, password)
+            if not success:
+                raise ConnectionError(f"Failed to reconnect: {error}")
+            conn = self.connections[device_ip]
+        return conn
+    
+    def get_record_count(self, device_ip, device_port=4370, password=0):
+        """Number of attendance records in the device buffer"""
+        try:
+            if not ZK_AVAILABLE:
+                return False, "ZK library not available"
+            
+            with self.device_connection(device_ip, device_port, password) as conn:
+                conn.read_sizes()
+                return True, conn.records
+            
+        except Exception as e:
+            error_msg = f"Error reading record count from {device_ip}: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+    
+    def get_new_attendance_data(self, device_ip, record_index=0, since=None, device_port=4370, password=0):
+        """
+        Fetch only the punches recorded after a previous sync.
+        
+        record_index is the number of buffer records already synced and
+        since the timestamp of the newest one. The record count is read
+        first and the buffer is not downloaded at all when it is unchanged.
+        Otherwise records older than since are always dropped, and the index
+        only skips the records before it once the record just below it
+        still carries since. A buffer cleared and refilled past the index
+        fails that check and is read in full; one refilled to exactly the
+        index is read by the first sync after its next punch.
+        """
+        try:
+            if not ZK_AVAILABLE:
+                return False, "ZK library not available"
+            
+            with self.device_connection(device_ip, device_port, password) as conn:
+                conn.read_sizes()
+                record_count = conn.records
+                
+                if record_count == record_index:
+                    return True, {'records': [], 'record_count': record_count, 'buffer_reset': False}
+                
+                attendances = conn.get_attendance()
+            record_count = len(attendances)
+            
+            new_attendances = attendances
+            buffer_reset = False
+            if record_index:
+                anchor = attendances[record_index - 1] if record_index <= record_count else None
+                if anchor is not None and since and anchor.timestamp == since:
+                    new_attendances = attendances[record_index:]
+                else:
+                    buffer_reset = True
+            if since:
+                new_attendances = [a for a in new_attendances if a.timestamp >= since]
+            
+            attendance_data = [
+                {
+                    'zkteco_id': str(attendance.user_id),
+                    'timestamp': attendance.timestamp,
+                    'source_type': 'device',
+                    'device_ip': device_ip,
+                    'punch_type': getattr(attendance, 'punch', 0),
+                    'verify_type': getattr(attendance, 'status', 0),
+                }
+                for attendance in new_attendances
+            ]
+            
+            logger.info(
+                f"Fetched {len(attendance_data)} new of {record_count} attendance records from {device_ip}"
+            )
+            return True, {
+                'records': attendance_data,
+                'record_count': record_count,
+                'buffer_reset': buffer_reset,
+            }
+            
+        except Exception as e:
+            error_msg = f"Error fetching new attendance from {device_ip}: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+    
+    def hold_device(self, device_ip, device_port=4370, password=0):
+        """Disable the device so no punches are recorded while its buffer is read and cleared"""
+        try:
+            if not ZK_AVAILABLE:
+                return False, "ZK library not available"
+            
+            with self.device_connection(device_ip, device_port, password) as conn:
+                conn.disable_device()
+            return True, "Device disabled"
+            
+        except Exception as e:
+            error_msg = f"Error disabling device {device_ip}: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+    
+    def release_device(self, device_ip, device_port=4370, password=0):
+        """Re-enable a device disabled with hold_device"""
+        try:
+            with self.device_connection(device_ip, device_port, password) as conn:
+                conn.enable_device()
+            return True, "Device enabled"
+            
+        except Exception as e:
+            error_msg = f"Error enabling device {device_ip}: {str(e)}"
+            logger.error(error_msg)
+            return False, error_msg
+    
     def get_multiple_attendance_data(self, device_list, start_date=None, end_date=None, max_workers=3):
         """Fetch attendance data from multiple devices concurrently"""
         if not ZK_AVAILABLE:
@@ -382,13 +609,9 @@ class ZKTecoDeviceManager:
             device_port = device_data.get('port', 4370)
             password = device_data.get('password', 0)
             
-            # Ensure connection
-            if device_ip not in self.connections:
-                success, _ = self.connect_device(device_ip, device_port, password)
-                if not success:
-                    return device_ip, device_name, False, "Failed to connect"
-            
-            success, data = self.get_attendance_data(device_ip, start_date, end_date)
+            success, data = self.get_attendance_data(
+                device_ip, start_date, end_date, device_port=device_port, password=password
+            )
             
             if success:
                 # Add device name to each record
@@ -467,19 +690,14 @@ class ZKTecoDeviceManager:
                 return self.connection_status.get(device_ip, {'status': 'unknown'})
             return self.connection_status.copy()
     
-    def clear_attendance_data(self, device_ip):
+    def clear_attendance_data(self, device_ip, device_port=4370, password=0):
         """Clear attendance data from device"""
         try:
             if not ZK_AVAILABLE:
                 return False, "ZK library not available"
             
-            if device_ip not in self.connections:
-                success, error = self.connect_device(device_ip)
-                if not success:
-                    return False, f"Device not connected: {error}"
-            
-            conn = self.connections[device_ip]
-            conn.clear_attendance()
+            with self.device_connection(device_ip, device_port, password) as conn:
+                conn.clear_attendance()
             logger.info(f"Cleared attendance data from {device_ip}")
             return True, "Attendance data cleared successfully"
             
@@ -0,0 +1,247 @@
+"""
+Fleet-wide polling of ZKTeco devices.
+
+pyzk is blocking, so every device session runs in a worker thread while an
+asyncio loop schedules them: a semaphore bounds how many devices are polled
+at once, a token bucket per site limits how fast new sessions are opened on
+that site's network, and each device gets a deadline. Results are yielded as
+soon as each device finishes, so one slow or unreachable terminal never
+holds back the rest of the report.
+
+A device thread that overruns its deadline cannot be interrupted; it is
+reported as timed out straight away and keeps its concurrency slot until
+the connection's own socket timeout ends it.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .zkteco_device_manager import PROBE_STATUS
+from .zkteco_sync import DeviceAttendanceSync, record_sync_run, release_device_lease
+
+logger = logging.getLogger(__name__)
+
+# Devices polled at the same time
+ZKTECO_FLEET_CONCURRENCY = getattr(settings, 'ZKTECO_FLEET_CONCURRENCY', 50)
+
+# Seconds a single device may take before it is reported as timed out
+ZKTECO_FLEET_DEADLINE = getattr(settings, 'ZKTECO_FLEET_DEADLINE', 120)
+
+# New device sessions opened per second on one site (0 = unlimited)
+ZKTECO_SITE_RATE = getattr(settings, 'ZKTECO_SITE_RATE', 5)
+
+
+def site_key(device):
+    """
+    Site a device belongs to, for rate limiting.
+
+    Devices have no site field, so the /24 network of the device address
+    stands in for it: terminals on one site normally share a subnet and the
+    link behind it.
+    """
+    parts = device.ip_address.split('.')
+    if len(parts) == 4:
+        return '.'.join(parts[:3]) + '.0/24'
+    return device.ip_address
+
+
+def db_write_lock():
+    """Lock serializing sync writes where the database allows one writer at a time"""
+    if connection.vendor == 'sqlite':
+        return threading.Lock()
+    return None
+
+
+def sync_device(device, manager, clear_after_import=None, full=False, db_lock=None):
+    """Fleet action: import the device's new punches"""
+    return DeviceAttendanceSync(
+        device, manager, clear_after_import=clear_after_import, full=full, db_lock=db_lock
+    ).run()
+
+
+def scheduled_sync_device(device, manager, worker_name, deadline, retry_after,
+                          clear_after_import=None, db_lock=None):
+    """
+    Fleet action of the sync daemon: sync a leased device, record the run's
+    metrics and give the lease back. A failed device is not retried for
+    retry_after seconds, the same as a synced one.
+    """
+    started_at = timezone.now()
+    started = time.monotonic()
+    result = {'success': False, 'error': 'Sync did not complete'}
+    try:
+        result = sync_device(device, manager, clear_after_import=clear_after_import, db_lock=db_lock)
+        return result
+    finally:
+        duration = time.monotonic() - started
+        with db_lock or nullcontext():
+            try:
+                record_sync_run(device, worker_name, started_at, duration, result,
+                                timed_out=duration > deadline)
+            finally:
+                release_device_lease(
+                    device, worker_name, None if result.get('success') else retry_after
+                )
+
+
+def probe_device(device, manager, tier=PROBE_STATUS):
+    """Fleet action: check that the device answers"""
+    success, info = manager.probe_device(
+        device.ip_address, device.port, device.password or 0, tier=tier
+    )
+    return {
+        'success': success,
+        'info': info if success else None,
+        'error': None if success else info,
+    }
+
+
+class RateLimiter:
+    """Token bucket allowing rate acquisitions per second, in bursts of up to burst"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class FleetPoller:
+    """
+    Run a blocking per-device action across many devices concurrently.
+
+    action is called as action(device) in a worker thread and returns a
+    result dict with at least 'success' and 'error'.
+    """
+
+    def __init__(self, action, concurrency=ZKTECO_FLEET_CONCURRENCY, deadline=ZKTECO_FLEET_DEADLINE,
+                 site_rate=ZKTECO_SITE_RATE, site_key=site_key):
+        self.action = action
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.site_rate = site_rate
+        self.site_key = site_key
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='zkteco-fleet')
+        self._pending = set()
+
+    def _call(self, device):
+        close_old_connections()
+        try:
+            return self.action(device)
+        except Exception as e:
+            logger.error(f"Error polling device {device.name}: {str(e)}", exc_info=True)
+            return {'success': False, 'error': str(e)}
+        finally:
+            close_old_connections()
+
+    async def poll(self, devices):
+        """Poll devices and yield each result as soon as its device finishes"""
+        slots = asyncio.Semaphore(self.concurrency)
+        limiters = {}
+        tasks = [
+            asyncio.ensure_future(self._poll_device(device, slots, limiters))
+            for device in devices
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _poll_device(self, device, slots, limiters):
+        loop = asyncio.get_running_loop()
+        site = self.site_key(device)
+
+        await slots.acquire()
+        try:
+            if self.site_rate:
+                if site not in limiters:
+                    limiters[site] = RateLimiter(self.site_rate)
+                await limiters[site].acquire()
+        except BaseException:
+            slots.release()
+            raise
+
+        started = time.monotonic()
+        future = loop.run_in_executor(self._executor, self._call, device)
+        self._pending.add(future)
+        # The slot is held until the thread really ends, even past the deadline
+        future.add_done_callback(lambda f: (slots.release(), self._pending.discard(f)))
+
+        timed_out = False
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(future), self.deadline)
+        except asyncio.TimeoutError:
+            timed_out = True
+            outcome = {'success': False, 'error': f"No result within the {self.deadline}s deadline"}
+            logger.warning(f"Device {device.name} ({device.ip_address}) exceeded its deadline")
+
+        result = dict(outcome)
+        result.update({
+            'device_id': device.id,
+            'device_name': device.name,
+            'device_ip': device.ip_address,
+            'site': site,
+            'duration': round(time.monotonic() - started, 3),
+            'timed_out': timed_out,
+        })
+        return result
+
+    async def drain(self):
+        """Wait for device threads still running past their deadline"""
+        if self._pending:
+            await asyncio.gather(*list(self._pending), return_exceptions=True)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+def make_sync_poller(manager, clear_after_import=None, full=False, **kwargs):
+    """FleetPoller that syncs attendance from each device"""
+    return FleetPoller(
+        partial(
+            sync_device, manager=manager, clear_after_import=clear_after_import, full=full,
+            db_lock=db_write_lock(),
+        ),
+        **kwargs
+    )
+
+
+def make_probe_poller(manager, tier=PROBE_STATUS, **kwargs):
+    """FleetPoller that probes each device"""
+    return FleetPoller(partial(probe_device, manager=manager, tier=tier), **kwargs)
+
+
+def make_daemon_poller(manager, worker_name, interval, clear_after_import=None,
+                       deadline=ZKTECO_FLEET_DEADLINE, **kwargs):
+    """FleetPoller for the sync daemon: leased devices, with per-run metrics"""
+    return FleetPoller(
+        partial(
+            scheduled_sync_device, manager=manager, worker_name=worker_name, deadline=deadline,
+            retry_after=interval, clear_after_import=clear_after_import, db_lock=db_write_lock(),
+        ),
+        deadline=deadline,
+        **kwargs
+    )
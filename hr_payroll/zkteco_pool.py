@@ -0,0 +1,299 @@
+"""
+Shared connection pool for ZKTeco devices.
+
+Connections are kept per device and reused across requests and threads.
+Each device has its own lock, so one device is only ever used by one
+thread at a time while others proceed in parallel. The connection method
+that worked last is remembered (also in the cache, for other processes)
+and tried first. A background thread keeps idle connections alive and
+evicts those unused for too long; failed connects back off exponentially.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .zkteco_device_manager import open_connection
+
+logger = logging.getLogger(__name__)
+
+# Seconds without use before a pooled connection is closed
+ZKTECO_IDLE_TIMEOUT = getattr(settings, 'ZKTECO_IDLE_TIMEOUT', 300)
+
+# Seconds between keep-alive sweeps
+ZKTECO_KEEPALIVE_INTERVAL = getattr(settings, 'ZKTECO_KEEPALIVE_INTERVAL', 60)
+
+# A connection used within this many seconds is handed out without a probe
+ZKTECO_HEALTH_CHECK_INTERVAL = getattr(settings, 'ZKTECO_HEALTH_CHECK_INTERVAL', 30)
+
+ZKTECO_CONNECT_TIMEOUT = getattr(settings, 'ZKTECO_CONNECT_TIMEOUT', 30)
+
+# Reconnect backoff after a failed connect: base * 2 ** (failures - 1), capped
+RECONNECT_BACKOFF_BASE = 2
+RECONNECT_BACKOFF_MAX = 300
+
+METHOD_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+class PooledConnection:
+    """Connection state of one device"""
+
+    def __init__(self, device_ip, device_port, password):
+        self.device_ip = device_ip
+        self.device_port = device_port
+        self.password = password
+        self.conn = None
+        self.method = None
+        self.lock = threading.RLock()
+        self.last_used = 0.0
+        self.last_checked = 0.0
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class DeviceConnectionPool:
+    """Thread-safe pool of ZKTeco device connections"""
+
+    def __init__(self, idle_timeout=ZKTECO_IDLE_TIMEOUT, keepalive_interval=ZKTECO_KEEPALIVE_INTERVAL,
+                 health_check_interval=ZKTECO_HEALTH_CHECK_INTERVAL, timeout=ZKTECO_CONNECT_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self._entries = {}
+        self._methods = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._keepalive_thread = None
+
+    # ---- connection methods ----
+
+    @staticmethod
+    def method_cache_key(device_ip, device_port):
+        return f'zkteco_connection_method:{device_ip}:{device_port}'
+
+    def preferred_method(self, device_ip, device_port=4370):
+        """Connection method that last worked for the device, if known"""
+        method = self._methods.get((device_ip, device_port))
+        if method is None:
+            method = cache.get(self.method_cache_key(device_ip, device_port))
+            if method is not None:
+                self._methods[(device_ip, device_port)] = method
+        return method
+
+    def remember_method(self, device_ip, device_port, method):
+        if self._methods.get((device_ip, device_port)) == method:
+            return
+        self._methods[(device_ip, device_port)] = method
+        cache.set(self.method_cache_key(device_ip, device_port), method, METHOD_CACHE_TIMEOUT)
+
+    # ---- checkout ----
+
+    def _entry(self, device_ip, device_port, password):
+        with self._lock:
+            entry = self._entries.get(device_ip)
+            if entry is None:
+                entry = self._entries[device_ip] = PooledConnection(device_ip, device_port, password)
+            # Touched under the pool lock so a sweep cannot forget it meanwhile
+            entry.last_used = time.monotonic()
+
+        if (entry.device_port, entry.password) != (device_port, password):
+            # Settings changed: the next checkout connects with the new ones
+            with entry.lock:
+                self._drop(entry)
+                entry.device_port = device_port
+                entry.password = password
+                entry.failures = 0
+                entry.retry_at = 0.0
+        return entry
+
+    @contextmanager
+    def lock(self, device_ip, device_port=4370, password=0):
+        """Hold a device exclusively; connection() calls inside reuse the lock"""
+        entry = self._entry(device_ip, device_port, password)
+        with entry.lock:
+            yield entry
+
+    @contextmanager
+    def connection(self, device_ip, device_port=4370, password=0):
+        """Borrow a live connection; it is dropped if the block raises"""
+        self.start_keepalive()
+        entry = self._entry(device_ip, device_port, password)
+        with entry.lock:
+            conn = self._checkout(entry)
+            try:
+                yield conn
+            except Exception:
+                self._drop(entry)
+                raise
+            finally:
+                entry.last_used = time.monotonic()
+
+    def _checkout(self, entry):
+        now = time.monotonic()
+        if entry.conn is not None:
+            if now - entry.last_checked < self.health_check_interval:
+                return entry.conn
+            try:
+                entry.conn.get_time()
+                entry.last_checked = now
+                return entry.conn
+            except Exception:
+                logger.info(f"Pooled connection to {entry.device_ip} is stale, reconnecting")
+                self._drop(entry)
+
+        if now < entry.retry_at:
+            raise ConnectionError(
+                f"Device {entry.device_ip} is unreachable, next retry in {entry.retry_at - now:.0f}s"
+            )
+
+        try:
+            conn, method = open_connection(
+                entry.device_ip, entry.device_port, entry.password, self.timeout,
+                self.preferred_method(entry.device_ip, entry.device_port)
+            )
+        except Exception as e:
+            entry.failures += 1
+            backoff = min(RECONNECT_BACKOFF_BASE * 2 ** (entry.failures - 1), RECONNECT_BACKOFF_MAX)
+            entry.retry_at = now + backoff
+            logger.warning(f"Failed to connect to {entry.device_ip}, retrying in {backoff}s: {e}")
+            raise ConnectionError(f"Failed to connect to device {entry.device_ip}: {e}") from e
+
+        self._attach(entry, conn, method)
+        logger.info(f"Pooled connection to {entry.device_ip} opened using method: {method}")
+        return conn
+
+    def _attach(self, entry, conn, method):
+        now = time.monotonic()
+        entry.conn = conn
+        entry.method = method
+        entry.failures = 0
+        entry.retry_at = 0.0
+        entry.last_checked = now
+        entry.last_used = now
+        self.remember_method(entry.device_ip, entry.device_port, method)
+
+    def is_connected(self, device_ip, device_port=4370, password=0):
+        """Whether an open connection with these settings is pooled for the device"""
+        with self._lock:
+            entry = self._entries.get(device_ip)
+        return (
+            entry is not None and entry.conn is not None
+            and (entry.device_port, entry.password) == (device_port, password)
+        )
+
+    def adopt(self, device_ip, device_port, password, conn, method):
+        """Take over a connection opened elsewhere, e.g. by a connection test"""
+        entry = self._entry(device_ip, device_port, password)
+        with entry.lock:
+            if entry.conn is not None and entry.conn is not conn:
+                self._drop(entry)
+            self._attach(entry, conn, method)
+        self.start_keepalive()
+
+    def _drop(self, entry):
+        conn, entry.conn = entry.conn, None
+        if conn is None:
+            return
+        try:
+            conn.disconnect()
+        except Exception:
+            pass
+
+    # ---- keep-alive ----
+
+    def start_keepalive(self):
+        if self._keepalive_thread is not None and self._keepalive_thread.is_alive():
+            return
+        with self._lock:
+            if self._keepalive_thread is not None and self._keepalive_thread.is_alive():
+                return
+            self._stop.clear()
+            self._keepalive_thread = threading.Thread(
+                target=self._keepalive_loop, name='zkteco-keepalive', daemon=True
+            )
+            self._keepalive_thread.start()
+
+    def _keepalive_loop(self):
+        while not self._stop.wait(self.keepalive_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"ZKTeco keep-alive sweep failed: {str(e)}")
+
+    def sweep(self):
+        """Evict idle connections and probe the rest; devices in use are skipped"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.values())
+
+        evicted = 0
+        forgotten = []
+        for entry in entries:
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.conn is None:
+                    if now - entry.last_used > self.idle_timeout and now >= entry.retry_at:
+                        forgotten.append(entry)
+                elif now - entry.last_used > self.idle_timeout:
+                    self._drop(entry)
+                    evicted += 1
+                elif now - entry.last_checked >= self.keepalive_interval:
+                    try:
+                        entry.conn.get_time()
+                        entry.last_checked = now
+                    except Exception:
+                        logger.info(f"Keep-alive to {entry.device_ip} failed, dropping connection")
+                        self._drop(entry)
+            finally:
+                entry.lock.release()
+
+        with self._lock:
+            for entry in forgotten:
+                if self._entries.get(entry.device_ip) is not entry or entry.last_used > now:
+                    continue
+                if entry.lock.acquire(blocking=False):
+                    try:
+                        if entry.conn is None:
+                            del self._entries[entry.device_ip]
+                    finally:
+                        entry.lock.release()
+
+        if evicted:
+            logger.info(f"Evicted {evicted} idle ZKTeco connection(s)")
+        return evicted
+
+    def close_all(self):
+        """Stop the keep-alive thread and close every connection"""
+        self._stop.set()
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            with entry.lock:
+                self._drop(entry)
+
+    def status(self):
+        """Snapshot of pooled devices for diagnostics"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.values())
+        return {
+            entry.device_ip: {
+                'connected': entry.conn is not None,
+                'method': entry.method,
+                'idle_seconds': round(now - entry.last_used, 1) if entry.last_used else None,
+                'failures': entry.failures,
+                'retry_in': max(0.0, round(entry.retry_at - now, 1)),
+            }
+            for entry in entries
+        }
+
+
+# Process-wide pool shared by the device views and the admin
+device_pool = DeviceConnectionPool()
@@ -0,0 +1,453 @@
+"""
+Simulated ZKTeco terminals for offline testing and load tests.
+
+Each SimulatedDevice answers the subset of the ZK protocol that pyzk uses
+for the fetch, import and sync paths - connect/auth, get_time, read_sizes,
+firmware and option queries, enable/disable, buffered reads of users and
+attendance, and clear_attendance - over both TCP and UDP on its address and
+port. Many devices run in one asyncio loop; the default addressing puts
+each on its own loopback address with the standard port, so they can be
+registered as ZkDevice rows like real terminals.
+
+Faults are injected per reply: latency with jitter, lost packets (dropped
+UDP datagrams, a retransmission stall on TCP) and disconnects.
+
+Only the standard library is used; pyzk is not needed to run a simulator.
+"""
+
+import asyncio
+import ipaddress
+import logging
+import random
+import struct
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Commands, as in pyzk's zk.const
+CMD_CONNECT = 1000
+CMD_EXIT = 1001
+CMD_ENABLEDEVICE = 1002
+CMD_DISABLEDEVICE = 1003
+CMD_REFRESHDATA = 1013
+CMD_GET_VERSION = 1100
+CMD_AUTH = 1102
+CMD_PREPARE_DATA = 1500
+CMD_DATA = 1501
+CMD_FREE_DATA = 1502
+CMD_PREPARE_BUFFER = 1503
+CMD_READ_BUFFER = 1504
+CMD_USERTEMP_RRQ = 9
+CMD_OPTIONS_RRQ = 11
+CMD_ATTLOG_RRQ = 13
+CMD_CLEAR_ATTLOG = 15
+CMD_GET_FREE_SIZES = 50
+CMD_GET_TIME = 201
+
+CMD_ACK_OK = 2000
+CMD_ACK_ERROR = 2001
+CMD_ACK_UNAUTH = 2005
+CMD_ACK_UNKNOWN = 0xffff
+
+USHRT_MAX = 65535
+MACHINE_PREPARE_DATA_1 = 0x5050
+MACHINE_PREPARE_DATA_2 = 0x7d82
+
+# Payload bytes per CMD_DATA datagram when a buffer chunk is read over UDP
+UDP_DATA_SIZE = 1024
+
+# Extra delay of a TCP reply whose "packet" was lost, standing in for a retransmission
+TCP_RETRANSMIT_DELAY = 0.3
+
+
+def checksum(data):
+    """ZK packet checksum, computed like pyzk does"""
+    total = 0
+    length = len(data)
+    while length > 1:
+        total += data[0] | data[1] << 8
+        data = data[2:]
+        if total > USHRT_MAX:
+            total -= USHRT_MAX
+        length -= 2
+    if length:
+        total += data[-1]
+    while total > USHRT_MAX:
+        total -= USHRT_MAX
+    total = ~total
+    while total < 0:
+        total += USHRT_MAX
+    return total
+
+
+def make_packet(command, session_id, reply_id, data=b''):
+    header = struct.pack('<4H', command, 0, session_id, reply_id) + data
+    return struct.pack('<4H', command, checksum(header), session_id, reply_id) + data
+
+
+def make_tcp_top(packet):
+    return struct.pack('<HHI', MACHINE_PREPARE_DATA_1, MACHINE_PREPARE_DATA_2, len(packet)) + packet
+
+
+def make_commkey(key, session_id, ticks=50):
+    """Authentication key a client derives from the device password and session"""
+    key = int(key)
+    k = 0
+    for i in range(32):
+        k = (k << 1 | 1) if key & (1 << i) else k << 1
+    k += int(session_id)
+    k = struct.unpack('BBBB', struct.pack('I', k & 0xffffffff))
+    k = struct.pack('BBBB', k[0] ^ ord('Z'), k[1] ^ ord('K'), k[2] ^ ord('S'), k[3] ^ ord('O'))
+    k = struct.unpack('HH', k)
+    k = struct.unpack('BBBB', struct.pack('HH', k[1], k[0]))
+    b = 0xff & ticks
+    return struct.pack('BBBB', k[0] ^ b, k[1] ^ b, b, k[3] ^ b)
+
+
+def encode_time(value):
+    """Datetime to the device's packed time format"""
+    return (
+        ((value.year % 100) * 12 * 31 + (value.month - 1) * 31 + value.day - 1) * 24 * 60 * 60
+        + (value.hour * 60 + value.minute) * 60 + value.second
+    )
+
+
+class FaultProfile:
+    """Network faults injected into a device's replies"""
+
+    def __init__(self, latency=0.0, jitter=0.0, loss=0.0, disconnect_rate=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.disconnect_rate = disconnect_rate
+        self.rng = random.Random(seed)
+
+    def delay(self):
+        return self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def lost(self):
+        return self.loss > 0 and self.rng.random() < self.loss
+
+    def disconnect(self):
+        return self.disconnect_rate > 0 and self.rng.random() < self.disconnect_rate
+
+
+class Session:
+    """Protocol state of one client connection"""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.connected = False
+        self.buffer = b''
+
+
+class SimulatedDevice:
+    """
+    One simulated terminal.
+
+    users is a list of (user_id, name) pairs; attendances a list of
+    (user_id, timestamp, status, punch) tuples in buffer order.
+    """
+
+    def __init__(self, host, port=4370, users=(), attendances=(), password=0, faults=None,
+                 serial_number=None, device_name='ZK Simulator', firmware_version='Ver 6.60 Sim'):
+        self.host = host
+        self.port = port
+        self.users = [(str(user_id), name) for user_id, name in users]
+        self.attendances = list(attendances)
+        self.password = int(password or 0)
+        self.faults = faults or FaultProfile()
+        self.serial_number = serial_number or f"SIM{int(ipaddress.ip_address(host)):010d}{port}"
+        self.device_name = device_name
+        self.firmware_version = firmware_version
+        self.enabled = True
+        self.stats = {'connections': 0, 'commands': 0, 'dropped': 0, 'disconnects': 0}
+        self._uids = {user_id: uid for uid, (user_id, _) in enumerate(self.users, start=1)}
+        self._servers = []
+        self._next_session = random.Random(port).randint(1, 30000)
+
+    # ---- device data ----
+
+    def add_punch(self, user_id, timestamp, status=1, punch=0):
+        self.attendances.append((str(user_id), timestamp, status, punch))
+
+    def user_payload(self):
+        records = b''.join(
+            struct.pack(
+                '<HB8s24sIx7sx24s', uid, 0, b'', name.encode()[:24], 0, b'1', user_id.encode()[:24]
+            )
+            for uid, (user_id, name) in enumerate(self.users, start=1)
+        )
+        return struct.pack('<I', len(records)) + records
+
+    def attendance_payload(self):
+        records = b''.join(
+            struct.pack(
+                '<H24sB4sB8s', self._uids.get(user_id, 0), user_id.encode()[:24], status,
+                struct.pack('<I', encode_time(timestamp)), punch, b''
+            )
+            for user_id, timestamp, status, punch in self.attendances
+        )
+        return struct.pack('<I', len(records)) + records
+
+    def sizes_payload(self):
+        fields = [0] * 20
+        fields[4] = len(self.users)
+        fields[8] = len(self.attendances)
+        fields[14] = 3000                                       # fingerprint capacity
+        fields[15] = 10000                                      # user capacity
+        fields[16] = max(100000, len(self.attendances))         # record capacity
+        fields[17] = fields[14]
+        fields[18] = fields[15] - fields[4]
+        fields[19] = fields[16] - fields[8]
+        return struct.pack('20i', *fields) + struct.pack('3i', 0, 0, 0)
+
+    def option(self, key):
+        return {
+            '~SerialNumber': self.serial_number,
+            '~DeviceName': self.device_name,
+            '~Platform': 'ZMM220_TFT',
+            '~OEMVendor': 'ZKTeco Simulator',
+            'MAC': '00:17:61:00:00:00',
+        }.get(key, '')
+
+    # ---- protocol ----
+
+    def new_session(self):
+        self._next_session = self._next_session % 60000 + 1
+        return Session(self._next_session)
+
+    def handle(self, session, command, data, tcp):
+        """Replies to one command, as a list of (command, data) packets"""
+        self.stats['commands'] += 1
+
+        if command == CMD_CONNECT:
+            session.connected = not self.password
+            return [(CMD_ACK_OK if session.connected else CMD_ACK_UNAUTH, b'')]
+        if command == CMD_AUTH:
+            session.connected = data[:4] == make_commkey(self.password, session.session_id)
+            return [(CMD_ACK_OK if session.connected else CMD_ACK_UNAUTH, b'')]
+        if not session.connected:
+            return [(CMD_ACK_UNAUTH, b'')]
+
+        if command == CMD_EXIT:
+            session.connected = False
+            return [(CMD_ACK_OK, b'')]
+        if command == CMD_GET_TIME:
+            return [(CMD_ACK_OK, struct.pack('<I', encode_time(datetime.now())))]
+        if command == CMD_GET_FREE_SIZES:
+            return [(CMD_ACK_OK, self.sizes_payload())]
+        if command == CMD_GET_VERSION:
+            return [(CMD_ACK_OK, self.firmware_version.encode() + b'\x00')]
+        if command == CMD_OPTIONS_RRQ:
+            key = data.split(b'\x00')[0].decode(errors='ignore')
+            return [(CMD_ACK_OK, f'{key}={self.option(key)}'.encode() + b'\x00')]
+        if command in (CMD_ENABLEDEVICE, CMD_DISABLEDEVICE):
+            self.enabled = command == CMD_ENABLEDEVICE
+            return [(CMD_ACK_OK, b'')]
+        if command == CMD_REFRESHDATA:
+            return [(CMD_ACK_OK, b'')]
+        if command == CMD_CLEAR_ATTLOG:
+            self.attendances.clear()
+            return [(CMD_ACK_OK, b'')]
+
+        if command == CMD_PREPARE_BUFFER:
+            _, requested, _, _ = struct.unpack('<bhii', data[:11])
+            if requested == CMD_USERTEMP_RRQ:
+                session.buffer = self.user_payload()
+            elif requested == CMD_ATTLOG_RRQ:
+                session.buffer = self.attendance_payload()
+            else:
+                return [(CMD_ACK_ERROR, b'')]
+            return [(CMD_ACK_OK, struct.pack('<BI', 0, len(session.buffer)) + b'\x00' * 4)]
+        if command == CMD_READ_BUFFER:
+            start, size = struct.unpack('<ii', data[:8])
+            chunk = session.buffer[start:start + size]
+            if tcp:
+                return [(CMD_DATA, chunk)]
+            return (
+                [(CMD_PREPARE_DATA, struct.pack('<I', len(chunk)))]
+                + [(CMD_DATA, chunk[i:i + UDP_DATA_SIZE]) for i in range(0, len(chunk), UDP_DATA_SIZE)]
+                + [(CMD_ACK_OK, b'')]
+            )
+        if command == CMD_FREE_DATA:
+            session.buffer = b''
+            return [(CMD_ACK_OK, b'')]
+
+        return [(CMD_ACK_UNKNOWN, b'')]
+
+    # ---- transports ----
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._servers.append(await asyncio.start_server(self._serve_tcp, self.host, self.port))
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DeviceDatagramProtocol(self), local_addr=(self.host, self.port)
+        )
+        self._servers.append(transport)
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+            if isinstance(server, asyncio.AbstractServer):
+                await server.wait_closed()
+        self._servers = []
+
+    async def _serve_tcp(self, reader, writer):
+        self.stats['connections'] += 1
+        session = self.new_session()
+        try:
+            while True:
+                top = await reader.readexactly(8)
+                magic1, magic2, length = struct.unpack('<HHI', top)
+                if (magic1, magic2) != (MACHINE_PREPARE_DATA_1, MACHINE_PREPARE_DATA_2) or length < 8:
+                    break
+                packet = await reader.readexactly(length)
+                command, _, _, reply_id = struct.unpack('<4H', packet[:8])
+
+                if self.faults.disconnect():
+                    self.stats['disconnects'] += 1
+                    break
+                delay = self.faults.delay()
+                if self.faults.lost():
+                    self.stats['dropped'] += 1
+                    delay += TCP_RETRANSMIT_DELAY
+                if delay:
+                    await asyncio.sleep(delay)
+
+                for reply, data in self.handle(session, command, packet[8:], tcp=True):
+                    writer.write(make_tcp_top(make_packet(reply, session.session_id, reply_id, data)))
+                await writer.drain()
+                if command == CMD_EXIT:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class _DeviceDatagramProtocol(asyncio.DatagramProtocol):
+    """UDP side of a simulated device; sessions are keyed by client address"""
+
+    def __init__(self, device):
+        self.device = device
+        self.sessions = {}
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, packet, addr):
+        if len(packet) < 8:
+            return
+        asyncio.ensure_future(self.reply(packet, addr))
+
+    async def reply(self, packet, addr):
+        device = self.device
+        command, _, _, reply_id = struct.unpack('<4H', packet[:8])
+        if command == CMD_CONNECT or addr not in self.sessions:
+            self.sessions[addr] = device.new_session()
+            device.stats['connections'] += 1
+        session = self.sessions[addr]
+
+        if device.faults.disconnect():
+            # The device forgets the client, whose next commands are unauthorized
+            device.stats['disconnects'] += 1
+            del self.sessions[addr]
+            return
+        delay = device.faults.delay()
+        if delay:
+            await asyncio.sleep(delay)
+
+        for reply, data in device.handle(session, command, packet[8:], tcp=False):
+            if device.faults.lost():
+                device.stats['dropped'] += 1
+                continue
+            self.transport.sendto(make_packet(reply, session.session_id, reply_id, data), addr)
+        if command == CMD_EXIT:
+            self.sessions.pop(addr, None)
+
+
+def device_addresses(count, first_address='127.0.0.1', port=4370, same_address=False):
+    """
+    (host, port) of count simulated devices.
+
+    By default each device gets the next loopback address on the same port,
+    like a fleet of real terminals; with same_address they share one address
+    on consecutive ports instead (for systems with a single loopback address).
+    """
+    first = ipaddress.ip_address(first_address)
+    if same_address:
+        return [(str(first), port + i) for i in range(count)]
+    return [(str(first + i), port) for i in range(count)]
+
+
+def generate_punches(user_ids, days, punches_per_day=2, end_date=None, seed=0):
+    """
+    Synthetic punch history, in buffer (time) order.
+
+    Each user punches in around 09:00 and out around 18:00 on each day, with
+    any extra punches spread in between.
+    """
+    rng = random.Random(seed)
+    end_date = end_date or datetime.now().date()
+    punches = []
+    for offset in range(days - 1, -1, -1):
+        day = datetime.combine(end_date - timedelta(days=offset), datetime.min.time())
+        for user_id in user_ids:
+            times = [day + timedelta(hours=9, minutes=rng.gauss(0, 15))]
+            if punches_per_day > 1:
+                times.append(day + timedelta(hours=18, minutes=rng.gauss(0, 20)))
+            for _ in range(punches_per_day - 2):
+                times.append(day + timedelta(hours=rng.uniform(10, 17)))
+            for index, timestamp in enumerate(sorted(times)):
+                punches.append((str(user_id), timestamp.replace(microsecond=0), 1, 0 if index == 0 else 1))
+    # A device cannot have recorded punches later than its clock
+    now = datetime.now()
+    punches = [punch for punch in punches if punch[1] <= now]
+    punches.sort(key=lambda punch: punch[1])
+    return punches
+
+
+class DeviceSimulator:
+    """A fleet of simulated devices served from one event loop"""
+
+    def __init__(self, devices):
+        self.devices = list(devices)
+
+    async def start(self):
+        for device in self.devices:
+            await device.start()
+        logger.info(f"Started {len(self.devices)} simulated ZKTeco device(s)")
+
+    async def stop(self):
+        for device in self.devices:
+            await device.stop()
+
+    async def run(self, live_punch_interval=None, rng=None):
+        """
+        Serve until cancelled. With live_punch_interval, every device records
+        a punch of a random user that often (in seconds), so incremental
+        syncs keep finding new data.
+        """
+        await self.start()
+        rng = rng or random.Random()
+        try:
+            while True:
+                await asyncio.sleep(live_punch_interval or 3600)
+                if not live_punch_interval:
+                    continue
+                now = datetime.now().replace(microsecond=0)
+                for device in self.devices:
+                    if device.users and device.enabled:
+                        device.add_punch(rng.choice(device.users)[0], now)
+        finally:
+            await self.stop()
+
+    def stats(self):
+        return {
+            f'{device.host}:{device.port}': dict(
+                device.stats, users=len(device.users), records=len(device.attendances)
+            )
+            for device in self.devices
+        }
@@ -0,0 +1,344 @@
+"""
+Incremental attendance sync from ZKTeco devices.
+
+Each ZkDevice keeps a high-water mark: the number of buffer records already
+synced and the newest punch timestamp. A sync only imports records past
+that mark, and skips the download when the device's record count has not
+changed. With clear_after_import the device buffer is cleared once every
+fetched punch is confirmed in the database, so buffers stay small.
+
+Scheduled syncs lease devices through sync_lease_owner/sync_lease_expires,
+so several sync daemons never poll the same device at once, and record
+each run as a ZkDeviceSyncRun.
+"""
+
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .attendance_incremental import mark_logs_dirty
+from .models import AttendanceLog, Employee, ZkDevice, ZkDeviceSyncRun
+from .zkteco_device_manager import ZKTecoDeviceManager
+
+logger = logging.getLogger(__name__)
+
+
+def map_device_users(company, zkteco_ids):
+    """
+    Map device user IDs to employees, by ZKTeco ID first, then employee ID.
+
+    Values are dicts with the employee's id, employee_id and name; all IDs
+    are resolved in one query.
+    """
+    zkteco_ids = set(zkteco_ids)
+    if not zkteco_ids:
+        return {}
+
+    by_zkteco_id = {}
+    by_employee_id = {}
+    for employee in Employee.objects.filter(
+        Q(zkteco_id__in=zkteco_ids) | Q(employee_id__in=zkteco_ids),
+        company=company
+    ).order_by('pk').values('id', 'zkteco_id', 'employee_id', 'name'):
+        by_zkteco_id.setdefault(employee['zkteco_id'], employee)
+        by_employee_id.setdefault(employee['employee_id'], employee)
+
+    mapped = {}
+    for user_id in zkteco_ids:
+        employee = by_zkteco_id.get(user_id) or by_employee_id.get(user_id)
+        if employee:
+            mapped[user_id] = employee
+    return mapped
+
+
+def resolve_device_users(company, zkteco_ids):
+    """Map device user IDs to employee IDs, by ZKTeco ID first, then employee ID"""
+    return {
+        user_id: employee['id']
+        for user_id, employee in map_device_users(company, zkteco_ids).items()
+    }
+
+
+def lock_devices(device_ids):
+    """
+    Lock the device rows until the transaction ends, so concurrent imports
+    of the same devices run one after the other. SQLite ignores the lock,
+    but only ever runs one write transaction at a time.
+    """
+    list(ZkDevice.objects.select_for_update().filter(id__in=device_ids).values_list('id', flat=True))
+
+
+def stored_log_keys(company, start, end):
+    """(employee ID, timestamp, device IP) of the company's punch logs in a time window"""
+    return set(
+        AttendanceLog.objects.filter(
+            employee__company=company, timestamp__range=[start, end]
+        ).values_list('employee_id', 'timestamp', 'device__ip_address')
+    )
+
+
+class DeviceAttendanceSync:
+    """
+    Sync the punches a device recorded since its last sync.
+
+    db_lock, when given, is held around the database writes only, so
+    devices synced from several threads still download in parallel on a
+    backend that allows a single writer (SQLite).
+    """
+
+    def __init__(self, device, manager=None, clear_after_import=None, full=False, db_lock=None):
+        self.device = device
+        self.manager = manager or ZKTecoDeviceManager()
+        self.clear_after_import = (
+            device.clear_after_import if clear_after_import is None else clear_after_import
+        )
+        self.full = full
+        self.db_lock = db_lock or nullcontext()
+
+    def run(self):
+        device = self.device
+        with self.manager.device_lock(device.ip_address, device.port, device.password or 0):
+            return self._run()
+
+    def _run(self):
+        device = self.device
+        result = {
+            'device_id': device.id,
+            'device_name': device.name,
+            'success': False,
+            'fetched': 0,
+            'imported': 0,
+            'duplicates': 0,
+            'unmatched': 0,
+            'verified': False,
+            'cleared': False,
+            'error': None,
+        }
+        connection_args = (device.port, device.password or 0)
+
+        if self.clear_after_import:
+            success, message = self.manager.hold_device(device.ip_address, *connection_args)
+            if not success:
+                result['error'] = message
+                return result
+
+        try:
+            record_index = 0 if self.full else device.sync_record_index
+            since = None
+            if device.sync_high_water_mark and not self.full:
+                since = timezone.localtime(device.sync_high_water_mark).replace(tzinfo=None)
+
+            success, data = self.manager.get_new_attendance_data(
+                device.ip_address, record_index, since, *connection_args
+            )
+            if not success:
+                result['error'] = data
+                return result
+
+            records = data['records']
+            result['fetched'] = len(records)
+            record_count = data['record_count']
+
+            with self.db_lock, transaction.atomic():
+                self.import_records(records, result)
+
+            if (self.clear_after_import and records and result['verified']
+                    and not result['unmatched']):
+                # Clear only if nothing was punched since the download
+                success, current_count = self.manager.get_record_count(
+                    device.ip_address, *connection_args
+                )
+                if success and current_count == record_count:
+                    cleared, message = self.manager.clear_attendance_data(
+                        device.ip_address, *connection_args
+                    )
+                    result['cleared'] = cleared
+                    if cleared:
+                        record_count = 0
+                    else:
+                        logger.warning(f"Could not clear device {device.name}: {message}")
+
+            with self.db_lock:
+                self.save_state(records, record_count)
+            result['success'] = True
+            return result
+
+        except Exception as e:
+            logger.error(f"Error syncing device {device.name}: {str(e)}", exc_info=True)
+            result['error'] = str(e)
+            return result
+
+        finally:
+            if self.clear_after_import:
+                self.manager.release_device(device.ip_address, *connection_args)
+
+    def import_records(self, records, result):
+        """
+        Insert punches that are not stored yet and verify all of them are.
+        The device row stays locked until the caller's transaction ends.
+        """
+        if not records:
+            result['verified'] = True
+            return
+
+        employees = resolve_device_users(self.device.company, (r['zkteco_id'] for r in records))
+
+        expected = {}
+        for record in records:
+            employee_id = employees.get(record['zkteco_id'])
+            if not employee_id:
+                result['unmatched'] += 1
+                continue
+
+            timestamp = record['timestamp']
+            if timezone.is_naive(timestamp):
+                timestamp = timezone.make_aware(timestamp)
+            expected.setdefault((employee_id, timestamp), record)
+
+        if not expected:
+            result['verified'] = True
+            return
+
+        timestamps = [key[1] for key in expected]
+        lock_devices([self.device.pk])
+        existing = self.stored_keys(min(timestamps), max(timestamps))
+
+        new_logs = [
+            AttendanceLog(
+                device=self.device,
+                employee_id=employee_id,
+                timestamp=timestamp,
+                status_code=record.get('verify_type', 0),
+                punch_type=str(record.get('punch_type', 0)),
+                source_type='ZK',
+            )
+            for (employee_id, timestamp), record in expected.items()
+            if (employee_id, timestamp) not in existing
+        ]
+        AttendanceLog.objects.bulk_create(new_logs, batch_size=1000, ignore_conflicts=True)
+
+        # ignore_conflicts hides which rows were skipped, so read back what
+        # this call added
+        stored = self.stored_keys(min(timestamps), max(timestamps))
+        added = stored - existing
+        inserted = [log for log in new_logs if (log.employee_id, log.timestamp) in added]
+        mark_logs_dirty(((log.employee_id, log.timestamp) for log in inserted), on_commit=True)
+
+        result['imported'] = len(inserted)
+        result['duplicates'] = len(expected) - len(inserted)
+        result['verified'] = set(expected) <= stored
+
+    def stored_keys(self, start, end):
+        return set(
+            AttendanceLog.objects.filter(
+                device=self.device, timestamp__range=[start, end]
+            ).values_list('employee_id', 'timestamp')
+        )
+
+    def save_state(self, records, record_count):
+        """Advance the device's high-water mark"""
+        high_water_mark = self.device.sync_high_water_mark
+        if records:
+            newest = max(record['timestamp'] for record in records)
+            if timezone.is_naive(newest):
+                newest = timezone.make_aware(newest)
+            if not high_water_mark or newest > high_water_mark:
+                high_water_mark = newest
+
+        now = timezone.now()
+        ZkDevice.objects.filter(pk=self.device.pk).update(
+            sync_record_index=record_count,
+            sync_high_water_mark=high_water_mark,
+            last_synced=now,
+        )
+        self.device.sync_record_index = record_count
+        self.device.sync_high_water_mark = high_water_mark
+        self.device.last_synced = now
+
+
+def sync_devices(devices, manager=None, clear_after_import=None, full=False):
+    """Sync several devices over one device manager and return their results"""
+    manager = manager or ZKTecoDeviceManager()
+    try:
+        return [
+            DeviceAttendanceSync(
+                device, manager, clear_after_import=clear_after_import, full=full
+            ).run()
+            for device in devices
+        ]
+    finally:
+        manager.disconnect_all()
+
+
+def claim_due_devices(worker_name, interval, lease_seconds, device_ids=None, limit=None):
+    """
+    Lease up to limit active devices not synced for interval seconds, the
+    longest unsynced first.
+
+    The claim is a single conditional UPDATE on the lease columns, so two
+    daemons can never hold the same device regardless of database backend.
+    A lease left behind by a crashed daemon expires after lease_seconds, so
+    limit should be what the daemon syncs at once: leases of devices still
+    waiting for a free slot would run out.
+    """
+    now = timezone.now()
+    lease_expires = now + timedelta(seconds=lease_seconds)
+    devices = ZkDevice.objects.filter(
+        Q(last_synced__isnull=True) | Q(last_synced__lte=now - timedelta(seconds=interval)),
+        Q(sync_lease_expires__isnull=True) | Q(sync_lease_expires__lt=now),
+        is_active=True,
+    )
+    if device_ids:
+        devices = devices.filter(id__in=device_ids)
+    if limit:
+        # Not a sliced subquery: some backends reject LIMIT inside IN
+        due_ids = devices.order_by(F('last_synced').asc(nulls_first=True), 'id').values_list(
+            'id', flat=True
+        )[:limit]
+        devices = devices.filter(id__in=list(due_ids))
+    if not devices.update(sync_lease_owner=worker_name, sync_lease_expires=lease_expires):
+        return []
+
+    return list(
+        ZkDevice.objects.filter(sync_lease_owner=worker_name, sync_lease_expires=lease_expires)
+        .select_related('company')
+        .order_by('id')
+    )
+
+
+def release_device_lease(device, worker_name, retry_after=None):
+    """Give a claimed device back; with retry_after it is not claimed again before then"""
+    lease_expires = None
+    if retry_after:
+        lease_expires = timezone.now() + timedelta(seconds=retry_after)
+    ZkDevice.objects.filter(pk=device.pk, sync_lease_owner=worker_name).update(
+        sync_lease_owner='', sync_lease_expires=lease_expires
+    )
+
+
+def record_sync_run(device, worker_name, started_at, duration, result, timed_out=False):
+    """Store the metrics of one scheduled sync"""
+    return ZkDeviceSyncRun.objects.create(
+        device=device,
+        worker=worker_name,
+        started_at=started_at,
+        duration=round(duration, 3),
+        success=bool(result.get('success')),
+        timed_out=timed_out,
+        fetched=result.get('fetched', 0),
+        imported=result.get('imported', 0),
+        duplicates=result.get('duplicates', 0),
+        unmatched=result.get('unmatched', 0),
+        cleared=bool(result.get('cleared')),
+        error=result.get('error') or '',
+    )
+
+
+def prune_sync_runs(older_than):
+    """Delete sync run metrics older than the given timedelta"""
+    deleted, _ = ZkDeviceSyncRun.objects.filter(started_at__lt=timezone.now() - older_than).delete()
+    return deleted